@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Benchmarks of the game engine's data structures.
+"""
+# requires python 3
+
+import sys
+import time
+import random
+import timeit
+from argparse import ArgumentParser
+
+from lib.model import SCHEDULERS, SpatialIndex, SystemCoord
+from lib.model.update import DelayedEvent
+
+
+def noop():
+    pass
+
+
+def new_events(count, max_delay, seed):
+    rnd = random.Random(seed)
+    return [DelayedEvent('benchmark', rnd.uniform(0, max_delay), noop)
+            for _ in range(count)]
+
+
+def time_scheduler(scheduler_cls, events, max_delay, steps):
+    """Return the seconds taken to schedule the events and to run them all.
+    """
+    scheduler = scheduler_cls()
+    now = time.time()
+    start = timeit.default_timer()
+    for event in events:
+        scheduler.schedule(event)
+    scheduled = timeit.default_timer()
+    for step in range(1, steps + 1):
+        scheduler.run(now + max_delay * step / steps)
+    done = timeit.default_timer()
+    assert len(scheduler) == 0
+    return scheduled - start, done - scheduled
+
+
+def bench_events(args):
+    print('{} events, delays up to {}s, run {} times'.format(
+        args.events, args.max_delay, args.steps))
+    for name, scheduler_cls in SCHEDULERS.items():
+        results = []
+        for _ in range(args.repeat):
+            events = new_events(args.events, args.max_delay, args.seed)
+            results.append(time_scheduler(scheduler_cls, events,
+                                          args.max_delay, args.steps))
+        schedule, run = min(results, key=sum)
+        print('{:>8}: schedule {:.2f}us, run {:.2f}us per event'.format(
+            name, 1e6 * schedule / args.events, 1e6 * run / args.events))
+
+
+def new_coords(count, seed):
+    rnd = random.Random(seed)
+    side = int(count ** 0.5) // 10 + 1
+    coords = []
+    for _ in range(count):
+        coord = SystemCoord()
+        coord.sector = (rnd.randrange(side), rnd.randrange(side))
+        coord.system = (rnd.randrange(100), rnd.randrange(100))
+        coords.append(coord)
+    return coords
+
+
+def bench_spatial(args):
+    print('{} systems, {} queries of the {} nearest systems and of the '
+          'systems within 50'.format(args.systems, args.queries, args.count))
+    coords = new_coords(args.systems, args.seed)
+    start = timeit.default_timer()
+    index = SpatialIndex(coords)
+    built = timeit.default_timer()
+    centres = random.Random(args.seed).sample(coords, args.queries)
+    for centre in centres:
+        index.nearest(centre, args.count)
+    nearest = timeit.default_timer()
+    for centre in centres:
+        index.within_radius(centre, 50)
+    within = timeit.default_timer()
+    scan_start = timeit.default_timer()
+    for centre in centres[:10]:
+        centre = index.position(centre)
+        sorted(coords, key=lambda coord: sum(
+            (a - b) ** 2 for a, b in zip(centre, index.position(coord))))
+    scan = (timeit.default_timer() - scan_start) / min(10, len(centres))
+    print('build {:.2f}s, nearest {:.2f}ms, within {:.2f}ms, full scan '
+          '{:.2f}ms per query'.format(
+              built - start, 1e3 * (nearest - built) / args.queries,
+              1e3 * (within - nearest) / args.queries, 1e3 * scan))
+
+
+BENCHMARKS = {'events': bench_events, 'spatial': bench_spatial}
+
+
+def main():
+    args = parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+def parse_args():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'benchmark', choices=sorted(BENCHMARKS),
+        help='The benchmark to run.')
+    parser.add_argument(
+        '--events', default=200000, type=int, dest='events',
+        help='The number of delayed events to schedule. [default: 200000]')
+    parser.add_argument(
+        '--max-delay', default=3600.0, type=float, dest='max_delay',
+        help='The longest delay of an event in seconds. [default: 3600]')
+    parser.add_argument(
+        '--steps', default=1000, type=int, dest='steps',
+        help='How many times the event queue is run. [default: 1000]')
+    parser.add_argument(
+        '--systems', default=200000, type=int, dest='systems',
+        help='The number of systems to index. [default: 200000]')
+    parser.add_argument(
+        '--queries', default=1000, type=int, dest='queries',
+        help='The number of spatial queries. [default: 1000]')
+    parser.add_argument(
+        '--count', default=10, type=int, dest='count',
+        help='How many nearest systems to find. [default: 10]')
+    parser.add_argument(
+        '--repeat', default=3, type=int, dest='repeat',
+        help='The best of this many runs is reported. [default: 3]')
+    parser.add_argument(
+        '--seed', default=0, type=int, dest='seed',
+        help='The seed of the random delays. [default: 0]')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
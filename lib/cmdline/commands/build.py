@@ -14,6 +14,7 @@
 
 from argparse import ArgumentParser
 
+from .. import format_object
 from .base import CommandMixin
 
 
@@ -26,10 +27,18 @@ class Build(CommandMixin):
         if not opts.building_type:
             print('No building type provided. Listing buildings that can '
                   'be constructed.\n')
+            planet = self.current_object[1]
             buildings = []
-            for bld, level in self.current_object[1].get_available_buildings():
+            for bld, level in planet.get_available_buildings():
                 buildings.append("- {}: lvl {}".format(bld.name, level))
             print('  ' + '\n  '.join(buildings))
+            upcoming = []
+            for bld, level, seconds in planet.get_upcoming_buildings():
+                upcoming.append("- {}: lvl {} in {}".format(
+                    bld.name, level, format_object.duration(seconds)))
+            if upcoming:
+                print('\nAffordable later at the current rates:\n')
+                print('  ' + '\n  '.join(upcoming))
         else:
             result = self.current_object[1].build(opts.building_type)
             if result:
@@ -58,7 +58,8 @@ def _planet_available_buildings(_engine, _planet, verbose=None):
     msg = "%s: %s\n" % (_coord, _planet.name)
     msg += ''.join('\n  - %s: %s\n%s' %
                    (bld.name, lvl,
-                    indent(str(bld(lvl).requirements.resources), '    - '))
+                    indent(str(bld.level_requirements(lvl).resources),
+                           '    - '))
                    for bld, lvl in avail)
     return msg
 
@@ -73,6 +74,19 @@ def planet_available_buildings(_engine, _planet, verbose=None):
     return _planet_available_buildings(_engine, _planet, verbose)
 
 
+def duration(seconds):
+    """Format a number of seconds like "1d 2h 3m 4s"."""
+    seconds = int(round(seconds))
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            parts.append('{}{}'.format(seconds // size, unit))
+            seconds %= size
+    if seconds or not parts:
+        parts.append('{}s'.format(seconds))
+    return ' '.join(parts)
+
+
 def system(_system, _coord=None):
     msg = "%s planet system"
     if _coord is not None:
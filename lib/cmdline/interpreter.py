@@ -16,12 +16,17 @@ import sys
 from cmd import Cmd
 from logging import debug
 
+from lib import model
+
 from . import ui
 from .commands import Quit, Debug, List, Cd, Build, User
 
 
 class SpaceCmdInterpreter(Cmd, Quit, Debug, List, Cd, Build, User):
-    def __init__(self, engine, debug=None):
+    # commands that can change the game and are journaled when enabled
+    journaled_commands = ('build', 'user')
+
+    def __init__(self, engine, debug=None, journal=None):
         super(SpaceCmdInterpreter, self).__init__()
         self.engine = engine
         self.prompt = 'space> '
@@ -29,6 +34,7 @@ class SpaceCmdInterpreter(Cmd, Quit, Debug, List, Cd, Build, User):
         self.undoc_header = 'Alias Commands'
         self.debug = False if debug is None else debug
         self.current_object = None
+        self.journal = False if journal is None else journal
 
     def start(self):
         try:
@@ -53,10 +59,20 @@ class SpaceCmdInterpreter(Cmd, Quit, Debug, List, Cd, Build, User):
             self.debug_post_mortem()
         finally:
             try:
-                self.engine.save(self.current_object)
+                self.engine.save(self.current_object, incremental=True)
             except:
                 self.debug_post_mortem()
 
+    def onecmd(self, line):
+        # the game objects are updated once per command
+        with model.update.UpdateEpoch():
+            return super(SpaceCmdInterpreter, self).onecmd(line)
+
+    def postcmd(self, stop, line):
+        if self.journal and line.split(' ', 1)[0] in self.journaled_commands:
+            self.engine.journal(line, self.current_object)
+        return stop
+
     def start_new_game(self):
         if self.debug and ui.input_bool('Create test game state?'):
             self.engine.new_game(self.engine.mock_new_game_info_cb)
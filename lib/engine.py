@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 import os
+import random
 from logging import debug
 
 from .cmdline.interpreter import SpaceCmdInterpreter
 from . import model
+from . import storage
 
 
 class SpaceEngine(model.ModelQueryMixin):
@@ -26,49 +27,124 @@ class SpaceEngine(model.ModelQueryMixin):
         self.opts = opts
         self.user = None
         self.galaxy = None
+        # the storage backend the game was loaded with, see get_storage
+        self.storage = None
+        self.events = self._new_scheduler()
         model.update.delayed_event_trigger.CALLABLE = (
             self.execute_delayed_events)
 
     def __repr__(self):
-        return "{}(save file: {}, user: {}, galaxy: {})".format(
+        return "{}(save file: {}, user: {}, galaxy: {}, events: {})".format(
             self.__class__.__name__, self.save_file, repr(self.user),
-            repr(self.galaxy))
+            repr(self.galaxy), repr(self.events))
 
     def __getstate__(self):
         user_state = None if self.user is None else self.user.__getstate__()
         gxy_state = None if self.galaxy is None else self.galaxy.__getstate__()
-        return (self.save_file, user_state, gxy_state)
+        return (self.save_file, user_state, gxy_state,
+                self.events.__getstate__())
 
     def __setstate__(self, state):
-        (self.save_file, user_state, galaxy_state) = state
+        # saves from before delayed events were saved have no events
+        (self.save_file, user_state, galaxy_state) = state[:3]
+        self.events.__setstate__(state[3] if len(state) > 3 else [])
         self.user = None
         self.galaxy = None
         if user_state is not None:
             self.user = model.User(name='')
             self.user.__setstate__(user_state)
         if galaxy_state is not None:
-            self.galaxy = model.Galaxy()
+            self.galaxy = self._new_galaxy()
             self.galaxy.__setstate__(galaxy_state)
 
+    def _get_opt(self, name, opt_type):
+        """Retrieve an optional command line option of the given type."""
+        value = getattr(self.opts, name, None)
+        return value if isinstance(value, opt_type) else None
+
+    def _get_int_opt(self, name):
+        return self._get_opt(name, int)
+
+    def _new_galaxy(self, seed=None, store=None):
+        ledger = None
+        if self._get_opt('resource_ledger', bool):
+            ledger = model.ResourceLedger()
+        return model.Galaxy(
+            seed=seed, max_resident=self._get_int_opt('max_resident'),
+            store=store, ledger=ledger)
+
+    def _new_scheduler(self):
+        name = self._get_opt('event_queue', str)
+        return model.SCHEDULERS[name or 'heap']()
+
+    def get_storage(self):
+        """The storage backend used for saving.
+
+        This is the backend chosen on the command line, otherwise the one the
+        game was loaded with, otherwise JSON.
+        """
+        name = self._get_opt('storage', str)
+        if name is None:
+            name = (storage.JsonStorage.name if self.storage is None
+                    else self.storage.name)
+        if self.storage is not None and self.storage.name != name:
+            # the save file is about to be overwritten in another format
+            if self.galaxy is not None:
+                self.galaxy.set_store(None)
+            self.storage.close()
+            self.storage = None
+        if self.storage is None:
+            self.storage = storage.get_storage(name)
+        self.storage.configure(self.opts)
+        return self.storage
+
     def load(self):
         '''Load game state directly. Useful when used on the interpreter'''
         debug('Loading saved game')
         if not os.path.exists(self.save_file):
             debug('No save file to load.')
             raise FileNotFoundError('No save file to load.')
-        with open(self.save_file, 'r') as sf:
-            state = json.load(sf)
-            self.__setstate__(state[1])
-            return state[0]
+        self.storage = storage.detect_storage(self.save_file)
+        debug('Detected {} save file'.format(self.storage.name))
+        self.storage.configure(self.opts)
+        return self.storage.load(self)
+
+    def save(self, current_object=None, incremental=False):
+        """Save the game.
 
-    def save(self, current_object=None):
+        An incremental save only writes the model objects that are dirty when
+        the storage backend supports it.
+        """
         debug('Saving game')
-        with open(self.save_file, 'w') as fd:
-            current_obj_state = None
-            if current_object:
-                current_obj_state = current_object[1].name
-            state = (current_obj_state, self.__getstate__())
-            json.dump(state, fd)
+        self.get_storage().save(self, self._current_obj_name(current_object),
+                                incremental=incremental)
+        self._mark_clean()
+
+    def journal(self, command, current_object=None):
+        """Durably record the changes made by a mutating command.
+
+        Journaled changes are restored by load even if the game is not saved
+        again before exiting, so saves can be less frequent.
+        """
+        debug('Journaling command: {}'.format(command))
+        self.get_storage().journal(
+            self, self._current_obj_name(current_object), command)
+        self._mark_clean()
+
+    def export_snapshot(self, filename):
+        """Write a read only snapshot of the galaxy for analysis, see
+        lib.storage.GalaxySnapshot."""
+        debug('Exporting galaxy snapshot to {}'.format(filename))
+        storage.export_snapshot(self, filename)
+
+    @staticmethod
+    def _current_obj_name(current_object):
+        return current_object[1].name if current_object else None
+
+    def _mark_clean(self):
+        for obj in (self.user, self.galaxy, self.events):
+            if obj is not None:
+                obj.mark_clean()
 
     def _system_callback(self, coords):
         return self.galaxy.system(coords)
@@ -81,7 +157,11 @@ class SpaceEngine(model.ModelQueryMixin):
             home_planet)
         """
         try:
-            self.galaxy = model.Galaxy()
+            seed = self._get_int_opt('seed')
+            if seed is None:
+                seed = random.getrandbits(32)
+            self.galaxy = self._new_galaxy(seed)
+            self.events.clear()
             self.user = model.User(*new_game_info_cb(self._system_callback))
             system = self.galaxy.system(self.user.planets[0])
             planet = system.planets[int(self.user.planets[0].planet)]
@@ -97,7 +177,14 @@ class SpaceEngine(model.ModelQueryMixin):
         return (name, coord)
 
     def run(self):
-        SpaceCmdInterpreter(self, self.opts.debug).start()
+        snapshot_file = self._get_opt('snapshot_file', str)
+        if snapshot_file is not None:
+            self.load()
+            self.export_snapshot(snapshot_file)
+            return
+        SpaceCmdInterpreter(self, self.opts.debug,
+                            journal=self._get_opt('journal', bool)).start()
 
     def execute_delayed_events(self):
         debug('delayed actions happening')
+        self.events.run(model.update.current_time())
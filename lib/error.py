@@ -31,3 +31,7 @@ class ModelObjectError(Exception):
 
 class UserInputError(Exception):
     pass
+
+
+class SaveFileError(Exception):
+    pass
@@ -17,29 +17,41 @@
 # order imports by least dependent to most dependent
 
 from .coord import Coord, SystemCoord
+from .store import SystemStore, ShelveSystemStore
+from .spatial import SpatialIndex
 from .resources import (Resources, ALL_RESOURCES, ORE, METAL, THORIUM,
                         HYDROCARBON, DEUTERIUM, SUN, ELECTRICITY, TRADE_RATIO,
                         NotSufficientResourcesError)
+from .ledger import ResourceLedger, LedgerResources
 from .building import (Mine, SolarPowerPlant, ALL_BUILDINGS, get_building,
-                       get_all_building_names, get_all_building_abbr)
+                       get_all_building_names, get_all_building_abbr,
+                       register_building, BuildingList)
 from .planet import Planet
 from .system import System
 from .galaxy import Galaxy
 from .user import User
+from .scheduler import EventScheduler, TimingWheelScheduler, SCHEDULERS
 from .query import ModelQueryMixin
 
 
 __all__ = [Coord, SystemCoord, ]
 
+__all__.extend([SystemStore, ShelveSystemStore])
+__all__.append(SpatialIndex)
+
 __all__.extend([Resources, ALL_RESOURCES, ORE, METAL, THORIUM,
                 HYDROCARBON, DEUTERIUM, SUN, ELECTRICITY,
                 TRADE_RATIO, NotSufficientResourcesError])
 
+__all__.extend([ResourceLedger, LedgerResources])
+
 __all__.extend([Mine, SolarPowerPlant, ALL_BUILDINGS, get_building,
-                get_all_building_names, get_all_building_abbr])
+                get_all_building_names, get_all_building_abbr,
+                register_building, BuildingList])
 
 __all__.append(Planet)
 __all__.append(System)
 __all__.append(Galaxy)
 __all__.append(User)
+__all__.extend([EventScheduler, TimingWheelScheduler, SCHEDULERS])
 __all__.append(ModelQueryMixin)
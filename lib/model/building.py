@@ -14,12 +14,46 @@
 
 from math import log10
 from logging import debug
+from types import MappingProxyType
 
-from lib.error import ObjectNotFound
+from lib.error import ObjectNotFound, ModelObjectError
 
 from .resources import Resources
 
 
+# the building types in the order they were registered
+ALL_BUILDINGS = []
+# lower case class name, name and abbreviation: building type
+_BUILDING_REGISTRY = {}
+
+
+def register_building(cls):
+    """Class decorator to make a building type available to the game.
+
+    The type is added to ALL_BUILDINGS and can be looked up by get_building
+    using its class name, name or abbreviation in any case.
+
+    Requirements are read from the shared per level tables, which are built
+    from _requirements. Overriding the requirements property is not
+    supported and raises a ModelObjectError.
+    """
+    if cls.requirements is not Building.requirements:
+        raise ModelObjectError(
+            'Building type {} overrides requirements, override _requirements '
+            'instead.'.format(cls.__name__))
+    keys = set(key.lower() for key in (cls.__name__, cls.name, cls.abbr))
+    for key in keys:
+        existing = _BUILDING_REGISTRY.get(key)
+        if existing is not None and existing is not cls:
+            raise ModelObjectError(
+                'Building type {} cannot be registered as "{}", it is used '
+                'by {}.'.format(cls.__name__, key, existing.__name__))
+    if cls not in ALL_BUILDINGS:
+        ALL_BUILDINGS.append(cls)
+    _BUILDING_REGISTRY.update((key, cls) for key in keys)
+    return cls
+
+
 def get_all_building_names():
     return [cls.name for cls in ALL_BUILDINGS]
 
@@ -31,17 +65,13 @@ def get_all_building_abbr():
 def get_building(building_name, level=None):
     if isinstance(building_name, type):
         building_name = building_name.__name__
-    debug('getting building type %s, lvl %s' % (building_name, level))
-    for building in ALL_BUILDINGS:
-        if (building.__name__.lower() == building_name.lower() or
-                building.name.lower() == building_name.lower() or
-                building.abbr.lower() == building_name.lower()):
-            if level is None:
-                return building
-            else:
-                return building(level)
-    else:
+    building = _BUILDING_REGISTRY.get(building_name.lower())
+    if building is None:
+        debug('unknown building type %s', building_name)
         raise ObjectNotFound(name=building_name)
+    if level is None:
+        return building
+    return building(level)
 
 
 class BuildingRequirements(object):
@@ -74,17 +104,36 @@ class BuildingRequirements(object):
             ret_val += "\nBuildings: {}".format(self.buildings)
         return ret_val
 
+    def frozen(self):
+        """An immutable copy to share between buildings."""
+        return BuildingRequirements(
+            resources=self.resources.frozen(),
+            research=MappingProxyType(dict(self.research)),
+            buildings=MappingProxyType(dict(self.buildings)))
+
     def __getstate__(self):
-        return (self.resources, self.research, self.buildings)
+        return (self.resources, dict(self.research), dict(self.buildings))
 
     def __setstate__(self, state):
         (self.resources, self.research, self.buildings) = state
 
 
+# building type: list of (requirements, modifier) tuples indexed by level
+_LEVEL_TABLES = {}
+
+
 class Building(object):
     name = 'Building'
     abbr = 'BLDNG'
 
+    # the highest level kept in the shared per level tables, the requirements
+    # and modifier of higher levels are calculated each time they are needed
+    max_table_level = 100
+
+    # the Planet this building is on, it is told when the building changes
+    _owner = None
+    _owner_attrs = ('level', 'under_construction')
+
     def __init__(self, level=None):
         if level is None:
             self.level = 1
@@ -92,10 +141,48 @@ class Building(object):
             self.level = level
         self.under_construction = False
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if self._owner is not None and name in self._owner_attrs:
+            self._owner.building_changed(self)
+
     def _modifier(self):
         """The building's per time unit resource production."""
         return Resources(ore=self.level)
 
+    def _requirements(self):
+        """The requirements to build the building's level."""
+        return BuildingRequirements()
+
+    @classmethod
+    def _level_entry(cls, level):
+        """The (requirements, modifier) of a level.
+
+        Levels up to max_table_level are calculated once per building type
+        and the immutable results are shared by all buildings of that type.
+        """
+        if level is None:
+            level = 1
+        if not 0 <= level <= cls.max_table_level:
+            bld = cls(level)
+            return (bld._requirements(), bld._modifier())
+        table = _LEVEL_TABLES.setdefault(cls, [])
+        while len(table) <= level:
+            bld = cls(len(table))
+            table.append((bld._requirements().frozen(),
+                          bld._modifier().frozen()))
+        return table[level]
+
+    @classmethod
+    def level_requirements(cls, level=None):
+        """The requirements to build a level of this building type."""
+        return cls._level_entry(level)[0]
+
+    @classmethod
+    def level_modifier(cls, level=None):
+        """The resource production of a level of this building type."""
+        return cls._level_entry(level)[1]
+
     def _construction_modifier(self):
         """The building's production capacity while under construction."""
         return Resources()
@@ -104,7 +191,7 @@ class Building(object):
     def modifier(self):
         if self.under_construction:
             return self._construction_modifier()
-        return self._modifier()
+        return self.level_modifier(self.level)
 
     def electricity(self, sun_energy):
         """The building's per time unit electricity production/consumption."""
@@ -112,7 +199,7 @@ class Building(object):
 
     @property
     def requirements(self):
-        return BuildingRequirements()
+        return self.level_requirements(self.level)
 
     def __repr__(self):
         return ("{}(level: {}, modifier: {}, under construction: {}"
@@ -158,17 +245,97 @@ class Building(object):
 
     @classmethod
     def are_requirements_met(cls, build_site, level=None):
-        reqs = cls(level).requirements
+        reqs = cls.level_requirements(level)
         if reqs.resources > build_site.resources:
             return False
-        for bldng in reqs.buildings:
-            if (bldng not in build_site.buildings or
-                    reqs.buildings[bldng] > build_site.buildings[bldng]):
+        return cls.are_other_requirements_met(build_site, reqs)
+
+    @staticmethod
+    def are_other_requirements_met(build_site, reqs):
+        """Are the requirements besides resources met by the build site?"""
+        for bldng, level in reqs.buildings.items():
+            existing = build_site.buildings.get(bldng)
+            if existing is None or existing.level < level:
                 return False
         # TODO: implement research requirements here
         return True
 
 
+class BuildingList(list):
+
+    """The buildings of a planet, in the order they were built.
+
+    Buildings can also be looked up by type through an index that is rebuilt
+    after the list changes. The owner is told about changes made to the list
+    in place, just like about changes to its buildings.
+    """
+
+    def __init__(self, buildings=(), owner=None):
+        super().__init__(buildings)
+        self._owner = owner
+        # building type: position of its first building
+        self._index = None
+        self._adopt()
+
+    def _adopt(self):
+        if self._owner is not None:
+            for bld in self:
+                bld._owner = self._owner
+
+    def _changed(self, reindex=True):
+        if reindex:
+            self._index = None
+        self._adopt()
+        if self._owner is not None:
+            self._owner.building_changed(None)
+
+    def _position(self, building_type):
+        if self._index is None:
+            self._index = {}
+            for position, bld in enumerate(self):
+                self._index.setdefault(type(bld), position)
+        return self._index.get(building_type)
+
+    def get(self, building_type):
+        """The building of the given type, name or abbreviation, or None."""
+        if not isinstance(building_type, type):
+            building_type = get_building(building_type)
+        position = self._position(building_type)
+        return None if position is None else self[position]
+
+    def replace(self, building):
+        """Replace the building of the same type or add a new one."""
+        position = self._position(type(building))
+        if position is None:
+            self.append(building)
+        else:
+            self[position] = building
+
+    def __setitem__(self, key, value):
+        reindex = (not isinstance(key, int) or
+                   type(self[key]) is not type(value))
+        super().__setitem__(key, value)
+        self._changed(reindex)
+
+
+def _list_mutator(name):
+    method = getattr(list, name)
+
+    def mutator(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    mutator.__name__ = name
+    return mutator
+
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort',
+              'reverse', '__delitem__', '__iadd__', '__imul__'):
+    setattr(BuildingList, _name, _list_mutator(_name))
+
+
+@register_building
 class Mine(Building):
     name = 'Mine'
     abbr = 'Mn'
@@ -179,12 +346,12 @@ class Mine(Building):
     def electricity(self, sun_energy):
         return -1 * pow(self.level, 2)
 
-    @property
-    def requirements(self):
+    def _requirements(self):
         return BuildingRequirements(resources=Resources(
             ore=10+(2*(-1+self.level)), metal=-10+(5*(1+self.level))))
 
 
+@register_building
 class SolarPowerPlant(Building):
     name = 'Solar Power Plant'
     abbr = 'SPP'
@@ -195,10 +362,6 @@ class SolarPowerPlant(Building):
     def electricity(self, sun_energy):
         return 10 * abs(log10(sun_energy)) * self.level
 
-    @property
-    def requirements(self):
+    def _requirements(self):
         return BuildingRequirements(resources=Resources(
             ore=10+(5*self.level), metal=50+(6*self.level)))
-
-
-ALL_BUILDINGS = [Mine, SolarPowerPlant]
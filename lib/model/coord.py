@@ -13,60 +13,138 @@
 # limitations under the License.
 
 
+def _split(value):
+    """The (sector, system) ints of a "<sector>.<system>" string.
+
+    The sign of a value in sector -0, e.g. "-0.5", is kept on the system so
+    it stays apart from "0.5".
+    """
+    sector, _, system = str(value).partition('.')
+    sector, negative = int(sector), sector.strip().startswith('-')
+    system = int(system or 0)
+    if sector == 0 and negative:
+        system = -system
+    return sector, system
+
+
+def _join(sector, system):
+    """The "<sector>.<system>" string of the ints returned by _split."""
+    if system < 0:
+        return '-0.{}'.format(-system)
+    return '{}.{}'.format(sector, system)
+
+
 class BaseCoord(object):
-    def __init__(self, x=None, y=None):
+
+    """A location in the galaxy.
+
+    The sector and system parts of x and y, and the planet of a Coord, are
+    kept as a tuple of ints that is compared and hashed directly. The hash is
+    updated whenever a part changes. x and y are still available in their
+    "<sector>.<system>" string form, which is also the saved state. Only a
+    coord in sector -0 has a negative system part.
+    """
+
+    __slots__ = ('_key', '_hash')
+
+    def __init__(self, x=None, y=None, *extra):
         if x is None:
             x = 0
         if y is None:
             y = 0
-        self.x = str(float(x))
-        self.y = str(float(y))
+        sec_x, sys_x = _split(float(x))
+        sec_y, sys_y = _split(float(y))
+        self._set_key((sec_x, sec_y, sys_x, sys_y) + extra)
+
+    @classmethod
+    def _from_key(cls, key):
+        coord = cls.__new__(cls)
+        coord._set_key(key)
+        return coord
+
+    def _set_key(self, key):
+        self._key = key
+        self._hash = hash(key)
+
+    def _replace(self, *changes):
+        """Change parts of the key, given as (position, value) pairs."""
+        key = list(self._key)
+        for position, value in changes:
+            key[position] = int(value)
+        for axis in (0, 1):
+            if key[axis] != 0 and key[axis + 2] < 0:
+                key[axis + 2] = -key[axis + 2]  # the sign is the sector's
+        self._set_key(tuple(key))
+
+    @property
+    def x(self):
+        return _join(self._key[0], self._key[2])
 
-        # attributes that contribute to equality when comparing two Coords
-        self._eq_attrs = ['x', 'y']
+    @x.setter
+    def x(self, value):
+        sec_x, sys_x = _split(value)
+        self._replace((0, sec_x), (2, sys_x))
+
+    @property
+    def y(self):
+        return _join(self._key[1], self._key[3])
+
+    @y.setter
+    def y(self, value):
+        sec_y, sys_y = _split(value)
+        self._replace((1, sec_y), (3, sys_y))
 
     @property
     def sector(self):
-        return (int(self.x.split('.')[0]),
-                int(self.y.split('.')[0]))
+        return self._key[0:2]
 
     @sector.setter
     def sector(self, value):
-        sec_x = str(int(value[0]))
-        sec_y = str(int(value[1]))
-        self.x = '.'.join([sec_x, str(self.x).split('.')[1]])
-        self.y = '.'.join([sec_y, str(self.y).split('.')[1]])
+        self._replace((0, value[0]), (1, value[1]))
 
     @property
     def system(self):
-        return (int(self.x.split('.')[1]),
-                int(self.y.split('.')[1]))
+        return self._key[2:4]
 
     @system.setter
     def system(self, value):
-        sys_x = str(int(value[0]))
-        sys_y = str(int(value[1]))
-        self.x = '.'.join([str(self.x).split('.')[0], sys_x])
-        self.y = '.'.join([str(self.y).split('.')[0], sys_y])
+        self._replace((2, value[0]), (3, value[1]))
+
+    def system_coord(self):
+        """The SystemCoord of the system at this location."""
+        return SystemCoord._from_key(self._key[:4])
 
     def __eq__(self, other):
-        return all(getattr(self, attr) == getattr(other, attr)
-                   for attr in self._eq_attrs)
+        if not isinstance(other, BaseCoord):
+            return NotImplemented
+        return self._key == other._key
 
     def __ne__(self, other):
-        return not self.__eq__(other)
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
 
     def __hash__(self):
-        return hash(tuple(getattr(self, attr) for attr in self._eq_attrs))
+        return self._hash
 
 
 class Coord(BaseCoord):
+
+    __slots__ = ()
+
     def __init__(self, x=None, y=None, planet=None):
         if planet is None:
             planet = 0
-        self.planet = str(int(planet))
-        super().__init__(x, y)
-        self._eq_attrs.append('planet')
+        super().__init__(x, y, int(planet))
+
+    @property
+    def planet(self):
+        return str(self._key[4])
+
+    @planet.setter
+    def planet(self, value):
+        self._replace((4, value))
 
     def __repr__(self):
         return "{}({}, {}, {})".format(self.__class__.__name__, self.x,
@@ -79,10 +157,16 @@ class Coord(BaseCoord):
         return (self.x, self.y, self.planet)
 
     def __setstate__(self, state):
-        self.x, self.y, self.planet = state
+        x, y, planet = state
+        sec_x, sys_x = _split(x)
+        sec_y, sys_y = _split(y)
+        self._set_key((sec_x, sec_y, sys_x, sys_y, int(planet)))
 
 
 class SystemCoord(BaseCoord):
+
+    __slots__ = ()
+
     def __init__(self, x=None, y=None):
         super().__init__(x, y)
 
@@ -96,4 +180,7 @@ class SystemCoord(BaseCoord):
         return (self.x, self.y)
 
     def __setstate__(self, state):
-        self.x, self.y = state
+        x, y = state
+        sec_x, sys_x = _split(x)
+        sec_y, sys_y = _split(y)
+        self._set_key((sec_x, sec_y, sys_x, sys_y))
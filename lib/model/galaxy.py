@@ -12,31 +12,203 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import defaultdict
+from random import Random
 from logging import debug
+from collections import OrderedDict
+
+from lib.namegen import ForbiddenWords
 
 from .system import System
 from .coord import SystemCoord
+from .store import ShelveSystemStore
+from .spatial import SpatialIndex
 
 
 class Galaxy(object):
-    def __init__(self):
-        self._systems = defaultdict(System)
+    def __init__(self, seed=None, planet_names=None, max_resident=None,
+                 store=None, ledger=None):
+        """
+        :param seed: When not None, every system is a pure function of the
+            seed and its SystemCoord. Systems can then be regenerated on
+            demand so only the systems that changed are saved. Without a seed
+            systems are random and all of them are saved.
+        :param planet_names: The lib.namegen.ForbiddenWords registry used to
+            keep planet names unique across the galaxy. For very large
+            galaxies a lib.namegen.BloomForbiddenWords can be used instead.
+            Seeded galaxies only keep planet names unique per system.
+        :param max_resident: The maximum number of systems kept in memory.
+            When exceeded, the least recently used systems are evicted. None
+            means there is no limit.
+        :param store: A lib.model.store.SystemStore that evicted systems are
+            spilled to and reloaded from. Defaults to a temporary
+            ShelveSystemStore when max_resident is set.
+        :param ledger: A lib.model.ledger.ResourceLedger that holds the
+            resources of every resident planet.
+
+        Systems that are not pristine (i.e. owned or modified) are pinned and
+        never evicted. Pristine systems of a seeded galaxy are dropped rather
+        than spilled since they can be regenerated.
+
+        The range and nearest system queries cover the systems the galaxy
+        has generated or loaded, whether they are resident or in the store.
+        """
+        self.seed = seed
+        self.planet_names = planet_names
+        if self.planet_names is None:
+            self.planet_names = ForbiddenWords()
+        self.max_resident = max_resident
+        self.ledger = ledger
+        self._store = store
+        if self._store is None and self.max_resident is not None:
+            self._store = ShelveSystemStore()
+        # resident systems
+        self._systems = {}
+        # coords of the resident systems that may be evicted, in least to
+        # most recently used order. Systems found to be pinned by _evict are
+        # left out until they are used again.
+        self._lru = OrderedDict()
+        # coords of systems that were spilled to the store while dirty
+        self._dirty_coords = set()
+        # every system that was resident, the coords of the store are added
+        # by the first range or nearest system query
+        self._index = SpatialIndex()
+        self._store_indexed = False
 
     def system(self, coord):
-        system_coord = SystemCoord(coord.x, coord.y)
-        debug('looking up system: %s' % system_coord)
-        return self._systems[system_coord]
+        system_coord = coord.system_coord()
+        debug('looking up system: %s', system_coord)
+        system = self._systems.get(system_coord)
+        if system is None:
+            system = self._load_system(system_coord)
+            self._add_resident(system_coord, system)
+            self._evict(keep=system_coord)
+        else:
+            self._lru[system_coord] = None
+            self._lru.move_to_end(system_coord)
+        return system
+
+    def set_store(self, store):
+        """Replace the backing store, moving any stored systems to it.
+
+        If store is None the stored systems are made resident, unless
+        max_resident is set in which case a new ShelveSystemStore is used.
+        The replaced store is closed.
+        """
+        old_store = self._store
+        if store is None and self.max_resident is not None:
+            store = ShelveSystemStore()
+        self._store = store
+        self._store_indexed = False
+        if old_store is None:
+            return
+        for coord, system_state in old_store.items():
+            if coord in self._systems:
+                continue
+            if store is None:
+                self._add_resident(coord, System.from_state(system_state))
+            else:
+                store[coord] = system_state
+        if old_store is not store:
+            old_store.close()
+
+    def _add_resident(self, coord, system):
+        self._systems[coord] = system
+        self._lru[coord] = None
+        self._index.add(coord)
+        if self.ledger is not None:
+            self.ledger.add_system(system)
+
+    def _load_system(self, coord):
+        if self._store is not None and coord in self._store:
+            debug('reloading stored system: %s' % coord)
+            return System.from_state(self._store[coord])
+        return self.generate_system(coord)
+
+    def _evict(self, keep=None):
+        """Evict least recently used systems until under max_resident.
+
+        The system at coord "keep" is never evicted, it is about to be used.
+        Pinned systems are taken out of the LRU order so they are not checked
+        again by every call.
+        """
+        if self.max_resident is None:
+            return
+        excess = len(self._systems) - self.max_resident
+        while excess > 0 and self._lru:
+            coord, _ = self._lru.popitem(last=False)
+            if coord == keep:  # the most recently used, nothing else left
+                self._lru[coord] = None
+                break
+            system = self._systems[coord]
+            if not system.is_pristine():
+                continue  # pinned
+            del self._systems[coord]
+            if self.ledger is not None:
+                self.ledger.remove_system(system)
+            excess -= 1
+            if self.seed is None:
+                debug('spilling system: %s' % coord)
+                if system.is_dirty():
+                    self._dirty_coords.add(coord)
+                self._store[coord] = system.__getstate__()
+
+    def resident_planets(self):
+        """Yield the planets of every resident system."""
+        for system in self._systems.values():
+            for planet in system.planets:
+                yield planet
+
+    def system_seed(self, coord):
+        """The seed of the system at coord in a seeded galaxy."""
+        return '{}:{}:{}'.format(self.seed, *coord.__getstate__())
+
+    def generate_system(self, coord):
+        """Generate a new system for the SystemCoord coord.
+
+        In a seeded galaxy this always returns the same system for a given
+        coord, regardless of what other systems have been generated.
+        """
+        if self.seed is None:
+            return System(planet_names=self.planet_names)
+        return System(planet_names=self.planet_names,
+                      rng=Random(self.system_seed(coord)))
 
     def planet(self, coord):
         system = self.system(coord)
-        debug('looking up planet: %s' % coord)
+        debug('looking up planet: %s', coord)
         return system.planets[int(coord.planet)]
 
+    @property
+    def index(self):
+        """The SpatialIndex of the coords of every known system."""
+        if not self._store_indexed:
+            if self._store is not None:
+                self._index.update(self._store.coords())
+            self._store_indexed = True
+        return self._index
+
+    def systems_within(self, coord, radius):
+        """SystemCoords at most radius systems away from coord, nearest
+        first."""
+        return self.index.within_radius(coord, radius)
+
+    def systems_in_rectangle(self, corner, opposite_corner):
+        """SystemCoords inside the rectangle between two coords."""
+        return self.index.within_rectangle(corner, opposite_corner)
+
+    def nearest_systems(self, coord, count=1):
+        """The SystemCoords of the count systems nearest to coord, including
+        the system at coord itself."""
+        return self.index.nearest(coord, count)
+
     def __repr__(self):
         systems = ','.join('{}: {}'.format(coord, repr(system))
                            for coord, system in self._systems.items())
-        return "{}(systems: [{}])".format(self.__class__.__name__, systems)
+        return ("{}(seed: {}, planet names: {}, max resident: {}, "
+                "ledger: {}, systems: [{}])".format(
+                    self.__class__.__name__, self.seed,
+                    repr(self.planet_names), self.max_resident,
+                    repr(self.ledger), systems))
 
     def __str__(self):
         systems = '\n'.join('{}: {}'.format(coord, str(system))
@@ -44,19 +216,77 @@ class Galaxy(object):
         systems.replace('\n', '\n    ')  # indent the systems a bit
         return '{}: systems:\n{}'.format(self.__class__.__name__, systems)
 
+    def system_states(self, exclude_store=None):
+        """Yield (SystemCoord, system state) for every system to be saved.
+
+        Resident systems take precedence over stale copies in the store.
+        Systems in the store are skipped if it is exclude_store, which lets a
+        storage backend that also serves as the galaxy's store skip the
+        systems it already holds.
+        """
+        for coord, system in self._systems.items():
+            if self.seed is not None and system.is_pristine():
+                continue  # regenerated from the seed when needed
+            yield coord, system.__getstate__()
+        if self._store is not None and self._store is not exclude_store:
+            for coord, system_state in self._store.items():
+                if coord not in self._systems:
+                    yield coord, system_state
+
+    def dirty_system_states(self, exclude_store=None):
+        """Yield (SystemCoord, system state) for systems changed since the
+        last mark_clean call.
+
+        This is the subset of system_states that an incremental save needs to
+        write. Systems in the store are skipped if it is exclude_store.
+        """
+        for coord, system in self._systems.items():
+            if self.seed is not None and system.is_pristine():
+                continue
+            if system.is_dirty() or coord in self._dirty_coords:
+                yield coord, system.__getstate__()
+        if self._store is not None and self._store is not exclude_store:
+            for coord in self._dirty_coords:
+                if coord not in self._systems:
+                    yield coord, self._store[coord]
+
+    def is_dirty(self):
+        return bool(self._dirty_coords) or any(
+            system.is_dirty() for system in self._systems.values())
+
+    def mark_clean(self):
+        """Mark every system as saved."""
+        self._dirty_coords = set()
+        for system in self._systems.values():
+            system.mark_clean()
+
     def __getstate__(self):
-        systems = []
-        for coord in dict(self._systems):
-            systems.append((coord.__getstate__(),
-                            self._systems[coord].__getstate__()))
-        return (systems,)
+        systems = [(coord.__getstate__(), system_state)
+                   for coord, system_state in self.system_states()]
+        return (systems, self.seed)
 
     def __setstate__(self, state):
+        """Restore a saved galaxy.
+
+        The systems in the state may be any iterable, e.g. a generator that
+        streams them from a save file. With max_resident set, systems are
+        evicted as they are restored.
+        """
         systems = state[0]
-        self._systems = defaultdict(System)
+        # saves from before seeded galaxies only contain the systems
+        self.seed = state[1] if len(state) > 1 else None
+        if self.ledger is not None:
+            for system in self._systems.values():
+                self.ledger.remove_system(system)
+        self._systems = {}
+        self._lru = OrderedDict()
+        self._dirty_coords = set()
+        self._index = SpatialIndex()
+        self._store_indexed = False
         for coord_state, system_state in systems:
             coord = SystemCoord()
             coord.__setstate__(coord_state)
-            sys_obj = System()
-            sys_obj.__setstate__(system_state)
-            self._systems[coord] = sys_obj
+            sys_obj = System.from_state(system_state)
+            self._add_resident(coord, sys_obj)
+            self.planet_names.update(planet.name for planet in sys_obj.planets)
+            self._evict()
@@ -0,0 +1,215 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A structure of arrays ledger for the resources of many planets.
+
+This module requires numpy, which is an optional dependency. Without numpy
+the module can still be imported but a ResourceLedger cannot be created.
+"""
+
+from time import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .resources import Resources, ALL_RESOURCES, TRADE_RATIO
+
+
+class LedgerResources(Resources):
+
+    """A Resources view into one row of a ResourceLedger.
+
+    Arithmetic on a view returns plain Resources. The trade value is not
+    cached since the ledger can change the amounts of every row at once.
+    """
+
+    __slots__ = ('_ledger', '_row')
+
+    def __init__(self, ledger, row):
+        self._ledger = ledger
+        self._row = row
+        self._trade_value = None
+        self._dirty = False
+
+    @property
+    def _values(self):
+        return self._ledger.amounts[self._row]
+
+    @property
+    def trade_value(self):
+        return float(self._values.dot(self._ledger.trade_ratios))
+
+    def values(self):
+        return self._values.tolist()
+
+    def __getstate__(self):
+        return (dict(zip(ALL_RESOURCES, self.values())), )
+
+
+class ResourceLedger(object):
+
+    """Keep the resources, rates and caps of planets in numpy arrays.
+
+    Each added planet is given a row of the amounts, rates, caps and
+    last_update arrays and its resources become a LedgerResources view into
+    the row. While a planet is in the ledger, assigning its resources, last
+    update or buildings updates its row.
+
+    Accruing income, summing trade values and finding the planets that can
+    afford a cost are then done for every planet at once.
+    """
+
+    def __init__(self, capacity=1024):
+        if numpy is None:
+            raise ImportError('The resource ledger requires numpy.')
+        width = len(ALL_RESOURCES)
+        self.amounts = numpy.zeros((capacity, width))
+        self.rates = numpy.zeros((capacity, width))
+        self.caps = numpy.zeros((capacity, width))
+        self.last_update = numpy.zeros(capacity)
+        self.trade_ratios = numpy.array(
+            [TRADE_RATIO[res] for res in ALL_RESOURCES], dtype=float)
+        # the planet of each row, None for free rows
+        self._planets = []
+        self._free_rows = []
+
+    def __repr__(self):
+        return "{}(planets: {}, capacity: {})".format(
+            self.__class__.__name__, len(self), len(self.amounts))
+
+    def __len__(self):
+        return len(self._planets) - len(self._free_rows)
+
+    def __contains__(self, planet):
+        return planet._ledger is self
+
+    def planets(self):
+        """Yield the planets in the ledger."""
+        return (planet for planet in self._planets if planet is not None)
+
+    def _grow(self):
+        capacity = 2 * len(self.amounts)
+        for name in ('amounts', 'rates', 'caps', 'last_update'):
+            array = getattr(self, name)
+            grown = numpy.zeros((capacity,) + array.shape[1:])
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, planet):
+        """Move the planet's resources into a row of the ledger."""
+        if planet in self:
+            return
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._planets)
+            self._planets.append(None)
+            if row >= len(self.amounts):
+                self._grow()
+        self._planets[row] = planet
+        resources = planet.resources
+        self.amounts[row] = resources.values()
+        self.rates[row] = planet.rates.values()
+        self.caps[row] = planet.max_resources.values()
+        self.last_update[row] = planet.last_update
+        view = LedgerResources(self, row)
+        view._dirty = resources.is_dirty()
+        # attaching to the ledger does not change the planet's state
+        object.__setattr__(planet, 'resources', view)
+        object.__setattr__(planet, '_ledger', self)
+
+    def remove(self, planet):
+        """Give the planet back its own Resources and free its row."""
+        if planet not in self:
+            return
+        row = planet.resources._row
+        resources = Resources(**dict(zip(ALL_RESOURCES,
+                                         self.amounts[row].tolist())))
+        if not planet.resources.is_dirty():
+            resources.mark_clean()
+        object.__setattr__(planet, 'resources', resources)
+        object.__setattr__(planet, '_ledger', None)
+        for array in (self.amounts, self.rates, self.caps, self.last_update):
+            array[row] = 0
+        self._planets[row] = None
+        self._free_rows.append(row)
+
+    def add_system(self, system):
+        for planet in system.planets:
+            self.add(planet)
+
+    def remove_system(self, system):
+        for planet in system.planets:
+            self.remove(planet)
+
+    def update_row(self, planet, name, value):
+        """Called by a planet in the ledger before an attribute is assigned.
+
+        Returns the value to assign instead.
+        """
+        row = planet.resources._row
+        if name == 'resources':
+            if value is not planet.resources:
+                self.amounts[row] = value.values()
+            return planet.resources
+        elif name == 'last_update':
+            self.last_update[row] = value
+        elif name == 'buildings':
+            rates = Resources()
+            for bld in value:
+                rates += bld.modifier
+            self.rates[row] = rates.values()
+        return value
+
+    def accrue(self, now=None, planets=None):
+        """Add the income earned since each planet's last update.
+
+        This is the vectorised equivalent of calling update() on every
+        planet in the ledger, or only on the given planets which must be in
+        the ledger.
+        """
+        now = time() if now is None else now
+        if planets is None:
+            rows = slice(0, len(self._planets))
+            planets = list(self.planets())
+        else:
+            planets = list(planets)
+            rows = numpy.fromiter(
+                (planet.resources._row for planet in planets), dtype=int,
+                count=len(planets))
+        elapsed = now - self.last_update[rows]
+        self.amounts[rows] = numpy.minimum(
+            self.amounts[rows] + self.rates[rows] * elapsed[:, None],
+            self.caps[rows])
+        for planet in planets:
+            planet.last_update = now
+
+    def trade_values(self):
+        """The trade value of every row, zero for free rows."""
+        return self.amounts[:len(self._planets)].dot(self.trade_ratios)
+
+    def total_trade_value(self):
+        return float(self.trade_values().sum())
+
+    def can_afford(self, cost):
+        """Return the planets whose resources are worth at least cost.
+
+        Like Building.are_requirements_met, this compares trade values
+        rather than each resource.
+        """
+        affordable = self.trade_values() >= cost.trade_value
+        return [self._planets[row] for row in numpy.flatnonzero(affordable)
+                if self._planets[row] is not None]
@@ -13,15 +13,20 @@
 # limitations under the License.
 
 from time import time
-from math import pi
+from math import pi, inf
 from logging import debug
 
 from lib.error import ModelObjectError
-from lib.namegen import NameGen
+from lib.namegen import NameGen, ForbiddenWords
 
-from .update import ResourceUpdater, delayed_event_trigger, update_trigger
-from .resources import Resources
-from .building import ALL_BUILDINGS, get_building
+from .update import (ResourceUpdater, delayed_event_trigger, update_trigger,
+                     once_per_epoch)
+from .resources import Resources, ALL_RESOURCES, TRADE_RATIO
+from .building import ALL_BUILDINGS, BuildingList, get_building
+
+# Names generated for planets that were created without a name. Planets in a
+# galaxy are named by their System instead.
+PLANET_NAMES = ForbiddenWords()
 
 
 class Planet(object):
@@ -30,12 +35,22 @@ class Planet(object):
     max_resources = Resources(ore=15e6, metal=10e6, thorium=1e6,
                               hydrocarbon=4e5, deuterium=2e5)
 
+    # the lib.model.ledger.ResourceLedger holding this planet's resources
+    _ledger = None
+    _ledger_attrs = ('resources', 'last_update', 'buildings')
+
+    # cached values of the rates and electricity properties
+    _rates = None
+    _electricity = None
+    _cache_attrs = ('buildings', 'sun_brightness', 'sun_distance')
+
     def __init__(self, name=None, emperor=None, sun_brightness=None,
                  sun_distance=None, resources=None, buildings=None,
                  last_update=None):
         self.name = name
         if self.name is None:
-            self.name = NameGen().gen_word(no_repeat=True)
+            self.name = NameGen(forbidden=PLANET_NAMES).gen_word(
+                no_repeat=True)
 
         self.emperor = emperor
 
@@ -54,12 +69,13 @@ class Planet(object):
                 'Planet: Sun Distance must be greater than 0.')
         self.sun_distance = sun_distance
 
-        self.buildings = buildings
-        if self.buildings is None:
+        if buildings is None:
             self.buildings = []
-        elif (len(self.buildings) > 0 and
-              not isinstance(self.buildings[0], tuple(ALL_BUILDINGS))):
-            self.load_buildings(self.buildings)
+        elif (len(buildings) > 0 and
+              not isinstance(buildings[0], tuple(ALL_BUILDINGS))):
+            self.load_buildings(buildings)
+        else:
+            self.buildings = buildings
 
         self.last_update = last_update
         if self.last_update is None:
@@ -70,6 +86,44 @@ class Planet(object):
                   self.name, self.sun_distance, self.sun_brightness,
                   repr(self.resources)))
 
+    def __setattr__(self, name, value):
+        # any assignment to the planet's state makes it dirty
+        if name != '_dirty':
+            object.__setattr__(self, '_dirty', True)
+        if name == 'buildings':
+            previous = self.__dict__.get('buildings')
+            if previous is not None and previous is not value:
+                previous._owner = None
+            if not isinstance(value, BuildingList) or value._owner is not self:
+                value = BuildingList(value, owner=self)
+        if self._ledger is not None and name in self._ledger_attrs:
+            value = self._ledger.update_row(self, name, value)
+        object.__setattr__(self, name, value)
+        if name in self._cache_attrs:
+            self._clear_cache()
+
+    def _clear_cache(self):
+        object.__setattr__(self, '_rates', None)
+        object.__setattr__(self, '_electricity', None)
+
+    def building_changed(self, building):
+        """Called when a building of this planet or the list is modified."""
+        object.__setattr__(self, '_dirty', True)
+        self._clear_cache()
+        if self._ledger is not None:
+            self._ledger.update_row(self, 'buildings', self.buildings)
+
+    def is_dirty(self):
+        """True if the planet changed since the last mark_clean call.
+
+        A new planet is dirty.
+        """
+        return self._dirty or self.resources.is_dirty()
+
+    def mark_clean(self):
+        self._dirty = False
+        self.resources.mark_clean()
+
     def __getstate__(self):
         """Return the save state for this planet."""
         resources = self.resources.__getstate__()
@@ -82,24 +136,39 @@ class Planet(object):
         """Restore a saved planet state."""
         (self.name, self.emperor, self.sun_brightness,
          self.sun_distance, resources, buildings, self.last_update) = state
-        self.resources = Resources().__setstate__(resources)
+        self.resources = Resources()
+        self.resources.__setstate__(resources)
         self.load_buildings(buildings)
+        self.mark_clean()
+
+    def is_pristine(self):
+        """True if the planet is unowned and has no buildings or resources.
+
+        A pristine planet is indistinguishable from a newly generated one.
+        """
+        return (self.emperor is None and not self.buildings and
+                not any(self.resources.values()))
 
     def load_buildings(self, buildings):
         """Helper method for loading buildings from save states."""
-        self.buildings = []
-        for bld, level in buildings:
-            self.buildings.append(get_building(bld)(level))
+        self.buildings = [get_building(bld)(level) for bld, level in buildings]
 
     @property
     def rates(self):
-        """Calculate the production rates of this planet."""
-        rates = Resources()
-        for bld in self.buildings:
-            rates += bld.modifier
-        return rates
+        """The production rates of this planet.
+
+        The sum is cached until the buildings change.
+        """
+        if self._rates is None:
+            rates = Resources()
+            for bld in self.buildings:
+                rates += bld.modifier
+            object.__setattr__(self, '_rates', rates)
+        # a copy, callers may modify the result in place
+        return self._rates.copy()
 
     @delayed_event_trigger
+    @once_per_epoch
     def update(self):
         """Update the state of the planet."""
         updater = ResourceUpdater(self.last_update, self.resources,
@@ -114,10 +183,7 @@ class Planet(object):
                 building, level, self.name))
             new_blding = building(level)
             self.resources -= new_blding.requirements.resources
-            # Remove existing building if exists
-            self.buildings = [blding for blding in self.buildings
-                              if not isinstance(blding, building)]
-            self.buildings.append(new_blding)
+            self.buildings.replace(new_blding)
             return True
         else:
             debug('Construction attempt failed on planet {}, not enough'
@@ -178,8 +244,7 @@ class Planet(object):
 
     @update_trigger
     def build(self, building):
-        existing = self.building(building)
-        level = 1 if not existing else existing.level + 1
+        level = self._next_level(building)
         # check if planet has resources to perform the construction
         # if so, pay the construction costs
         # mark any existing versions of the building "under construction"
@@ -196,12 +261,101 @@ class Planet(object):
               '{}'.format(self.name))
         avail = []
         for building in ALL_BUILDINGS:
-            existing = self.building(building)
-            level = 1 if not existing else existing.level + 1
+            level = self._next_level(building)
             if building.are_requirements_met(self, level):
                 avail.append((building, level))
         return avail
 
+    def _next_level(self, building):
+        existing = self.building(building)
+        return 1 if not existing else existing.level + 1
+
+    def _income_limits(self):
+        """Yield (resource, amount, rate, maximum) for each resource.
+
+        Amounts above the maximum are capped like update() would.
+        """
+        rates = self.rates
+        for res in ALL_RESOURCES:
+            maximum = self.max_resources[res]
+            yield (res, min(self.resources[res], maximum), rates[res],
+                   maximum)
+
+    def _time_until_trade_value(self, target):
+        """Seconds until the resources are worth the target trade value.
+
+        The trade value grows linearly until a resource reaches its maximum,
+        which lowers the growth rate. Returns None if the target is never
+        reached at the current rates.
+        """
+        elapsed, value, slope, caps = 0, 0, 0, []
+        for res, amount, rate, maximum in self._income_limits():
+            value += TRADE_RATIO[res] * amount
+            if rate < 0 or amount < maximum:
+                slope += TRADE_RATIO[res] * rate
+            if rate > 0 and amount < maximum:
+                caps.append(((maximum - amount) / rate,
+                             TRADE_RATIO[res] * rate))
+        for cap_time, cap_slope in sorted(caps) + [(inf, 0)]:
+            if value >= target:
+                return elapsed
+            if slope > 0:
+                reached = elapsed + (target - value) / slope
+                if reached <= cap_time:
+                    return reached
+            if cap_time == inf:
+                return None
+            value += slope * (cap_time - elapsed)
+            elapsed, slope = cap_time, slope - cap_slope
+
+    @update_trigger
+    def time_until_affordable(self, building, level=None):
+        """Seconds until the given building level can be afforded.
+
+        The level defaults to the next level of the building on the planet.
+        Returns 0 if it can be built now and None if it cannot be built by
+        waiting, because the current rates never produce enough resources or
+        requirements other than resources are not met.
+        """
+        bld_cls = get_building(building)
+        if level is None:
+            level = self._next_level(bld_cls)
+        reqs = bld_cls.level_requirements(level)
+        if not bld_cls.are_other_requirements_met(self, reqs):
+            return None
+        if not reqs.resources > self.resources:
+            return 0
+        return self._time_until_trade_value(reqs.resources.trade_value)
+
+    @update_trigger
+    def time_until_capped(self, resource=None):
+        """Seconds until the income of a resource is lost to max_resources.
+
+        Without a resource, the time until the first one is capped. Returns
+        None if that never happens at the current rates.
+        """
+        times = []
+        for res, amount, rate, maximum in self._income_limits():
+            if rate <= 0 or (resource is not None and res != resource):
+                continue
+            times.append(max(0, (maximum - amount) / rate))
+        return min(times) if times else None
+
+    @update_trigger
+    def get_upcoming_buildings(self):
+        """Which buildings can be afforded later by waiting, and when?
+
+        Returns (building, level, seconds) tuples of the buildings that
+        cannot be afforded now, soonest first.
+        """
+        upcoming = []
+        for building in ALL_BUILDINGS:
+            level = self._next_level(building)
+            seconds = self.time_until_affordable(building, level)
+            if seconds:
+                upcoming.append((building, level, seconds))
+        return sorted(upcoming, key=lambda item: item[2])
+
     def __repr__(self):
         return ("{}(name: {}, emperor: {}, sun: {}, buildings: {}, "
                 "electricity: {}, resources: {}, rates: {}, research: {}, "
@@ -212,9 +366,10 @@ class Planet(object):
                     self.last_update))
 
     def __str__(self):
+        rates = self.rates
         resources = ['  {}: {:.2F} ({:.2F})\n'.format(name,
                                                       self.resources[name],
-                                                      self.rates[name])
+                                                      rates[name])
                      for name in self.resources]
         buildings = ['  {}\n'.format(bld) for bld in self.buildings]
         buildings = ''.join([text for text in buildings
@@ -257,7 +412,10 @@ class Planet(object):
 
     @property
     def electricity(self):
-        return sum(bld.electricity(self.sun) for bld in self.buildings)
+        if self._electricity is None:
+            object.__setattr__(self, '_electricity', sum(
+                bld.electricity(self.sun) for bld in self.buildings))
+        return self._electricity
 
     @property
     def research(self):
@@ -273,8 +431,7 @@ class Planet(object):
         If an instance of the requested building type has not been built,
         return None.
         """
-        bld_cls = get_building(building_type)
-        for building in self.buildings:
-            if isinstance(building, bld_cls):
-                debug('found existing {} building'.format(building))
-                return building
+        building = self.buildings.get(building_type)
+        if building is not None:
+            debug('found existing %s building', building)
+        return building
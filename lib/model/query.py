@@ -48,3 +48,22 @@ class ModelQueryMixin(object):
     def system(self, coord):
         """Query the galaxy for a specific system."""
         return self.galaxy.system(coord)
+
+    def systems_within(self, coord, radius):
+        """Retrieve tuples of (SystemCoord, System) of the systems at most
+        radius systems away from coord, nearest first."""
+        for system_coord in self.galaxy.systems_within(coord, radius):
+            yield system_coord, self.galaxy.system(system_coord)
+
+    def systems_in_rectangle(self, corner, opposite_corner):
+        """Retrieve tuples of (SystemCoord, System) of the systems inside the
+        rectangle between two coords."""
+        for system_coord in self.galaxy.systems_in_rectangle(
+                corner, opposite_corner):
+            yield system_coord, self.galaxy.system(system_coord)
+
+    def nearest_systems(self, coord, count=1):
+        """Retrieve tuples of (SystemCoord, System) of the count systems
+        nearest to coord, nearest first."""
+        for system_coord in self.galaxy.nearest_systems(coord, count):
+            yield system_coord, self.galaxy.system(system_coord)
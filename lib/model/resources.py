@@ -12,10 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from copy import deepcopy
+from numbers import Number
 from logging import debug
-from functools import partial
-from collections import UserDict
+from collections.abc import MutableMapping
 
 ORE = 'ore'
 METAL = 'metal'
@@ -38,37 +37,114 @@ class NotSufficientResourcesError(ArithmeticError):
         self.defecit = defecit
 
 
-class Resources(UserDict):
+# the position of each resource in a Resources vector
+_ORDINALS = dict((res, ordinal) for ordinal, res in enumerate(ALL_RESOURCES))
+_TRADE_RATIOS = [float(TRADE_RATIO[res]) for res in ALL_RESOURCES]
+
+
+def _ordinal(res):
+    try:
+        return _ORDINALS[res]
+    except KeyError:
+        msg = ('Resource %s is invalid. Resources must be one of %s'
+               % (res, ALL_RESOURCES))
+        debug(msg)
+        raise KeyError(msg)
+
+
+def _values(other):
+    """The amounts of a Resources or mapping in ALL_RESOURCES order."""
+    if isinstance(other, Resources):
+        return other._values
+    return [other[res] for res in ALL_RESOURCES]
+
+
+class Resources(MutableMapping):
+
+    """A fixed size vector of resource amounts.
+
+    Amounts are kept in a list in ALL_RESOURCES order and can be accessed as
+    a mapping by resource name or as attributes. Every resource is always
+    present, so deleting or popping a resource sets it to zero and popitem
+    raises a KeyError. The arithmetic operators work element-wise with
+    another Resources or with a number.
+    """
+
+    __slots__ = ('_values', '_trade_value', '_dirty')
+
     def __init__(self, *args, **kwargs):
-        items = dict(zip(ALL_RESOURCES, [0] * len(ALL_RESOURCES)))
+        self._values = [0] * len(ALL_RESOURCES)
         for res in kwargs:
-            if res not in ALL_RESOURCES:
-                msg = ('Resource %s is invalid. Resources must be one of %s'
-                       % (res, ALL_RESOURCES))
-                debug(msg)
-                raise KeyError(msg)
-            items[res] = float(kwargs[res])
-        super(Resources, self).__init__(items)
+            self._values[_ordinal(res)] = float(kwargs[res])
+        self._trade_value = None
+        self._dirty = True
+
+    @staticmethod
+    def _from_values(values):
+        result = Resources.__new__(Resources)
+        result._values = values
+        result._trade_value = None
+        result._dirty = True
+        return result
+
+    def __getitem__(self, res):
+        return self._values[_ordinal(res)]
+
+    def __setitem__(self, res, value):
+        self._values[_ordinal(res)] = value
+        self._changed()
+
+    def __delitem__(self, res):
+        self[res] = 0
+
+    def popitem(self):
+        raise KeyError('Every resource is always present.')
+
+    def clear(self):
+        self._values[:] = [0] * len(ALL_RESOURCES)
+        self._changed()
+
+    def _changed(self):
+        self._trade_value = None
+        self._dirty = True
+
+    def __iter__(self):
+        return iter(ALL_RESOURCES)
+
+    def __len__(self):
+        return len(ALL_RESOURCES)
+
+    def values(self):
+        return list(self._values)
+
+    @property
+    def data(self):
+        """A dict copy of the amounts by resource name."""
+        return dict(zip(ALL_RESOURCES, self._values))
+
+    def is_dirty(self):
+        """True if the resources changed since the last mark_clean call."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
 
     @property
     def trade_value(self):
-        value = 0
-        for res in ALL_RESOURCES:
-            value += float(TRADE_RATIO[res]) * self[res]
-        return value
+        if self._trade_value is None:
+            self._trade_value = sum(
+                ratio * amount
+                for ratio, amount in zip(_TRADE_RATIOS, self._values))
+        return self._trade_value
 
     @property
     def has_negative(self):
-        for res in ALL_RESOURCES:
-            if self[res] < 0:
-                return True
-        return False
+        return any(amount < 0 for amount in self._values)
 
     def __repr__(self):
-        res_list = deepcopy(ALL_RESOURCES)
         return '({}, trade value: {:.2F})'.format(
-            ', '.join("{res}: {amt:.2F}".format(res=res, amt=self[res])
-                      for res in res_list),
+            ', '.join("{res}: {amt:.2F}".format(res=res, amt=amt)
+                      for res, amt in zip(ALL_RESOURCES, self._values)),
             self.trade_value)
 
     def __str__(self):
@@ -96,53 +172,78 @@ class Resources(UserDict):
         '''De Morgan's law'''
         return not self.__gt__(other)
 
+    __hash__ = None
+
     def __add__(self, other):
-        result = Resources()
-        for res in ALL_RESOURCES:
-            result[res] = self[res] + other[res]
-        return result
+        return self._from_values(
+            [a + b for a, b in zip(self._values, _values(other))])
 
     def __sub__(self, other):
-        result = Resources()
-        for res in ALL_RESOURCES:
-            result[res] = self[res] - other[res]
-        return result
+        return self._from_values(
+            [a - b for a, b in zip(self._values, _values(other))])
 
     def __mul__(self, other):
-        result = Resources()
-        for res in ALL_RESOURCES:
-            result[res] = self[res] * other[res]
-        return result
+        if isinstance(other, Number):
+            other = float(other)
+            return self._from_values([a * other for a in self._values])
+        return self._from_values(
+            [a * b for a, b in zip(self._values, _values(other))])
 
     def __truediv__(self, other):
-        result = Resources()
-        for res in ALL_RESOURCES:
-            result[res] = self[res] / other[res]
-        return result
+        if isinstance(other, Number):
+            other = float(other)
+            return self._from_values([a / other for a in self._values])
+        return self._from_values(
+            [a / b for a, b in zip(self._values, _values(other))])
+
+    def __iadd__(self, other):
+        self._values[:] = [a + b for a, b in zip(self._values, _values(other))]
+        self._changed()
+        return self
+
+    def __isub__(self, other):
+        self._values[:] = [a - b for a, b in zip(self._values, _values(other))]
+        self._changed()
+        return self
+
+    def cap(self, maximum):
+        """Limit each amount to at most the amount in maximum, in place."""
+        self._values[:] = [min(a, b)
+                           for a, b in zip(self._values, _values(maximum))]
+        self._changed()
+        return self
 
     def copy(self):
-        copy = self.__class__()
-        for attr in self:
-            copy[attr] = self[attr]
-        return copy
+        return self._from_values(self.values())
+
+    def frozen(self):
+        """An immutable copy, changing its amounts raises a TypeError."""
+        return self._from_values(tuple(self._values))
 
     def __getstate__(self):
-        return (dict((res, self[res]) for res in ALL_RESOURCES), )
+        return (dict(zip(ALL_RESOURCES, self._values)), )
 
     def __setstate__(self, state):
+        if not hasattr(self, '_values'):
+            # restored by copy or pickle without calling __init__
+            Resources.__init__(self)
         res_dict = state[0]
         for res in res_dict:
             self[res] = res_dict[res]
 
 
 # Add properties to the Resources class for each resource in ALL_RESOURCES
-for res in ALL_RESOURCES:
+def _resource_property(ordinal):
+
+    def getter(self):
+        return self._values[ordinal]
 
-    def getter(resource, self):
-        return self[resource]
+    def setter(self, value):
+        self._values[ordinal] = value
+        self._changed()
 
-    def setter(resource, self, value):
-        self.__setitem__(resource, value)
+    return property(fget=getter, fset=setter)
 
-    setattr(Resources, res, property(fget=partial(getter, res),
-                                     fset=partial(setter, res)))
+
+for res in ALL_RESOURCES:
+    setattr(Resources, res, _resource_property(_ORDINALS[res]))
@@ -0,0 +1,316 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Ordering of the delayed events that are waiting to be triggered."""
+
+import math
+import time
+import heapq
+import itertools
+from logging import debug
+from collections import OrderedDict, deque
+
+from lib.error import ModelObjectError
+
+from .update import DelayedEvent
+
+
+class EventScheduler(object):
+
+    """A priority queue of DelayedEvents keyed on their trigger_time.
+
+    Only the events that are due are looked at when the queue is run, each
+    in O(log n) time. Cancelled and rescheduled events are marked as removed
+    in the heap rather than searched for and are skipped when popped. Events
+    with the same trigger time are triggered in the order they were added.
+
+    Saving only keeps the events whose action is registered with
+    lib.model.update.event_action.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._running = False
+        self.clear()
+        self._dirty = False
+
+    def __repr__(self):
+        return "{}(pending: {}, next trigger time: {})".format(
+            self.__class__.__name__, len(self), self.next_trigger_time())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, event):
+        return event in self._entries
+
+    def __iter__(self):
+        """The pending events in the order they will be triggered."""
+        return iter([entry[2] for entry in sorted(self._entries.values())])
+
+    def schedule(self, event):
+        """Add a DelayedEvent, to be triggered at its trigger_time."""
+        if event in self._entries:
+            raise ModelObjectError(
+                'Event "{}" is already scheduled.'.format(event.descriptor))
+        # the entry's event is set to None if it is removed
+        entry = [event.trigger_time, next(self._counter), event]
+        self._entries[event] = entry
+        self._push(entry)
+        self._dirty = True
+        return event
+
+    def cancel(self, event):
+        """Remove a pending event without triggering it."""
+        entry = self._entries.pop(event, None)
+        if entry is None:
+            raise ModelObjectError(
+                'Event "{}" is not scheduled.'.format(event.descriptor))
+        entry[2] = None
+        self._dirty = True
+
+    def reschedule(self, event, trigger_time):
+        """Move a pending event to a new trigger time."""
+        self.cancel(event)
+        event.trigger_time = trigger_time
+        self.schedule(event)
+
+    def next_trigger_time(self):
+        """The trigger time of the next event, None if there are none."""
+        self._discard_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def _discard_removed(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+    def _push(self, entry):
+        heapq.heappush(self._heap, entry)
+
+    def _pop_due(self, now):
+        """Remove and return the next event due at time "now", or None."""
+        self._discard_removed()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        return heapq.heappop(self._heap)[2]
+
+    def _clear_queue(self):
+        self._heap = []
+
+    def run(self, now=None):
+        """Trigger every event that is due at time "now".
+
+        Events scheduled by the triggered actions are triggered too if they
+        are already due. An event whose action raises is not rescheduled.
+        Returns the number of events triggered.
+        """
+        if self._running:
+            # an action caused delayed events to be triggered again
+            return 0
+        now = time.time() if now is None else now
+        triggered = 0
+        self._running = True
+        try:
+            while True:
+                event = self._pop_due(now)
+                if event is None:
+                    break
+                del self._entries[event]
+                self._dirty = True
+                event(now)
+                triggered += 1
+        finally:
+            self._running = False
+        if triggered:
+            debug('Triggered {} delayed events'.format(triggered))
+        return triggered
+
+    def clear(self):
+        self._entries = {}
+        self._clear_queue()
+        self._dirty = True
+
+    def is_dirty(self):
+        """True if events were added or removed since mark_clean."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
+
+    def __getstate__(self):
+        state = []
+        for event in self:
+            if event.persistent:
+                state.append(event.__getstate__())
+            else:
+                debug('Not saving event "{}"'.format(event.descriptor))
+        return state
+
+    def __setstate__(self, state):
+        self.clear()
+        for event_state in state:
+            event = DelayedEvent(None, 0, None)
+            try:
+                event.__setstate__(event_state)
+            except ModelObjectError as err:
+                debug('Dropping saved event: {}'.format(err))
+                continue
+            self.schedule(event)
+        self.mark_clean()
+
+
+class TimingWheelScheduler(EventScheduler):
+
+    """An EventScheduler backed by a hierarchical timing wheel.
+
+    Time is divided into ticks of "resolution" seconds. Level 0 of the wheel
+    has a slot per tick for the next "slots" ticks, each higher level has a
+    slot per whole rotation of the level below it. An event is added to a
+    slot in O(1) time. As time passes, the slots of a higher level are
+    cascaded into the levels below. When a slot of level 0 expires its
+    events are sorted so they trigger in the same order as with an
+    EventScheduler. Empty rotations are skipped.
+
+    Events further in the future than the wheel reaches, slots ** levels
+    ticks, wait in an overflow list that is cascaded once per rotation of the
+    top level. The wheel suits very many events with bounded delays, use an
+    EventScheduler if most delays are longer than the wheel.
+    """
+
+    def __init__(self, resolution=1.0, slots=64, levels=4, start=None):
+        """
+        :param start: The time the wheel starts turning from, defaults to
+            the current time. Events due before the start are kept in a heap
+            rather than in the wheel.
+        """
+        self.resolution = resolution
+        self.start = start
+        self.slots = slots
+        self.levels = levels
+        # the ticks spanned by one slot of each level and by the whole wheel
+        self._spans = [pow(slots, level) for level in range(levels + 1)]
+        super().__init__()
+
+    def __repr__(self):
+        return ("{}(pending: {}, next trigger time: {}, resolution: {}, "
+                "slots: {}, levels: {})").format(
+                    self.__class__.__name__, len(self),
+                    self.next_trigger_time(), self.resolution, self.slots,
+                    self.levels)
+
+    def _clear_queue(self):
+        self._wheel = [[[] for _ in range(self.slots)]
+                       for _ in range(self.levels)]
+        # the number of entries in the slots of each level
+        self._counts = [0] * self.levels
+        self._overflow = []
+        # entries of the expired ticks in trigger order, and a heap of the
+        # entries that were added after their tick expired
+        self._ready = deque()
+        self._late = []
+        # the next tick to expire
+        start = time.time() if self.start is None else self.start
+        self._tick = math.floor(start / self.resolution)
+
+    def next_trigger_time(self):
+        """The trigger time of the next event, None if there are none.
+
+        Unlike the other methods this looks at every pending event.
+        """
+        if not self._entries:
+            return None
+        return min(self._entries.values())[0]
+
+    def _push(self, entry):
+        tick = math.floor(entry[0] / self.resolution)
+        if tick < self._tick:
+            heapq.heappush(self._late, entry)
+            return
+        delta = tick - self._tick
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                slot = (tick // self._spans[level]) % self.slots
+                self._wheel[level][slot].append(entry)
+                self._counts[level] += 1
+                return
+        self._overflow.append(entry)
+
+    def _cascade(self, level, slot):
+        entries = self._wheel[level][slot]
+        self._wheel[level][slot] = []
+        self._counts[level] -= len(entries)
+        for entry in entries:
+            if entry[2] is not None:
+                self._push(entry)
+
+    def _advance(self, target):
+        """Expire the slots of every tick up to and including target."""
+        while self._tick <= target:
+            tick = self._tick
+            if tick % self._spans[self.levels] == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, []
+                for entry in overflow:
+                    if entry[2] is not None:
+                        self._push(entry)
+            for level in range(self.levels - 1, 0, -1):
+                if tick % self._spans[level] == 0:
+                    self._cascade(level, (tick // self._spans[level]) %
+                                  self.slots)
+            slot = tick % self.slots
+            entries = self._wheel[0][slot]
+            if entries:
+                self._wheel[0][slot] = []
+                self._counts[0] -= len(entries)
+                # every entry of a later tick triggers after these
+                entries.sort()
+                self._ready.extend(entries)
+            self._tick = tick + 1
+            if self._counts[0] == 0:
+                self._skip(target)
+
+    def _skip(self, target):
+        """Jump over the ticks of the rotations that have no events."""
+        for level in range(1, self.levels + 1):
+            if level == self.levels:
+                if not self._overflow:
+                    self._tick = max(self._tick, target + 1)
+                    return
+            elif self._counts[level] == 0:
+                continue
+            span = self._spans[level]
+            next_cascade = -(-self._tick // span) * span
+            self._tick = min(next_cascade, target + 1)
+            return
+
+    def _pop_due(self, now):
+        self._advance(math.floor(now / self.resolution))
+        ready, late = self._ready, self._late
+        while ready and ready[0][2] is None:
+            ready.popleft()
+        while late and late[0][2] is None:
+            heapq.heappop(late)
+        if late and (not ready or late[0] < ready[0]):
+            if late[0][0] <= now:
+                return heapq.heappop(late)[2]
+        elif ready and ready[0][0] <= now:
+            return ready.popleft()[2]
+        return None
+
+
+# name: scheduler class
+SCHEDULERS = OrderedDict([
+    ('heap', EventScheduler),
+    ('wheel', TimingWheelScheduler),
+])
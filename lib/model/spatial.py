@@ -0,0 +1,196 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Range and nearest neighbour queries over the systems of a Galaxy."""
+
+from itertools import product
+
+# the number of systems along each side of a sector
+SECTOR_SIZE = 100
+
+
+class SpatialIndex(object):
+
+    """A grid of SystemCoords bucketed by sector.
+
+    Along each axis a system is at position sector * sector_size + system
+    and distances are measured in systems. Each bucket holds the systems
+    whose position falls in one sector_size square, which is their sector
+    unless their system parts are sector_size or more. Queries only look at
+    the buckets that overlap the queried area, or at every bucket if there
+    are fewer buckets than that.
+    """
+
+    def __init__(self, coords=(), sector_size=SECTOR_SIZE):
+        self.sector_size = sector_size
+        # bucket: {SystemCoord: position}
+        self._buckets = {}
+        self._len = 0
+        self.update(coords)
+
+    def __repr__(self):
+        return "{}(systems: {}, sector size: {}, buckets: {})".format(
+            self.__class__.__name__, len(self), self.sector_size,
+            len(self._buckets))
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, coord):
+        coord = coord.system_coord()
+        bucket = self._buckets.get(self._bucket(self.position(coord)))
+        return bucket is not None and coord in bucket
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    def position(self, coord):
+        """The (x, y) position of a coord in systems."""
+        (sec_x, sec_y), (sys_x, sys_y) = coord.sector, coord.system
+        return (sec_x * self.sector_size + sys_x,
+                sec_y * self.sector_size + sys_y)
+
+    def _bucket(self, position):
+        return (position[0] // self.sector_size,
+                position[1] // self.sector_size)
+
+    def add(self, coord):
+        """Add the system at coord, a Coord adds the system it is in."""
+        coord = coord.system_coord()
+        position = self.position(coord)
+        bucket = self._buckets.setdefault(self._bucket(position), {})
+        if coord not in bucket:
+            bucket[coord] = position
+            self._len += 1
+
+    def update(self, coords):
+        for coord in coords:
+            self.add(coord)
+
+    def discard(self, coord):
+        coord = coord.system_coord()
+        key = self._bucket(self.position(coord))
+        bucket = self._buckets.get(key)
+        if bucket is not None and bucket.pop(coord, None) is not None:
+            self._len -= 1
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self):
+        self._buckets = {}
+        self._len = 0
+
+    def _area(self, low, high):
+        """Yield the (SystemCoord, position) items of the buckets that
+        overlap the rectangle between the positions low and high."""
+        low_x, low_y = self._bucket(low)
+        high_x, high_y = self._bucket(high)
+        cells = (high_x - low_x + 1) * (high_y - low_y + 1)
+        if cells > len(self._buckets):
+            keys = [key for key in self._buckets
+                    if low_x <= key[0] <= high_x and low_y <= key[1] <= high_y]
+        else:
+            keys = product(range(low_x, high_x + 1), range(low_y, high_y + 1))
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                yield from bucket.items()
+
+    def within_rectangle(self, corner, opposite_corner):
+        """The systems inside the rectangle between two coords, inclusive.
+
+        The systems are ordered by their y and then x position.
+        """
+        (x1, y1), (x2, y2) = (self.position(corner),
+                              self.position(opposite_corner))
+        low, high = (min(x1, x2), min(y1, y2)), (max(x1, x2), max(y1, y2))
+        found = [(position[::-1], coord)
+                 for coord, position in self._area(low, high)
+                 if (low[0] <= position[0] <= high[0] and
+                     low[1] <= position[1] <= high[1])]
+        found.sort(key=_sort_key)
+        return [coord for _, coord in found]
+
+    def within_radius(self, coord, radius):
+        """The systems at most radius systems away from coord, nearest
+        first."""
+        x, y = centre = self.position(coord)
+        low, high = (x - radius, y - radius), (x + radius, y + radius)
+        found = []
+        for other, position in self._area(low, high):
+            distance = _distance2(centre, position)
+            if distance <= radius * radius:
+                found.append(((distance, position[::-1]), other))
+        found.sort(key=_sort_key)
+        return [other for _, other in found]
+
+    def _ring(self, centre, ring):
+        """The keys of the buckets ring buckets away from centre."""
+        x, y = centre
+        if ring == 0:
+            return [centre]
+        keys = [(x + offset, y + side) for offset in range(-ring, ring + 1)
+                for side in (-ring, ring)]
+        keys.extend((x + side, y + offset)
+                    for offset in range(-ring + 1, ring)
+                    for side in (-ring, ring))
+        return keys
+
+    def nearest(self, coord, count=1):
+        """The count systems nearest to coord, nearest first.
+
+        Rings of buckets around coord are searched until no bucket further
+        out can hold a nearer system. Ties are ordered by y and then x
+        position.
+        """
+        centre = self.position(coord)
+        centre_bucket = self._bucket(centre)
+        found = []
+        remaining = len(self._buckets)
+        ring = 0
+        while remaining > 0 and count > 0:
+            if len(found) >= count:
+                # any system in this ring is at least this far away
+                nearest_in_ring = (ring - 1) * self.sector_size
+                if found[-1][0][0] <= nearest_in_ring * nearest_in_ring:
+                    break
+            if 8 * ring >= remaining:
+                # fewer buckets are left than the ring has, look at them all
+                keys = [key for key in self._buckets
+                        if max(abs(key[0] - centre_bucket[0]),
+                               abs(key[1] - centre_bucket[1])) >= ring]
+                remaining = 0
+            else:
+                keys = self._ring(centre_bucket, ring)
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                remaining -= 1
+                found.extend(((_distance2(centre, position), position[::-1]),
+                              other) for other, position in bucket.items())
+            found.sort(key=_sort_key)
+            del found[count:]
+            ring += 1
+        return [other for _, other in found]
+
+
+def _distance2(position, other):
+    return ((position[0] - other[0]) * (position[0] - other[0]) +
+            (position[1] - other[1]) * (position[1] - other[1]))
+
+
+def _sort_key(item):
+    return item[0]
@@ -0,0 +1,103 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backing stores for the systems of a Galaxy that are not kept in memory."""
+
+import os
+import shelve
+import tempfile
+
+from .coord import SystemCoord
+
+
+def _key(coord):
+    return '{}:{}'.format(*coord.__getstate__())
+
+
+def _coord(key):
+    coord = SystemCoord()
+    coord.__setstate__(tuple(key.split(':')))
+    return coord
+
+
+class SystemStore(object):
+
+    """A mapping of SystemCoord to system state.
+
+    Stores hold the state tuples of systems rather than System objects so
+    that any store can be replaced by one backed by a file or a database.
+    This base class keeps the states in a dict.
+    """
+
+    def __init__(self, data=None):
+        self._data = {} if data is None else data
+
+    def __repr__(self):
+        return "{}(systems: {})".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, coord):
+        return _key(coord) in self._data
+
+    def __getitem__(self, coord):
+        return self._data[_key(coord)]
+
+    def __setitem__(self, coord, state):
+        self._data[_key(coord)] = state
+
+    def __delitem__(self, coord):
+        del self._data[_key(coord)]
+
+    def pop(self, coord):
+        state = self[coord]
+        del self[coord]
+        return state
+
+    def coords(self):
+        """Yield the SystemCoord of every stored system."""
+        for key in list(self._data):
+            yield _coord(key)
+
+    def items(self):
+        """Yield tuples of (SystemCoord, system state)."""
+        for key in list(self._data):
+            yield _coord(key), self._data[key]
+
+    def close(self):
+        pass
+
+
+class ShelveSystemStore(SystemStore):
+
+    """Spill system states to a shelve database on disk.
+
+    If no filename is given the database is created in a temporary directory
+    which is removed when the store is closed.
+    """
+
+    def __init__(self, filename=None):
+        self._tmp_dir = None
+        if filename is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix='space-')
+            filename = os.path.join(self._tmp_dir.name, 'systems')
+        self.filename = filename
+        super().__init__(shelve.open(filename))
+
+    def close(self):
+        self._data.close()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
@@ -12,23 +12,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from random import randint
+import random
 from logging import debug
 
+from lib.namegen import NameGen
+
 from .planet import Planet
 
 
 class System(object):
     size_range = (2, 15)
 
-    def __init__(self):
+    def __init__(self, planet_names=None, rng=None):
+        """Generate a new system.
+
+        :param planet_names: A lib.namegen.ForbiddenWords registry of names
+            that are already in use. The new planet names are added to it.
+        :param rng: A random.Random instance. When given, the system is
+            generated entirely from it: the same seeded rng always produces
+            the same system. The planet names are then only guaranteed to be
+            unique within the system since avoiding the names in
+            planet_names would make them depend on the other systems.
+        """
         self.size, self.sun_brightness = (
-            self.get_system_size_and_sun_brightness())
+            self.get_system_size_and_sun_brightness(rng))
         debug('Constructing new system of size %s with sun brightness %s' %
               (self.size, self.sun_brightness))
-        self.planets = [Planet(sun_brightness=self.sun_brightness,
+        if rng is None:
+            names = NameGen(forbidden=planet_names).gen_words(
+                self.size, no_repeat=True)
+        else:
+            names = NameGen(rng=rng).gen_words(self.size, no_repeat=True)
+            if planet_names is not None:
+                planet_names.update(names)
+        self.planets = [Planet(name=name, sun_brightness=self.sun_brightness,
                                sun_distance=i)
-                        for i in range(1, self.size+1)]
+                        for i, name in enumerate(names, 1)]
 
     def __repr__(self):
         return "{}(Size: {}, Sun Brightness: {}, Planets: {})".format(
@@ -44,12 +63,34 @@ class System(object):
         planets = [pl.__getstate__() for pl in self.planets]
         return (self.size, self.sun_brightness, planets)
 
+    @classmethod
+    def from_state(cls, state):
+        """Restore a saved system without generating a new one first."""
+        system = cls.__new__(cls)
+        system.__setstate__(state)
+        return system
+
     def __setstate__(self, state):
         (self.size, self.sun_brightness, planets) = state
         self.planets = []
         for pl in planets:
             planet = Planet(*pl)
             self.planets.append(planet)
+        self.mark_clean()
+
+    def __setattr__(self, name, value):
+        if name != '_dirty':
+            object.__setattr__(self, '_dirty', True)
+        object.__setattr__(self, name, value)
+
+    def is_dirty(self):
+        """True if the system changed since the last mark_clean call."""
+        return self._dirty or any(planet.is_dirty() for planet in self.planets)
+
+    def mark_clean(self):
+        self._dirty = False
+        for planet in self.planets:
+            planet.mark_clean()
 
     def __eq__(self, other):
         return (self.size == other.size and
@@ -59,6 +100,10 @@ class System(object):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def is_pristine(self):
+        """True if no planet in the system has changed since generation."""
+        return all(planet.is_pristine() for planet in self.planets)
+
     @classmethod
     def get_brightness_bounds(cls, size):
         size_scale = 7
@@ -67,7 +112,8 @@ class System(object):
         return (_brightness_lower_bound, _brightness_upper_bound)
 
     @classmethod
-    def get_system_size_and_sun_brightness(cls):
+    def get_system_size_and_sun_brightness(cls, rng=None):
+        randint = random.randint if rng is None else rng.randint
         size = randint(*cls.size_range)
         brightness = randint(*cls.get_brightness_bounds(size))
         return size, brightness
@@ -16,12 +16,13 @@ import time
 import functools
 from logging import debug
 
-from .resources import Resources
+from lib.error import ModelObjectError
 
-# Using a global to hold the delayed events for now.
-# Also, delayed events are currently executed through the delayed_event_trigger
-# rather than a separate event thread.
-DELAYED_EVENTS = []
+# Delayed events are held by the engine's lib.model.scheduler.EventScheduler.
+# They are currently executed through the delayed_event_trigger rather than a
+# separate event thread.
+# The actions that delayed events can be saved with, by name.
+EVENT_ACTIONS = {}
 # TODO:
 # - make engine queries threadsafe
 # - ensure that only queries are used to interact with the model
@@ -30,6 +31,59 @@ DELAYED_EVENTS = []
 # - remove all uses of delayed_event_trigger
 
 
+class UpdateEpoch(object):
+
+    """A single instant of game time, used as a context manager.
+
+    Within the context every object is updated at most once, the delayed
+    events are run at most once and the time used for both is fixed at
+    "now", which defaults to the time the epoch was created. A command that
+    looks at the same planet many times therefore only updates it once.
+
+    Entering an epoch while another one is active joins the active epoch.
+    """
+
+    # the active epoch
+    current = None
+
+    def __init__(self, now=None):
+        self.time = time.time() if now is None else now
+        # id: object, the objects are kept so their ids are not reused
+        self.updated = {}
+        self.events_run = False
+        self._entered = False
+
+    def __repr__(self):
+        return "{}(time: {}, updated: {}, events run: {})".format(
+            self.__class__.__name__, self.time, len(self.updated),
+            self.events_run)
+
+    def __enter__(self):
+        if UpdateEpoch.current is not None:
+            return UpdateEpoch.current
+        UpdateEpoch.current = self
+        self._entered = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._entered:
+            UpdateEpoch.current = None
+            self._entered = False
+
+    def mark_updated(self, obj):
+        """Record obj as updated, return False if it already was."""
+        if id(obj) in self.updated:
+            return False
+        self.updated[id(obj)] = obj
+        return True
+
+
+def current_time():
+    """The time of the active UpdateEpoch, otherwise the current time."""
+    epoch = UpdateEpoch.current
+    return time.time() if epoch is None else epoch.time
+
+
 def update_trigger(func):
     """Decorator to trigger an update before given method is called."""
 
@@ -42,12 +96,34 @@ def update_trigger(func):
     return new_function
 
 
+def once_per_epoch(func):
+    """Decorator for an update method to only run once per UpdateEpoch."""
+
+    @functools.wraps(func)
+    def new_function(self, *args, **kwargs):
+        epoch = UpdateEpoch.current
+        if epoch is not None and not epoch.mark_updated(self):
+            debug('Already updated {} at {}'.format(
+                getattr(self, 'name', self), epoch.time))
+            return
+        return func(self, *args, **kwargs)
+
+    return new_function
+
+
 def delayed_event_trigger(func):
-    """Decorator to trigger delayed events before calling a method."""
+    """Decorator to trigger delayed events before calling a method.
+
+    Within an UpdateEpoch the delayed events are only triggered once.
+    """
 
     @functools.wraps(func)
     def new_function(*args, **kwargs):
-        if hasattr(delayed_event_trigger, 'CALLABLE'):
+        epoch = UpdateEpoch.current
+        if (hasattr(delayed_event_trigger, 'CALLABLE') and
+                (epoch is None or not epoch.events_run)):
+            if epoch is not None:
+                epoch.events_run = True
             debug('Performing Delayed Actions...')
             delayed_event_trigger.CALLABLE()
         return func(*args, **kwargs)
@@ -55,6 +131,30 @@ def delayed_event_trigger(func):
     return new_function
 
 
+def event_action(name):
+    """Decorator to register a delayed event action under the given name.
+
+    Only events whose action is registered can be saved, since the action is
+    saved by name. Their arguments must be serializable as JSON.
+    """
+
+    def register(func):
+        if name in EVENT_ACTIONS:
+            raise ModelObjectError(
+                'Event action "{}" is already registered.'.format(name))
+        EVENT_ACTIONS[name] = func
+        return func
+
+    return register
+
+
+def _event_action_name(action):
+    for name, func in EVENT_ACTIONS.items():
+        if func is action:
+            return name
+    return None
+
+
 def calculate_update_increments(last_update, new_time=None):
     """Determine the number of updated increments between last_update and now.
     """
@@ -65,6 +165,34 @@ def calculate_update_increments(last_update, new_time=None):
     return new_t - last_update
 
 
+@delayed_event_trigger
+def tick_all(galaxy, now=None):
+    """Update the resources of every owned planet in the galaxy at once.
+
+    Owned planets are never evicted so every one of them is resident. If the
+    galaxy has a lib.model.ledger.ResourceLedger the income is added in one
+    vectorised operation, otherwise planet by planet. Either way the result
+    is the same as calling update() on each planet at time "now". Within
+    an UpdateEpoch at the same time the planets are not updated again.
+    """
+    now = current_time() if now is None else now
+    planets = [planet for planet in galaxy.resident_planets()
+               if planet.emperor is not None]
+    epoch = UpdateEpoch.current
+    if epoch is not None and now == epoch.time:
+        for planet in planets:
+            epoch.mark_updated(planet)
+    debug('Ticking {} owned planets'.format(len(planets)))
+    if galaxy.ledger is not None:
+        galaxy.ledger.accrue(now, planets)
+        return
+    for planet in planets:
+        income = planet.rates * (now - planet.last_update)
+        planet.resources = (planet.resources + income).cap(
+            planet.max_resources)
+        planet.last_update = now
+
+
 class ResourceUpdater(object):
 
     """Helper class to handle updating a Planet's resources based on income.
@@ -82,19 +210,13 @@ class ResourceUpdater(object):
 
     def update(self):
         """Calculate the new value of resources for planet."""
-        self.new_time = time.time()
+        self.new_time = current_time()
         increments = calculate_update_increments(self.last_update,
                                                  new_time=self.new_time)
-        self.difference = Resources()
-        self.resources = self.original_resources.copy()
-        for res in self.original_resources:
-            self.difference[res] = self.rates[res] * increments
-            if self.max_resources:
-                new_val = min(self.resources[res] + self.difference[res],
-                              self.max_resources[res])
-            else:
-                new_val = self.resources[res] + self.difference[res]
-            self.resources[res] = new_val
+        self.difference = self.rates * increments
+        self.resources = self.original_resources + self.difference
+        if self.max_resources:
+            self.resources.cap(self.max_resources)
         return self.resources, self.new_time
 
 
@@ -131,6 +253,30 @@ class DelayedEvent(object):
             _time = time.time()
         return _time >= self.trigger_time
 
+    @property
+    def persistent(self):
+        """True if the action is registered so the event can be saved."""
+        return _event_action_name(self.action) is not None
+
+    def __getstate__(self):
+        name = _event_action_name(self.action)
+        if name is None:
+            raise ModelObjectError(
+                'Cannot save event "{}", its action is not registered.'.format(
+                    self.descriptor))
+        return (self.descriptor, self.delay, self.trigger_time, name,
+                list(self.args), self.kwargs)
+
+    def __setstate__(self, state):
+        (self.descriptor, self.delay, self.trigger_time, name, args,
+         self.kwargs) = state
+        if name not in EVENT_ACTIONS:
+            raise ModelObjectError(
+                'Unknown event action "{}".'.format(name))
+        self.action = EVENT_ACTIONS[name]
+        self.args = tuple(args)
+        self.triggered = False
+
     def __call__(self, _time=None):
         if not self.is_delay_over(_time):
             return
@@ -34,6 +34,22 @@ class User(object):
         return "{} name: {}\nplanets: {}".format(
             self.__class__.__name__, self.name, self.planets)
 
+    def __setattr__(self, name, value):
+        if name != '_dirty':
+            object.__setattr__(self, '_dirty', True)
+        object.__setattr__(self, name, value)
+
+    def is_dirty(self):
+        """True if the user changed since the last mark_clean call.
+
+        Changes made to the planets list in place are not noticed, assign a
+        new list instead.
+        """
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
+
     def __getstate__(self):
         planets = [coord.__getstate__() for coord in self.planets]
         return (self.name, planets)
@@ -45,3 +61,4 @@ class User(object):
             coord = Coord()
             coord.__setstate__(pl)
             self.planets.append(coord)
+        self.mark_clean()
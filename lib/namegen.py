@@ -28,9 +28,16 @@
 Namegen.py - A basic name generator script.
 """
 
+import os
 import sys
+import math
+import array
+import hashlib
 import random
 import locale
+import struct
+from bisect import bisect_left
+from collections import namedtuple
 from argparse import ArgumentParser
 
 try:
@@ -39,6 +46,317 @@ except ImportError:  # python 3
     from io import StringIO
 
 
+# Compiled language cache files are stored next to the language file they were
+# compiled from using this suffix.
+CACHE_SUFFIX = '.cache'
+CACHE_MAGIC = b'NGLC'
+CACHE_VERSION = 1
+
+# unsigned 32 bit array typecode used for the cache file
+_UINT32 = 'I' if array.array('I').itemsize == 4 else 'L'
+
+# Compiled languages shared by all NameGen instances. Keyed by the absolute
+# path of the language file, the embedded default language uses None.
+_LANGUAGES = {}
+
+
+class SyllableTable(namedtuple('SyllableTable', ['ids', 'counts'])):
+    """
+    Syllable indexes and their cumulative counts stored as parallel tuples.
+
+    The counts are cumulative so selecting a syllable is a binary search of
+    the counts, see _select_syllable().
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build a table from (syllable index, cumulative count) tuples."""
+        pairs = list(pairs)
+        return cls(tuple(syl for syl, _ in pairs),
+                   tuple(count for _, count in pairs))
+
+    def pairs(self):
+        return list(zip(self.ids, self.counts))
+
+
+class Language(object):
+    """
+    An immutable compiled language model.
+
+    Holds the syllables of the language and the SyllableTables for the word
+    starts, the word ends and the "next syllable" combinations of each
+    syllable. The end counts are also indexed by syllable in "end_counts". A
+    Language is shared by every NameGen using the same language file, use
+    load_language() to retrieve one.
+    """
+
+    __slots__ = ('syllables', 'starts', 'ends', 'combinations', 'end_counts')
+
+    def __init__(self, syllables, starts, ends, combinations):
+        """Compile the language from lists of (syllable index, cumulative
+        count) tuples.
+        """
+        setter = super(Language, self).__setattr__
+        setter('syllables', tuple(syllables))
+        setter('starts', SyllableTable.from_pairs(starts))
+        setter('ends', SyllableTable.from_pairs(ends))
+        setter('combinations', tuple(SyllableTable.from_pairs(comb)
+                                     for comb in combinations))
+        end_counts = [0] * len(self.syllables)
+        for syl, count in self.ends.pairs():
+            end_counts[syl] = count
+        setter('end_counts', tuple(end_counts))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Language objects are immutable.')
+
+    def __eq__(self, other):
+        return all(getattr(self, attr) == getattr(other, attr)
+                   for attr in self.__slots__)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return '{}(syllables: {}, starts: {}, ends: {})'.format(
+            self.__class__.__name__, len(self.syllables), len(self.starts),
+            len(self.ends))
+
+    @classmethod
+    def parse(cls, f):
+        """Compile a language from an open language file."""
+        lines = [line.strip() for line in f.readlines()]
+
+        # first line, list of syllables
+        syllables = lines[0].split(',')
+
+        # next 2 lines, start syllable indexes and counts
+        starts_ids = [int(n) for n in lines[1].split(',')]
+        starts_counts = [int(n) for n in lines[2].split(',')]
+        # zip into a list of tuples
+        starts = list(zip(starts_ids, starts_counts))
+
+        # next 2, same for syllable ends
+        ends_ids = [int(n) for n in lines[3].split(',')]
+        ends_counts = [int(n) for n in lines[4].split(',')]
+        ends = list(zip(ends_ids, ends_counts))
+
+        # starting with the 6th and 7th lines, each pair of lines holds ids
+        # and counts of the "next syllables" for a previous syllable.
+        combinations = []
+        for (ids_str, counts_str) in list(zip(lines[5:None:2],
+                                              lines[6:None:2])):
+            if len(ids_str) == 0 or len(counts_str) == 0:  # empty lines
+                combinations.append([])
+            else:
+                line_ids = [int(n) for n in ids_str.split(',')]
+                line_counts = [int(n) for n in counts_str.split(',')]
+                combinations.append(list(zip(line_ids, line_counts)))
+
+        return cls(syllables, starts, ends, combinations)
+
+    def write_cache(self, filename):
+        """Write the compiled language to a binary cache file.
+
+        The cache is written to a temporary file first and moved into place
+        so a concurrent reader never sees a partially written cache.
+        """
+        syllables = '\n'.join(self.syllables).encode('utf-8')
+        tmp_file = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp_file, 'wb') as f:
+            f.write(struct.pack('<4sHI', CACHE_MAGIC, CACHE_VERSION,
+                                len(syllables)))
+            f.write(syllables)
+            _write_array(f, _flatten(self.starts.pairs()))
+            _write_array(f, _flatten(self.ends.pairs()))
+            _write_array(f, [len(comb.ids) for comb in self.combinations])
+            _write_array(f, _flatten(pair for comb in self.combinations
+                                     for pair in comb.pairs()))
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def read_cache(cls, filename):
+        """Read a compiled language from a binary cache file.
+
+        Raises ValueError if the file is not a language cache or was written
+        by an incompatible version.
+        """
+        with open(filename, 'rb') as f:
+            header = f.read(struct.calcsize('<4sHI'))
+            if len(header) != struct.calcsize('<4sHI'):
+                raise ValueError('Truncated language cache.')
+            magic, version, syllables_len = struct.unpack('<4sHI', header)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                raise ValueError('{} is not a compatible language '
+                                 'cache.'.format(filename))
+            syllables = f.read(syllables_len).decode('utf-8').split('\n')
+            starts = _pairs(_read_array(f))
+            ends = _pairs(_read_array(f))
+            lengths = _read_array(f)
+            pairs = _pairs(_read_array(f))
+        combinations = []
+        offset = 0
+        for length in lengths:
+            combinations.append(pairs[offset:offset + length])
+            offset += length
+        return cls(syllables, starts, ends, combinations)
+
+
+def _flatten(pairs):
+    return [value for pair in pairs for value in pair]
+
+
+def _pairs(values):
+    return list(zip(values[0::2], values[1::2]))
+
+
+def _write_array(f, values):
+    arr = array.array(_UINT32, values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    f.write(struct.pack('<I', len(arr)))
+    f.write(arr.tobytes())
+
+
+def _read_array(f):
+    (length,) = struct.unpack('<I', f.read(struct.calcsize('<I')))
+    arr = array.array(_UINT32)
+    data = f.read(length * arr.itemsize)
+    if len(data) != length * arr.itemsize:
+        raise ValueError('Truncated language cache.')
+    arr.frombytes(data)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tolist()
+
+
+def load_language(language_file=None, use_cache=True):
+    """Retrieve the compiled Language for a language file.
+
+    Languages are compiled lazily on first use and shared by all callers. When
+    language_file is None the language embedded in this module is used.
+
+    For custom language files, if use_cache is True, the compiled language is
+    also persisted to a binary cache file next to the language file (see
+    CACHE_SUFFIX) which is used instead of reparsing the language file for as
+    long as the cache is newer than the language file.
+    """
+    key = None if language_file is None else os.path.abspath(language_file)
+    language = _LANGUAGES.get(key)
+    if language is None:
+        if key is None:
+            language = Language.parse(StringIO(LANG_STR))
+        else:
+            language = _load_language_file(key, use_cache)
+        _LANGUAGES[key] = language
+    return language
+
+
+def _load_language_file(language_file, use_cache):
+    cache_file = language_file + CACHE_SUFFIX
+    if use_cache and _is_cache_fresh(language_file, cache_file):
+        try:
+            return Language.read_cache(cache_file)
+        except (OSError, ValueError, struct.error):
+            pass  # unusable cache, recompile the language file instead
+    with open(language_file, 'r') as f:
+        language = Language.parse(f)
+    if use_cache:
+        try:
+            language.write_cache(cache_file)
+        except OSError:
+            pass  # caching is an optimization, the language is still usable
+    return language
+
+
+def _is_cache_fresh(language_file, cache_file):
+    try:
+        return (os.path.getmtime(cache_file) >=
+                os.path.getmtime(language_file))
+    except OSError:
+        return False
+
+
+class ForbiddenWords(object):
+    """
+    A registry of words that must not be generated.
+
+    Words are compared case insensitively. A registry can be shared between
+    several NameGen instances so that none of them repeat a word generated by
+    any of the others.
+    """
+
+    def __init__(self, words=None):
+        self._words = set()
+        if words is not None:
+            self.update(words)
+
+    def add(self, word):
+        self._words.add(word.lower())
+
+    def update(self, words):
+        for word in words:
+            self.add(word)
+
+    def __contains__(self, word):
+        return word.lower() in self._words
+
+    def __len__(self):
+        return len(self._words)
+
+    def __repr__(self):
+        return '{}(words: {})'.format(self.__class__.__name__, len(self))
+
+
+class BloomForbiddenWords(ForbiddenWords):
+    """
+    A fixed size, bloom filter backed registry of forbidden words.
+
+    Memory use depends only on the expected capacity and error rate rather
+    than on the number of words, which suits registries of millions of names.
+    A false positive only means that an unused word is rejected and another
+    one is generated; a registered word is never reported as missing. Words
+    are hashed with blake2b so the filter behaves the same in every process.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001, words=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(
+            -capacity * math.log(error_rate) / pow(math.log(2), 2))))
+        self.num_hashes = max(1, int(round(
+            math.log(2) * self.num_bits / capacity)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+        if words is not None:
+            self.update(words)
+
+    def _indexes(self, word):
+        digest = hashlib.blake2b(word.lower().encode('utf-8'),
+                                 digest_size=16).digest()
+        # double hashing: derive all bit indexes from two 64 bit hashes
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.num_bits
+                for i in range(self.num_hashes))
+
+    def add(self, word):
+        for index in self._indexes(word):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self._count += 1
+
+    def __contains__(self, word):
+        bits = self._bits
+        return all(bits[index >> 3] & (1 << (index & 7))
+                   for index in self._indexes(word))
+
+    def __len__(self):
+        """The number of words added, including any duplicates."""
+        return self._count
+
+
 class NameGen(object):
     """
     name-gen: Free python name generator module that analyzes sample text and
@@ -56,111 +374,112 @@ class NameGen(object):
           replicated.
         - Pass True as the 1st parameter to name_gen() to add the generated
           word to the list of forbidden words. The word will not occur again.
+        - Pass a ForbiddenWords registry as the "forbidden" parameter to
+          share the forbidden words with other NameGen instances.
+        - Pass a random.Random instance as the "rng" parameter to generate
+          a reproducible sequence of words.
+
+    The compiled language is shared between all NameGen instances using the
+    same language file so creating a NameGen is cheap.
     """
 
-    def __init__(self, language_file=None, forbidden_file=None):
+    def __init__(self, language_file=None, forbidden_file=None,
+                 forbidden=None, rng=None):
         self.min_syl = 2
         self.max_syl = 4
 
-        # load language file
-        if language_file is None:
-            f = StringIO(LANG_STR)
-        else:
-            f = open(language_file, 'r')
+        # source of randomness, the random module unless a seeded
+        # random.Random instance is given
+        self.rng = random if rng is None else rng
 
-        try:
-            lines = [line.strip() for line in f.readlines()]
-
-            # first line, list of syllables
-            self.syllables = lines[0].split(',')
-
-            # next 2 lines, start syllable indexes and counts
-            starts_ids = [int(n) for n in lines[1].split(',')]
-            starts_counts = [int(n) for n in lines[2].split(',')]
-            # zip into a list of tuples
-            self.starts = list(zip(starts_ids, starts_counts))
-
-            # next 2, same for syllable ends
-            ends_ids = [int(n) for n in lines[3].split(',')]
-            ends_counts = [int(n) for n in lines[4].split(',')]
-            self.ends = list(zip(ends_ids, ends_counts))
-
-            # starting with the 6th and 7th lines, each pair of lines holds ids
-            # and counts of the "next syllables" for a previous syllable.
-            self.combinations = []
-            for (ids_str, counts_str) in list(zip(lines[5:None:2],
-                                                  lines[6:None:2])):
-                if len(ids_str) == 0 or len(counts_str) == 0:  # empty lines
-                    self.combinations.append([])
-                else:
-                    line_ids = [int(n) for n in ids_str.split(',')]
-                    line_counts = [int(n) for n in counts_str.split(',')]
-                    self.combinations.append(list(zip(line_ids, line_counts)))
-        finally:
-            f.close()
+        # load the shared, compiled language
+        self.language = load_language(language_file)
+        self.syllables = self.language.syllables
+        self.starts = self.language.starts
+        self.ends = self.language.ends
+        self.combinations = self.language.combinations
+
+        self.forbidden = forbidden
+        if self.forbidden is None:
+            self.forbidden = ForbiddenWords()
 
         # load forbidden words file if needed
-        if forbidden_file is None:
-            self.forbidden = ''
-        else:
-            self.forbidden = _load_sample(forbidden_file)
+        if forbidden_file is not None:
+            self.forbidden.update(_load_sample(forbidden_file).split())
 
     def gen_word(self, no_repeat=False):
-        # random number of syllables, the last one is always appended
-        num_syl = random.randint(self.min_syl, self.max_syl - 1)
+        return self.gen_words(1, no_repeat=no_repeat)[0]
+
+    def gen_words(self, count, no_repeat=False):
+        """Generate a list of "count" words.
 
-        # turn ends list of tuples into a dictionary
-        ends_dict = dict(self.ends)
+        The language tables are looked up once for the whole batch, so this
+        is the preferred way to generate large numbers of names.
+        """
+        randint = self.rng.randint
+        syllables = self.syllables
+        starts, ends = self.starts, self.ends
+        combinations = self.combinations
+        end_counts = self.language.end_counts
+        forbidden = self.forbidden
+        min_syl, max_syl = self.min_syl, self.max_syl
 
-        # we may have to repeat the process if the first "min_syl" syllables
-        # were a bad choice and have no possible continuations; or if the word
-        # is in the forbidden list.
-        word = []
-        word_str = ''
-        while len(word) < self.min_syl or self.forbidden.find(word_str) != -1:
-            # start word with the first syllable
-            syl = _select_syllable(self.starts, 0)
-            word = [self.syllables[syl]]
+        words = []
+        for _ in range(count):
+            # random number of syllables, the last one is always appended
+            num_syl = randint(min_syl, max_syl - 1)
 
-            for i in range(1, num_syl):
-                # dont end yet if we don't have the minimum number of syllables
-                if i < self.min_syl:
-                    end = 0
-                else:  # probability of ending for this syllable
-                    end = ends_dict.get(syl, 0)
+            # we may have to repeat the process if the first "min_syl"
+            # syllables were a bad choice and have no possible continuations;
+            # or if the word is in the forbidden list.
+            word = []
+            word_str = ''
+            while len(word) < min_syl or word_str in forbidden:
+                # start word with the first syllable
+                syl = _select_syllable(starts, 0, randint)
+                word = [syllables[syl]]
 
-                # select next syllable
-                syl = _select_syllable(self.combinations[syl], end)
-                if syl is None:
-                    break  # early end for this word, end syllable was chosen
+                for i in range(1, num_syl):
+                    # dont end yet if we don't have the minimum number of
+                    # syllables
+                    if i < min_syl:
+                        end = 0
+                    else:  # probability of ending for this syllable
+                        end = end_counts[syl]
 
-                word.append(self.syllables[syl])
+                    # select next syllable
+                    syl = _select_syllable(combinations[syl], end, randint)
+                    if syl is None:
+                        break  # early end for this word, end syllable chosen
 
-            else:  # add an ending syllable if the loop ended without one
-                syl = _select_syllable(self.ends, 0)
-                word.append(self.syllables[syl])
+                    word.append(syllables[syl])
 
-            word_str = ''.join(word)
+                else:  # add an ending syllable if the loop ended without one
+                    syl = _select_syllable(ends, 0, randint)
+                    word.append(syllables[syl])
 
-        # to ensure the word doesn't repeat, add it to the forbidden words
-        if no_repeat:
-            self.forbidden = self.forbidden + '\n' + word_str
+                word_str = ''.join(word)
 
-        return word_str.capitalize()
+            # to ensure the word doesn't repeat, add it to the forbidden words
+            if no_repeat:
+                forbidden.add(word_str)
 
+            words.append(word_str.capitalize())
+        return words
 
-def _select_syllable(counts, end_count):
+
+def _select_syllable(table, end_count, randint=random.randint):
+    counts = table.counts
     if len(counts) == 0:
         return None  # no elements to choose from
 
-    # "counts" holds cumulative counts, so take the last element in the list
-    # (and 2nd in that tuple) to get the sum of all counts
-    chosen = random.randint(0, counts[-1][1] + end_count)
-
-    for (syl, count) in counts:
-        if count >= chosen:
-            return syl
-    return None
+    # "counts" holds cumulative counts, so the last element is the sum of all
+    # counts and the first count not less than "chosen" is found by bisection
+    chosen = randint(0, counts[-1] + end_count)
+    index = bisect_left(counts, chosen)
+    if index == len(counts):
+        return None
+    return table.ids[index]
 
 
 def _load_sample(filename):
@@ -186,7 +505,7 @@ def main():
     sep = ', '
     if args.newline:
         sep = '\n'
-    print(sep.join(generator.gen_word() for _ in range(args.count)))
+    print(sep.join(generator.gen_words(args.count)))
     return 0
 
 
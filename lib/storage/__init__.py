@@ -0,0 +1,54 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Save game storage backends for the SpaceEngine."""
+
+from collections import OrderedDict
+
+from .base import Storage
+from .binary import BinaryStorage, COMPRESSIONS
+from .jsonfile import JsonStorage
+from .jsonlines import JsonLinesStorage, JsonLinesSystemStore
+from .sqlite import SqliteStorage, SqliteSystemStore
+from .sectors import SectorStorage, SectorSystemStore
+from .snapshot import export_snapshot, GalaxySnapshot
+
+
+# Storage backends by name, in the order they are tried when detecting the
+# format of a save file. JSON is the fallback so it has to be last.
+STORAGE_BACKENDS = OrderedDict([
+    (SqliteStorage.name, SqliteStorage),
+    (BinaryStorage.name, BinaryStorage),
+    (JsonLinesStorage.name, JsonLinesStorage),
+    (SectorStorage.name, SectorStorage),
+    (JsonStorage.name, JsonStorage),
+])
+
+
+def get_storage(name):
+    """Create a storage backend by name."""
+    return STORAGE_BACKENDS[name]()
+
+
+def detect_storage(save_file):
+    """Create the storage backend that can load the given save file."""
+    for backend in STORAGE_BACKENDS.values():
+        if backend.detect(save_file):
+            return backend()
+
+
+__all__ = [Storage, JsonStorage, SqliteStorage, SqliteSystemStore,
+           BinaryStorage, COMPRESSIONS, JsonLinesStorage, JsonLinesSystemStore,
+           SectorStorage, SectorSystemStore, export_snapshot, GalaxySnapshot,
+           STORAGE_BACKENDS, get_storage, detect_storage]
@@ -0,0 +1,116 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def coord_values(coord):
+    """The (sector_x, sector_y, system_x, system_y) ints of a coord."""
+    return coord.sector + coord.system
+
+
+def coord_state(sector_x, sector_y, system_x, system_y):
+    """The SystemCoord state for the ints returned by coord_values."""
+    return ('{}.{}'.format(sector_x, system_x),
+            '{}.{}'.format(sector_y, system_y))
+
+
+def fsync_dir(path):
+    """Flush a directory entry, e.g. after renaming a file into it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(filename, mode='w'):
+    """Open a temporary file that atomically replaces filename when closed.
+
+    The data is flushed to disk before the rename so a crash leaves either
+    the old or the new file intact, never a partially written one. If the
+    with block raises, filename is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_file = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(filename) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as fout:
+            yield fout
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    fsync_dir(directory)
+
+
+class Storage(object):
+
+    """Base class for the save game storage backends of a SpaceEngine.
+
+    A backend reads and writes the engine's user and galaxy to the file named
+    by engine.save_file. Subclasses must set "name" and implement load and
+    save.
+    """
+
+    name = None
+
+    def __repr__(self):
+        return "{}()".format(self.__class__.__name__)
+
+    @classmethod
+    def detect(cls, save_file):
+        """Return True if save_file is in this backend's format."""
+        return False
+
+    def load(self, engine):
+        """Restore engine.user and engine.galaxy from engine.save_file.
+
+        Return the name of the object that was focussed when saved.
+        """
+        raise NotImplementedError()
+
+    def save(self, engine, current_obj_name, incremental=False):
+        """Save the engine's game state to engine.save_file.
+
+        If incremental is True the backend may write only the systems and
+        user that are dirty, if it supports doing so.
+        """
+        raise NotImplementedError()
+
+    def journal(self, engine, current_obj_name, command):
+        """Durably record the changes made by a mutating command.
+
+        The changes must survive a crash and be restored by load. By default
+        this is an incremental save.
+        """
+        self.save(engine, current_obj_name, incremental=True)
+
+    def configure(self, opts):
+        """Apply backend specific command line options."""
+        pass
+
+    def close(self):
+        """Release any files or connections held by the backend."""
+        pass
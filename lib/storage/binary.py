@@ -0,0 +1,292 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A compact, versioned binary save format.
+
+The file starts with an uncompressed header of the magic bytes, the format
+version and the compression used for the rest of the file. The payload is a
+table of every string in the save followed by fixed size struct records
+that refer to the strings by index:
+
+- META: the current object, whether there is a galaxy and its seed. The
+  seed is saved as a decimal string since it may be any int.
+- USER: the user's name and planet count, followed by a COORD per planet.
+- COUNT of systems, then per system a SYSTEM record followed by a PLANET
+  record per planet, each followed by a BUILDING record per building.
+- COUNT of delayed events, then an EVENT record per event.
+"""
+
+import json
+import zlib
+import struct
+from logging import debug
+from collections import OrderedDict
+
+from lib.error import SaveFileError
+from lib.model.resources import ALL_RESOURCES
+
+from .base import Storage, atomic_write, coord_state, coord_values
+
+try:
+    import lzma
+except ImportError:  # python built without lzma support
+    lzma = None
+
+MAGIC = b'SPCB'
+FORMAT_VERSION = 1
+# the string index of None, also used for missing ints
+NONE = 0xFFFFFFFF
+
+HEADER = struct.Struct('<4sBB')  # magic, version, compression
+COUNT = struct.Struct('<I')
+META = struct.Struct('<I?I')  # current object, has galaxy, seed
+USER = struct.Struct('<?II')  # has user, name, planet count
+COORD = struct.Struct('<iiiiI')  # sector x, y, system x, y, planet
+SYSTEM = struct.Struct('<iiiiIII')  # coord, size, sun brightness, planets
+# name, emperor, sun brightness, sun distance, last update, resources,
+# building count
+PLANET = struct.Struct('<IIIId{}dI'.format(len(ALL_RESOURCES)))
+BUILDING = struct.Struct('<II')  # type abbreviation, level
+# descriptor, delay, trigger time, action name, JSON of [args, kwargs]
+EVENT = struct.Struct('<IddII')
+
+# name: (id, compress, decompress)
+COMPRESSIONS = OrderedDict([
+    ('none', (0, None, None)),
+    ('zlib', (1, zlib.compress, zlib.decompress)),
+])
+if lzma is not None:
+    COMPRESSIONS['lzma'] = (2, lzma.compress, lzma.decompress)
+DEFAULT_COMPRESSION = 'zlib'
+
+
+def _uint(value):
+    return NONE if value is None else value
+
+
+def _from_uint(value):
+    return None if value == NONE else value
+
+
+class _Packer(object):
+
+    """Collect the records and interned strings of a save."""
+
+    def __init__(self):
+        self.strings = OrderedDict()
+        self.parts = []
+
+    def string(self, value):
+        if value is None:
+            return NONE
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def pack(self, record, *values):
+        self.parts.append(record.pack(*values))
+
+    def getvalue(self):
+        strings = [value.encode('utf-8') for value in self.strings]
+        table = [COUNT.pack(len(strings)),
+                 struct.pack('<{}I'.format(len(strings)),
+                             *(len(value) for value in strings))]
+        return b''.join(table + strings + self.parts)
+
+
+class _Unpacker(object):
+
+    """Read the records and strings of a save in order."""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+        count, = self.unpack(COUNT)
+        lengths = self.unpack(struct.Struct('<{}I'.format(count)))
+        self.strings = []
+        for length in lengths:
+            end = self.offset + length
+            self.strings.append(
+                bytes(self.data[self.offset:end]).decode('utf-8'))
+            self.offset = end
+
+    def unpack(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+    def string(self, index):
+        return None if index == NONE else self.strings[index]
+
+
+class BinaryStorage(Storage):
+
+    """Save the game in the compact binary format described above.
+
+    The compression used for saving defaults to zlib and can be changed with
+    the "compression" command line option. A loaded save keeps using its
+    compression.
+    """
+
+    name = 'binary'
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+
+    def __repr__(self):
+        return "{}(compression: {})".format(self.__class__.__name__,
+                                            self.compression)
+
+    @classmethod
+    def detect(cls, save_file):
+        with open(save_file, 'rb') as fin:
+            return fin.read(len(MAGIC)) == MAGIC
+
+    def configure(self, opts):
+        compression = getattr(opts, 'compression', None)
+        if isinstance(compression, str):
+            self.compression = compression
+
+    def load(self, engine):
+        with open(engine.save_file, 'rb') as fin:
+            data = fin.read()
+        try:
+            magic, version, compression_id = HEADER.unpack_from(data)
+        except struct.error:
+            raise SaveFileError('Truncated save file header.')
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SaveFileError(
+                'Unsupported binary save format version {}.'.format(version))
+        for name, (cid, _, decompress) in COMPRESSIONS.items():
+            if cid == compression_id:
+                break
+        else:
+            raise SaveFileError(
+                'Unsupported save file compression {}.'.format(
+                    compression_id))
+        self.compression = name
+        payload = data[HEADER.size:]
+        if decompress is not None:
+            payload = decompress(payload)
+        try:
+            current_obj_name, state = self._unpack(_Unpacker(payload))
+        except (struct.error, IndexError, ValueError) as err:
+            raise SaveFileError('Corrupt save file: {}'.format(err))
+        engine.__setstate__((engine.save_file,) + state)
+        return current_obj_name
+
+    def save(self, engine, current_obj_name, incremental=False):
+        cid, compress, _ = COMPRESSIONS[self.compression]
+        payload = self._pack(engine, current_obj_name)
+        if compress is not None:
+            payload = compress(payload)
+        debug('Writing {} byte binary save'.format(len(payload)))
+        with atomic_write(engine.save_file, 'wb') as fout:
+            fout.write(HEADER.pack(MAGIC, FORMAT_VERSION, cid))
+            fout.write(payload)
+
+    def _pack(self, engine, current_obj_name):
+        packer = _Packer()
+        galaxy = engine.galaxy
+        seed = None if galaxy is None else galaxy.seed
+        packer.pack(META, packer.string(current_obj_name),
+                    galaxy is not None,
+                    packer.string(None if seed is None else str(seed)))
+
+        user = engine.user
+        if user is None:
+            packer.pack(USER, False, NONE, 0)
+        else:
+            packer.pack(USER, True, packer.string(user.name),
+                        len(user.planets))
+            for coord in user.planets:
+                packer.pack(COORD, *coord_values(coord) +
+                            (int(coord.planet),))
+
+        systems = [] if galaxy is None else list(galaxy.system_states())
+        packer.pack(COUNT, len(systems))
+        for coord, (size, sun_brightness, planets) in systems:
+            packer.pack(SYSTEM, *coord_values(coord) +
+                        (size, _uint(sun_brightness), len(planets)))
+            for (name, emperor, brightness, distance, resources, buildings,
+                 last_update) in planets:
+                resources = resources[0]
+                packer.pack(PLANET, packer.string(name),
+                            packer.string(emperor), _uint(brightness),
+                            _uint(distance), last_update,
+                            *[resources[res] for res in ALL_RESOURCES] +
+                            [len(buildings)])
+                for abbr, level in buildings:
+                    packer.pack(BUILDING, packer.string(abbr), level)
+
+        events = engine.events.__getstate__()
+        packer.pack(COUNT, len(events))
+        for descriptor, delay, trigger_time, action, args, kwargs in events:
+            packer.pack(EVENT, packer.string(descriptor), delay, trigger_time,
+                        packer.string(action),
+                        packer.string(json.dumps([args, kwargs])))
+        return packer.getvalue()
+
+    def _unpack(self, unpacker):
+        """Return the current object name and (user, galaxy, events) state.
+        """
+        current_obj, has_galaxy, seed = unpacker.unpack(META)
+        seed = unpacker.string(seed)
+
+        user_state = None
+        has_user, name, planet_count = unpacker.unpack(USER)
+        if has_user:
+            planets = []
+            for _ in range(planet_count):
+                values = unpacker.unpack(COORD)
+                planets.append(coord_state(*values[:4]) + (str(values[4]),))
+            user_state = (unpacker.string(name), planets)
+
+        systems = []
+        count, = unpacker.unpack(COUNT)
+        for _ in range(count):
+            values = unpacker.unpack(SYSTEM)
+            size, sun_brightness, planet_count = values[4:]
+            planets = []
+            for _ in range(planet_count):
+                values_pl = unpacker.unpack(PLANET)
+                (name, emperor, brightness, distance,
+                 last_update) = values_pl[:5]
+                resources = dict(zip(ALL_RESOURCES, values_pl[5:-1]))
+                buildings = []
+                for _ in range(values_pl[-1]):
+                    abbr, level = unpacker.unpack(BUILDING)
+                    buildings.append((unpacker.string(abbr), level))
+                planets.append((unpacker.string(name),
+                                unpacker.string(emperor),
+                                _from_uint(brightness), _from_uint(distance),
+                                (resources,), buildings, last_update))
+            systems.append((coord_state(*values[:4]),
+                            (size, _from_uint(sun_brightness), planets)))
+
+        galaxy_state = None
+        if has_galaxy:
+            galaxy_state = (systems, None if seed is None else int(seed))
+
+        events = []
+        count, = unpacker.unpack(COUNT)
+        for _ in range(count):
+            descriptor, delay, trigger_time, action, args = (
+                unpacker.unpack(EVENT))
+            args, kwargs = json.loads(unpacker.string(args))
+            events.append((unpacker.string(descriptor), delay, trigger_time,
+                           unpacker.string(action), args, kwargs))
+        return (unpacker.string(current_obj),
+                (user_state, galaxy_state, events))
@@ -0,0 +1,162 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import uuid
+from logging import debug
+
+from .base import Storage, atomic_write
+
+LOG_SUFFIX = '.log'
+
+
+class JsonStorage(Storage):
+
+    """Save the whole engine state as a single JSON document.
+
+    Incremental saves append the systems and user that changed to a delta log
+    next to the save file, one JSON record per line. Loading replays the log
+    over the save file. The log is compacted into a full save once it holds
+    compact_records records or grows larger than the save file.
+
+    Full saves atomically replace the save file. Each one has a new
+    generation and log records are only replayed over the generation they
+    were written for, so a crash before a stale log is removed is harmless.
+    Journal records are appended to the same log.
+    """
+
+    name = 'json'
+    compact_records = 100
+
+    def __init__(self):
+        # the save file and generation the delta log applies to
+        self.base_file = None
+        self.generation = None
+        self.log_records = 0
+
+    @classmethod
+    def detect(cls, save_file):
+        """JSON is the fallback format for any save file."""
+        return True
+
+    @staticmethod
+    def log_file(save_file):
+        return save_file + LOG_SUFFIX
+
+    def load(self, engine):
+        with open(engine.save_file, 'r') as sf:
+            saved = json.load(sf)
+        # saves from before generations were added have none
+        current_obj_name, state = saved[:2]
+        self.generation = saved[2] if len(saved) > 2 else None
+        self.base_file = engine.save_file
+        self.log_records = 0
+        log_file = self.log_file(engine.save_file)
+        if os.path.exists(log_file):
+            current_obj_name, state = self._replay(log_file, current_obj_name,
+                                                   state)
+        engine.__setstate__(state)
+        return current_obj_name
+
+    def _replay(self, log_file, current_obj_name, state):
+        save_file, user_state, galaxy_state = state[:3]
+        events = state[3] if len(state) > 3 else []
+        systems = seed = None
+        if galaxy_state is not None:
+            systems = dict((tuple(coord), system)
+                           for coord, system in galaxy_state[0])
+            seed = galaxy_state[1] if len(galaxy_state) > 1 else None
+        with open(log_file, 'r') as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # an interrupted append, everything before it is intact
+                    debug('Ignoring truncated delta log record')
+                    break
+                if record.get('generation') != self.generation:
+                    debug('Ignoring stale delta log record')
+                    continue
+                self.log_records += 1
+                current_obj_name = record['current_object']
+                if 'user' in record:
+                    user_state = record['user']
+                if 'events' in record:
+                    events = record['events']
+                if 'seed' in record:
+                    seed = record['seed']
+                    systems = {} if systems is None else systems
+                for coord, system in record['systems']:
+                    systems[tuple(coord)] = system
+        debug('Replayed {} delta log records'.format(self.log_records))
+        if systems is not None:
+            galaxy_state = (list(systems.items()), seed)
+        return current_obj_name, (save_file, user_state, galaxy_state,
+                                  events)
+
+    def save(self, engine, current_obj_name, incremental=False):
+        if incremental and self._can_append(engine):
+            self._append(engine, current_obj_name)
+            return
+        generation = uuid.uuid4().hex
+        # gather the state first, it may be read lazily from the save file
+        state = (current_obj_name, engine.__getstate__(), generation)
+        with atomic_write(engine.save_file) as fd:
+            json.dump(state, fd)
+        log_file = self.log_file(engine.save_file)
+        if os.path.exists(log_file):
+            os.remove(log_file)
+        self.base_file = engine.save_file
+        self.generation = generation
+        self.log_records = 0
+
+    def journal(self, engine, current_obj_name, command):
+        if self.base_file != engine.save_file:
+            self.save(engine, current_obj_name)
+            return
+        self._append(engine, current_obj_name, command=command)
+
+    def _can_append(self, engine):
+        if self.base_file != engine.save_file:
+            return False
+        if self.log_records >= self.compact_records:
+            debug('Compacting the delta log')
+            return False
+        log_file = self.log_file(engine.save_file)
+        if (os.path.exists(log_file) and os.path.getsize(log_file) >
+                os.path.getsize(engine.save_file)):
+            debug('Compacting the delta log')
+            return False
+        return True
+
+    def _append(self, engine, current_obj_name, command=None):
+        record = {'generation': self.generation,
+                  'current_object': current_obj_name, 'systems': []}
+        if command is not None:
+            record['command'] = command
+        if engine.user is not None and engine.user.is_dirty():
+            record['user'] = engine.user.__getstate__()
+        if engine.events.is_dirty():
+            record['events'] = engine.events.__getstate__()
+        if engine.galaxy is not None:
+            record['seed'] = engine.galaxy.seed
+            record['systems'] = [
+                (coord.__getstate__(), system_state) for coord, system_state
+                in engine.galaxy.dirty_system_states()]
+        with open(self.log_file(engine.save_file), 'a') as log:
+            log.write(json.dumps(record) + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+        self.log_records += 1
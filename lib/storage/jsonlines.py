@@ -0,0 +1,223 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A record per line JSON save format that can be loaded as a stream.
+
+The first line is a header object, the second the user state and every
+following line holds one system as [SystemCoord state, System state]. Loading
+never holds more than one system's JSON in memory at a time.
+"""
+
+import json
+from logging import debug
+from collections import OrderedDict
+
+from lib import model
+from lib.error import SaveFileError
+from lib.model.store import SystemStore
+
+from .base import Storage, atomic_write
+
+FORMAT = 'space-lines'
+FORMAT_VERSION = 1
+# the header is always written with "format" first so it can be detected
+MAGIC = b'{"format": "space-lines"'
+
+
+def _system_coord(coord_state):
+    coord = model.SystemCoord()
+    coord.__setstate__(tuple(coord_state))
+    return coord
+
+
+class JsonLinesSystemStore(SystemStore):
+
+    """A SystemStore that reads systems from a record per line save file.
+
+    Only the byte offset of each system's line is kept in memory and a system
+    is parsed when it is looked up. Systems written to the store are kept in
+    memory until the save file is rewritten.
+    """
+
+    def __init__(self, fileobj, offsets):
+        super().__init__()
+        self._file = fileobj
+        self._offsets = offsets
+
+    def reopen(self, fileobj, offsets):
+        """Read from a newly written save file, the written systems are no
+        longer needed in memory."""
+        self.close()
+        self._file = fileobj
+        self._offsets = offsets
+        self._data = {}
+
+    def _keys(self):
+        keys = list(self._data)
+        keys.extend(coord for coord in self._offsets
+                    if coord not in self._data)
+        return keys
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __contains__(self, coord):
+        return coord in self._data or coord in self._offsets
+
+    def __getitem__(self, coord):
+        if coord in self._data:
+            return self._data[coord]
+        self._file.seek(self._offsets[coord])
+        return json.loads(self._file.readline().decode('utf-8'))[1]
+
+    def __setitem__(self, coord, state):
+        self._data[coord] = state
+
+    def __delitem__(self, coord):
+        if coord not in self:
+            raise KeyError(coord)
+        self._data.pop(coord, None)
+        self._offsets.pop(coord, None)
+
+    def coords(self):
+        return iter(self._keys())
+
+    def items(self):
+        for coord in self._keys():
+            yield coord, self[coord]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class JsonLinesStorage(Storage):
+
+    """Save the game as a header, the user and one line per system.
+
+    By default systems are loaded lazily through a JsonLinesSystemStore. The
+    "eager_load" command line option constructs every system while streaming
+    the file instead.
+    """
+
+    name = 'jsonl'
+
+    def __init__(self, lazy=True):
+        self.lazy = lazy
+        self.store = None
+
+    def __repr__(self):
+        return "{}(lazy: {})".format(self.__class__.__name__, self.lazy)
+
+    @classmethod
+    def detect(cls, save_file):
+        with open(save_file, 'rb') as fin:
+            return fin.read(len(MAGIC)) == MAGIC
+
+    def configure(self, opts):
+        if getattr(opts, 'eager_load', None) is True:
+            self.lazy = False
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def load(self, engine):
+        fin = open(engine.save_file, 'rb')
+        try:
+            header = json.loads(fin.readline().decode('utf-8'))
+            if (header.get('format') != FORMAT or
+                    header.get('version') != FORMAT_VERSION):
+                raise SaveFileError('Unsupported save file format.')
+            user_state = json.loads(fin.readline().decode('utf-8'))
+        except (ValueError, AttributeError):
+            fin.close()
+            raise SaveFileError('Corrupt save file header.')
+        except SaveFileError:
+            fin.close()
+            raise
+
+        engine.user = None
+        if user_state is not None:
+            engine.user = model.User(name='')
+            engine.user.__setstate__(user_state)
+        engine.events.__setstate__(header.get('events', []))
+
+        self.close()
+        engine.galaxy = None
+        if not header['galaxy']:
+            fin.close()
+        elif self.lazy:
+            engine.galaxy = engine._new_galaxy(header['seed'])
+            self.store = JsonLinesSystemStore(
+                fin, self._index(fin, engine.galaxy))
+            engine.galaxy.set_store(self.store)
+        else:
+            with fin:
+                engine.galaxy = engine._new_galaxy()
+                engine.galaxy.__setstate__((self._systems(fin),
+                                            header['seed']))
+        return header['current_object']
+
+    def _systems(self, fin):
+        for line in fin:
+            yield json.loads(line.decode('utf-8'))
+
+    def _index(self, fin, galaxy):
+        """Map each system's SystemCoord to the offset of its line.
+
+        The planet names of an unseeded galaxy are registered on the way.
+        """
+        offsets = {}
+        offset = fin.tell()
+        for line in fin:
+            coord_state, system_state = json.loads(line.decode('utf-8'))
+            offsets[_system_coord(coord_state)] = offset
+            offset += len(line)
+            if galaxy.seed is None:
+                galaxy.planet_names.update(
+                    planet[0] for planet in system_state[2])
+        debug('Indexed {} saved systems'.format(len(offsets)))
+        return offsets
+
+    def save(self, engine, current_obj_name, incremental=False):
+        galaxy = engine.galaxy
+        header = OrderedDict([
+            ('format', FORMAT), ('version', FORMAT_VERSION),
+            ('current_object', current_obj_name),
+            ('galaxy', galaxy is not None),
+            ('seed', None if galaxy is None else galaxy.seed),
+            ('events', engine.events.__getstate__())])
+        user_state = None
+        if engine.user is not None:
+            user_state = engine.user.__getstate__()
+        offsets = {}
+        with atomic_write(engine.save_file, 'wb') as fout:
+            offset = 0
+            for record in (header, user_state):
+                line = (json.dumps(record) + '\n').encode('utf-8')
+                fout.write(line)
+                offset += len(line)
+            if galaxy is not None:
+                for coord, system_state in galaxy.system_states():
+                    line = (json.dumps([coord.__getstate__(), system_state]) +
+                            '\n').encode('utf-8')
+                    fout.write(line)
+                    offsets[coord] = offset
+                    offset += len(line)
+        if self.store is not None and galaxy is not None:
+            # keep serving the galaxy from the new file
+            self.store.reopen(open(engine.save_file, 'rb'), offsets)
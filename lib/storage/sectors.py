@@ -0,0 +1,338 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A save format that splits the galaxy into one file per sector.
+
+The save file is a JSON manifest with the user, the delayed events and the
+list of saved sectors with the system part of the coords of their systems,
+so the coords of the galaxy are known without reading any sector. The
+systems of each sector are saved as [SystemCoord state, System state] pairs
+in a file of their own in the "<save file>.sectors" directory. A sector is
+only read when one of its systems is looked up, and an incremental save only
+rewrites the sectors that changed.
+
+Sector files are named after the save that wrote them and the manifest is
+replaced last, so a crash while saving leaves the previous save intact.
+Files that are no longer in the manifest are removed afterwards.
+"""
+
+import os
+import json
+from logging import debug
+from collections import OrderedDict
+
+from lib import model
+from lib.error import SaveFileError
+from lib.model.store import SystemStore
+
+from .base import Storage, atomic_write, coord_state
+
+FORMAT = 'space-sectors'
+FORMAT_VERSION = 1
+# the manifest is always written with "format" first so it can be detected
+MAGIC = b'{"format": "space-sectors"'
+
+
+def sector_directory(save_file):
+    """The directory the sector files of a save file are kept in."""
+    return save_file + '.sectors'
+
+
+def _system_coord(coord_state):
+    coord = model.SystemCoord()
+    coord.__setstate__(tuple(coord_state))
+    return coord
+
+
+class SectorSystemStore(SystemStore):
+
+    """A SystemStore that reads and writes a sector of systems at a time.
+
+    Saved sectors are read from their file when one of their systems is
+    looked up. Systems written to the store are kept in memory with the rest
+    of their sector until the sectors are written by write.
+
+    If planet_names is given, the names of the planets of every sector read
+    are registered with it. Planet names are then only unique among the
+    sectors that have been read.
+    """
+
+    def __init__(self, directory, sectors, planet_names=None):
+        super().__init__()
+        self.planet_names = planet_names
+        self.reopen(directory, sectors)
+
+    def reopen(self, directory, sectors):
+        """Read from newly written sector files, the loaded sectors are no
+        longer needed in memory.
+
+        :param sectors: Maps each saved sector to the file name of its file
+            in directory and the list of the (system x, system y) of its
+            systems.
+        """
+        self.directory = directory
+        self._files = dict(sectors)
+        # sector: the set of the (system x, system y) saved in its file
+        self._saved = dict((sector, set(systems))
+                           for sector, (_, systems) in self._files.items())
+        # sector: {SystemCoord: system state} of the loaded sectors
+        self._data = {}
+        # sectors that changed since they were read
+        self._dirty = set()
+
+    def __repr__(self):
+        return "{}(directory: {}, sectors: {}, loaded: {})".format(
+            self.__class__.__name__, self.directory, len(self.sectors()),
+            len(self._data))
+
+    def sectors(self):
+        """The sectors that have systems, whether loaded or not."""
+        return set(self._files) | set(sector for sector, chunk in
+                                      self._data.items() if chunk)
+
+    def loaded_sectors(self):
+        return set(self._data)
+
+    def _read(self, sector):
+        filename = self._files[sector][0]
+        with open(os.path.join(self.directory, filename)) as fin:
+            return OrderedDict((_system_coord(coord_state), system_state)
+                               for coord_state, system_state in json.load(fin))
+
+    def _sector(self, sector, create=False):
+        """The {SystemCoord: state} of a sector, which is loaded if needed.
+
+        Returns None for a sector without systems unless create is True.
+        """
+        chunk = self._data.get(sector)
+        if chunk is not None:
+            return chunk
+        if sector in self._files:
+            debug('loading sector: {}'.format(sector))
+            chunk = self._read(sector)
+            if self.planet_names is not None:
+                self.planet_names.update(
+                    planet[0] for system_state in chunk.values()
+                    for planet in system_state[2])
+        elif create:
+            chunk = OrderedDict()
+        else:
+            return None
+        self._data[sector] = chunk
+        return chunk
+
+    def __len__(self):
+        return (sum(len(chunk) for chunk in self._data.values()) +
+                sum(len(systems) for sector, (_, systems)
+                    in self._files.items() if sector not in self._data))
+
+    def __contains__(self, coord):
+        sector = coord.sector
+        if sector not in self._data:
+            # a saved sector is only read if it has the system
+            if coord.system not in self._saved.get(sector, ()):
+                return False
+        chunk = self._sector(sector)
+        return chunk is not None and coord in chunk
+
+    def __getitem__(self, coord):
+        chunk = self._sector(coord.sector)
+        if chunk is None:
+            raise KeyError(coord)
+        return chunk[coord]
+
+    def __setitem__(self, coord, state):
+        self._sector(coord.sector, create=True)[coord] = state
+        self._dirty.add(coord.sector)
+
+    def __delitem__(self, coord):
+        chunk = self._sector(coord.sector)
+        if chunk is None:
+            raise KeyError(coord)
+        del chunk[coord]
+        self._dirty.add(coord.sector)
+
+    def _chunks(self):
+        """Yield (sector, {SystemCoord: state}) for every sector, without
+        keeping the sectors that are not loaded in memory."""
+        for sector, chunk in list(self._data.items()):
+            yield sector, chunk
+        for sector in list(self._files):
+            if sector not in self._data:
+                yield sector, self._read(sector)
+
+    def coords(self):
+        """Yield the SystemCoord of every system, without reading any
+        sector."""
+        for chunk in list(self._data.values()):
+            yield from chunk
+        for sector, (_, systems) in list(self._files.items()):
+            if sector not in self._data:
+                for system in systems:
+                    yield _system_coord(coord_state(*sector + system))
+
+    def items(self):
+        for _, chunk in self._chunks():
+            yield from chunk.items()
+
+    def write(self, directory, generation, full=False):
+        """Write the changed sectors to files in directory.
+
+        Every sector is written if full is True or if directory is not the
+        one the store reads from. Returns the sectors of the manifest, see
+        reopen.
+        """
+        full = full or directory != self.directory
+        sectors = {}
+        written = 0
+        for sector in self.sectors() | self._dirty:
+            if not full and sector not in self._dirty:
+                sectors[sector] = self._files[sector]
+                continue
+            chunk = self._data.get(sector)
+            if chunk is None:
+                chunk = self._read(sector)
+            if not chunk:
+                continue
+            filename = '{}_{}.{}.json'.format(sector[0], sector[1],
+                                              generation)
+            with atomic_write(os.path.join(directory, filename)) as fout:
+                json.dump([[coord.__getstate__(), system_state]
+                           for coord, system_state in chunk.items()], fout)
+            sectors[sector] = (filename, [coord.system for coord in chunk])
+            written += 1
+        debug('Wrote {} of {} sectors'.format(written, len(sectors)))
+        return sectors
+
+
+class SectorStorage(Storage):
+
+    """Save the game as a manifest and a file per sector of systems.
+
+    The systems are loaded lazily through a SectorSystemStore, so only the
+    sectors of the systems that are looked up, e.g. those of the user's
+    planets, are read.
+    """
+
+    name = 'sectors'
+
+    def __init__(self):
+        self.store = None
+        # the galaxy that was last loaded or saved through the store
+        self._galaxy = None
+        # increases with every save, it names the sector files written
+        self.generation = 0
+
+    def __repr__(self):
+        return "{}(generation: {}, store: {})".format(
+            self.__class__.__name__, self.generation, repr(self.store))
+
+    @classmethod
+    def detect(cls, save_file):
+        with open(save_file, 'rb') as fin:
+            return fin.read(len(MAGIC)) == MAGIC
+
+    def close(self):
+        self.store = None
+        self._galaxy = None
+
+    def load(self, engine):
+        try:
+            with open(engine.save_file) as fin:
+                manifest = json.load(fin)
+        except ValueError:
+            raise SaveFileError('Corrupt sector manifest.')
+        if (manifest.get('format') != FORMAT or
+                manifest.get('version') != FORMAT_VERSION):
+            raise SaveFileError('Unsupported save file format.')
+
+        engine.user = None
+        if manifest['user'] is not None:
+            engine.user = model.User(name='')
+            engine.user.__setstate__(manifest['user'])
+        engine.events.__setstate__(manifest['events'])
+        self.generation = manifest['generation']
+
+        self.close()
+        engine.galaxy = None
+        if manifest['galaxy']:
+            sectors = dict(((sector_x, sector_y),
+                            (filename, [tuple(system) for system in systems]))
+                           for sector_x, sector_y, filename, systems
+                           in manifest['sectors'])
+            self.store = SectorSystemStore(
+                sector_directory(engine.save_file), sectors)
+            engine.galaxy = engine._new_galaxy(manifest['seed'],
+                                               store=self.store)
+            if engine.galaxy.seed is None:
+                self.store.planet_names = engine.galaxy.planet_names
+            self._galaxy = engine.galaxy
+        return manifest['current_object']
+
+    def _write_sectors(self, galaxy, directory, incremental):
+        """Write the galaxy's sector files, return the written store.
+
+        The store holds the systems of the galaxy's previous save. When it is
+        also the galaxy's store it holds the systems that are not resident.
+        """
+        store = self.store
+        if store is None or galaxy is not self._galaxy:
+            store, incremental = SectorSystemStore(directory, {}), False
+        elif store.directory != directory:
+            incremental = False
+        if incremental:
+            states = galaxy.dirty_system_states(exclude_store=store)
+        else:
+            states = galaxy.system_states(exclude_store=store)
+        for coord, system_state in states:
+            store[coord] = system_state
+        sectors = store.write(directory, self.generation,
+                              full=not incremental)
+        return store, sectors
+
+    def save(self, engine, current_obj_name, incremental=False):
+        galaxy = engine.galaxy
+        directory = sector_directory(engine.save_file)
+        os.makedirs(directory, exist_ok=True)
+        self.generation += 1
+        store, sectors = None, {}
+        if galaxy is not None:
+            store, sectors = self._write_sectors(galaxy, directory,
+                                                 incremental)
+        manifest = OrderedDict([
+            ('format', FORMAT), ('version', FORMAT_VERSION),
+            ('generation', self.generation),
+            ('current_object', current_obj_name),
+            ('galaxy', galaxy is not None),
+            ('seed', None if galaxy is None else galaxy.seed),
+            ('events', engine.events.__getstate__()),
+            ('user', None if engine.user is None
+             else engine.user.__getstate__()),
+            ('sectors', [[sector[0], sector[1], filename, systems]
+                         for sector, (filename, systems)
+                         in sorted(sectors.items())])])
+        with atomic_write(engine.save_file) as fout:
+            json.dump(manifest, fout)
+        self._remove_old_files(directory, sectors)
+        if store is not None:
+            # read from the new files, which frees the written sectors
+            store.reopen(directory, sectors)
+        self.store, self._galaxy = store, galaxy
+
+    @staticmethod
+    def _remove_old_files(directory, sectors):
+        keep = set(filename for filename, _ in sectors.values())
+        for filename in os.listdir(directory):
+            if filename.endswith('.json') and filename not in keep:
+                os.remove(os.path.join(directory, filename))
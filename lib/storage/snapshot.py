@@ -0,0 +1,439 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Read only, memory mapped snapshots of a galaxy for analysis.
+
+A snapshot holds every system, planet and building of a galaxy in fixed size
+columns that are read in place through mmap. Any number of processes can
+share one page cached copy, and opening a snapshot only reads its header.
+The file is uncompressed and little endian:
+
+- HEADER: the magic bytes, the format version, the number of systems,
+  planets, buildings and strings, the size of the string data and the
+  string index of the galaxy's seed. The seed is saved as a decimal string
+  since it may be any int.
+- The system columns, SYSTEM_COLUMNS. Systems are sorted by coord so they
+  can be looked up by binary search, and refer to their planets by the index
+  of the first one and a count.
+- The planet columns, PLANET_COLUMNS, with a column per resource. Planets
+  refer to their buildings in the same way.
+- The building columns, BUILDING_COLUMNS.
+- The string table: the offset of every string in the string data and one
+  past the last, then the UTF-8 string data. Strings are referred to by
+  index, NONE is None.
+
+Every column starts at a multiple of 8 bytes.
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+
+from lib import model
+from lib.error import SaveFileError
+from lib.model.resources import ALL_RESOURCES
+from lib.model.spatial import SpatialIndex
+
+from .base import atomic_write, coord_state, coord_values
+
+MAGIC = b'SPCS'
+FORMAT_VERSION = 1
+# the string index of None, also used for missing ints
+NONE = 0xFFFFFFFF
+
+# magic, version, systems, planets, buildings, strings, string data size,
+# seed
+HEADER = struct.Struct('<4sIQQQQQI')
+# (name, array typecode) of the columns of each table
+SYSTEM_COLUMNS = (('sector_x', 'i'), ('sector_y', 'i'), ('system_x', 'i'),
+                  ('system_y', 'i'), ('size', 'I'), ('sun_brightness', 'I'),
+                  ('first_planet', 'I'), ('planet_count', 'I'))
+PLANET_COLUMNS = ((('name', 'I'), ('emperor', 'I'), ('sun_brightness', 'I'),
+                   ('sun_distance', 'I'), ('last_update', 'd')) +
+                  tuple((res, 'd') for res in ALL_RESOURCES) +
+                  (('first_building', 'I'), ('building_count', 'I')))
+BUILDING_COLUMNS = (('type', 'I'), ('level', 'I'))
+TABLES = (('systems', SYSTEM_COLUMNS), ('planets', PLANET_COLUMNS),
+          ('buildings', BUILDING_COLUMNS))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _layout(counts):
+    """Map each (table, column) to its (offset, typecode, length).
+
+    :param counts: The number of records of each table and "strings" and
+        "string_data", the number of strings and the size of their data.
+    """
+    layout = {}
+    offset = _align(HEADER.size)
+    columns = [(table, name, typecode, counts[table])
+               for table, table_columns in TABLES
+               for name, typecode in table_columns]
+    columns.append(('strings', 'offsets', 'I', counts['strings'] + 1))
+    columns.append(('strings', 'data', 'B', counts['string_data']))
+    for table, name, typecode, length in columns:
+        layout[table, name] = (offset, typecode, length)
+        offset = _align(offset + array(typecode).itemsize * length)
+    return layout
+
+
+def _uint(value):
+    return NONE if value is None else value
+
+
+def _from_uint(value):
+    return None if value == NONE else value
+
+
+def export_snapshot(engine, filename):
+    """Write a snapshot of every system the engine's galaxy knows about.
+
+    The saved system states are streamed from the galaxy and the pristine
+    systems of a seeded galaxy are regenerated, none of them are made
+    resident. Only the system rows are sorted by coord, the planets are
+    written in the order they are read. The file is replaced atomically,
+    processes that have the old snapshot open keep reading it.
+    """
+    galaxy = engine.galaxy
+    columns = dict(((table, name), array(typecode))
+                   for table, table_columns in TABLES
+                   for name, typecode in table_columns)
+    strings = {}
+
+    def string(value):
+        if value is None:
+            return NONE
+        return strings.setdefault(value, len(strings))
+
+    # the values of the system columns of every system
+    systems = []
+    planet_count = building_count = 0
+    for coord, (size, sun_brightness, planets) in _system_states(galaxy):
+        systems.append(coord_values(coord) + (
+            size, _uint(sun_brightness), planet_count, len(planets)))
+        for (name, emperor, brightness, distance, resources, buildings,
+             last_update) in planets:
+            resources = resources[0]
+            values = ([string(name), string(emperor), _uint(brightness),
+                       _uint(distance), last_update] +
+                      [resources[res] for res in ALL_RESOURCES] +
+                      [building_count, len(buildings)])
+            for (column, _), value in zip(PLANET_COLUMNS, values):
+                columns['planets', column].append(value)
+            for abbr, level in buildings:
+                columns['buildings', 'type'].append(string(abbr))
+                columns['buildings', 'level'].append(level)
+            planet_count += 1
+            building_count += len(buildings)
+
+    systems.sort()
+    for (name, _), values in zip(SYSTEM_COLUMNS, zip(*systems)):
+        columns['systems', name].extend(values)
+
+    seed = None if galaxy is None else galaxy.seed
+    seed = string(None if seed is None else str(seed))
+    data = [value.encode('utf-8') for value in strings]
+    offsets = array('I', [0])
+    for value in data:
+        offsets.append(offsets[-1] + len(value))
+    columns['strings', 'offsets'] = offsets
+    columns['strings', 'data'] = array('B', b''.join(data))
+
+    counts = {'systems': len(systems), 'planets': planet_count,
+              'buildings': building_count, 'strings': len(data),
+              'string_data': offsets[-1]}
+    with atomic_write(filename, 'wb') as fout:
+        fout.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, counts['systems'], counts['planets'],
+            counts['buildings'], counts['strings'], counts['string_data'],
+            seed))
+        position = HEADER.size
+        for key, (offset, _, _) in sorted(_layout(counts).items(),
+                                          key=lambda item: item[1][0]):
+            fout.write(b'\0' * (offset - position))
+            column = columns[key]
+            if sys.byteorder == 'big':
+                column.byteswap()
+            fout.write(column.tobytes())
+            position = offset + len(column) * column.itemsize
+
+
+def _system_states(galaxy):
+    """Yield (SystemCoord, system state) of every system the galaxy knows
+    about without making any of them resident."""
+    if galaxy is None:
+        return
+    saved = set()
+    for coord, system_state in galaxy.system_states():
+        saved.add(coord)
+        yield coord, system_state
+    if galaxy.seed is not None:
+        for coord in galaxy.index:
+            if coord not in saved:
+                yield coord, galaxy.generate_system(coord).__getstate__()
+
+
+class PlanetView(object):
+
+    """A read only planet of a GalaxySnapshot.
+
+    It has the saved attributes of a Planet, its resources are frozen and its
+    buildings are created when they are read.
+    """
+
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot, index):
+        self._snapshot = snapshot
+        self._index = index
+
+    def _get(self, column):
+        return self._snapshot.column('planets', column)[self._index]
+
+    @property
+    def name(self):
+        return self._snapshot.string(self._get('name'))
+
+    @property
+    def emperor(self):
+        return self._snapshot.string(self._get('emperor'))
+
+    @property
+    def sun_brightness(self):
+        return _from_uint(self._get('sun_brightness'))
+
+    @property
+    def sun_distance(self):
+        return _from_uint(self._get('sun_distance'))
+
+    @property
+    def last_update(self):
+        return self._get('last_update')
+
+    @property
+    def resources(self):
+        return model.Resources(**dict(
+            (res, self._get(res)) for res in ALL_RESOURCES)).frozen()
+
+    def building_levels(self):
+        """The (type abbreviation, level) of every building."""
+        first = self._get('first_building')
+        types = self._snapshot.column('buildings', 'type')
+        levels = self._snapshot.column('buildings', 'level')
+        return [(self._snapshot.string(types[index]), levels[index])
+                for index in range(first,
+                                   first + self._get('building_count'))]
+
+    @property
+    def buildings(self):
+        return [model.get_building(abbr, level)
+                for abbr, level in self.building_levels()]
+
+    def __repr__(self):
+        return "{}(name: {}, emperor: {})".format(
+            self.__class__.__name__, self.name, self.emperor)
+
+    def __getstate__(self):
+        """The same state as the Planet's."""
+        return (self.name, self.emperor, self.sun_brightness,
+                self.sun_distance, self.resources.__getstate__(),
+                self.building_levels(), self.last_update)
+
+
+class SystemView(object):
+
+    """A read only system of a GalaxySnapshot."""
+
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot, index):
+        self._snapshot = snapshot
+        self._index = index
+
+    def _get(self, column):
+        return self._snapshot.column('systems', column)[self._index]
+
+    @property
+    def size(self):
+        return self._get('size')
+
+    @property
+    def sun_brightness(self):
+        return _from_uint(self._get('sun_brightness'))
+
+    @property
+    def planets(self):
+        first = self._get('first_planet')
+        return [PlanetView(self._snapshot, index) for index in
+                range(first, first + self._get('planet_count'))]
+
+    def __repr__(self):
+        return "{}(size: {}, sun brightness: {})".format(
+            self.__class__.__name__, self.size, self.sun_brightness)
+
+    def __getstate__(self):
+        """The same state as the System's."""
+        return (self.size, self.sun_brightness,
+                [planet.__getstate__() for planet in self.planets])
+
+
+class GalaxySnapshot(object):
+
+    """A read only view of a snapshot written by export_snapshot.
+
+    It answers the queries of a Galaxy, so it can be the galaxy of a
+    ModelQueryMixin, but returns read only SystemView and PlanetView objects.
+    The columns of a table can be read in bulk without copying through
+    column(), e.g. for numpy.frombuffer. They are only valid until the
+    snapshot is closed.
+    """
+
+    def __init__(self, filename):
+        if sys.byteorder != 'little':
+            raise SaveFileError('Snapshots can only be read on little endian '
+                                'machines.')
+        self.filename = filename
+        with open(filename, 'rb') as fin:
+            self._mmap = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, systems, planets, buildings, strings,
+             string_data, seed) = HEADER.unpack_from(self._mmap)
+        except struct.error:
+            self.close()
+            raise SaveFileError('Truncated snapshot header.')
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise SaveFileError(
+                'Unsupported snapshot format version {}.'.format(version))
+        self._layout = _layout({'systems': systems, 'planets': planets,
+                                'buildings': buildings, 'strings': strings,
+                                'string_data': string_data})
+        offset, typecode, length = self._layout['strings', 'data']
+        if len(self._mmap) < offset + length:
+            self.close()
+            raise SaveFileError('Truncated snapshot.')
+        self._buffer = memoryview(self._mmap)
+        self._columns = {}
+        self._index = None
+        seed = self.string(seed)
+        self.seed = None if seed is None else int(seed)
+
+    def __repr__(self):
+        return "{}(filename: {}, seed: {}, systems: {})".format(
+            self.__class__.__name__, self.filename, self.seed, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for column in getattr(self, '_columns', {}).values():
+            column.release()
+        self._columns = {}
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.release()
+            self._buffer = None
+        self._mmap.close()
+
+    def column(self, table, name):
+        """A memoryview of a column of the "systems", "planets" or
+        "buildings" table, or of the "strings" table's "offsets" or
+        "data"."""
+        view = self._columns.get((table, name))
+        if view is None:
+            offset, typecode, length = self._layout[table, name]
+            size = array(typecode).itemsize * length
+            view = self._buffer[offset:offset + size].cast(typecode)
+            self._columns[table, name] = view
+        return view
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        offsets = self.column('strings', 'offsets')
+        data = self.column('strings', 'data')
+        return str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def __len__(self):
+        return self._layout['systems', 'sector_x'][2]
+
+    def _coord_values(self, index):
+        return tuple(self.column('systems', name)[index]
+                     for name in ('sector_x', 'sector_y', 'system_x',
+                                  'system_y'))
+
+    def _find(self, coord):
+        """The index of the system at coord, or None."""
+        key = coord_values(coord)
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._coord_values(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self._coord_values(low) == key:
+            return low
+        return None
+
+    def coords(self):
+        """Yield the SystemCoord of every system, in coord order."""
+        for index in range(len(self)):
+            coord = model.SystemCoord()
+            coord.__setstate__(coord_state(*self._coord_values(index)))
+            yield coord
+
+    def __contains__(self, coord):
+        return self._find(coord) is not None
+
+    def system(self, coord):
+        index = self._find(coord)
+        if index is None:
+            raise KeyError(coord)
+        return SystemView(self, index)
+
+    def planet(self, coord):
+        return self.system(coord).planets[int(coord.planet)]
+
+    def resident_planets(self):
+        """Yield every planet, like Galaxy.resident_planets."""
+        for index in range(len(self.column('planets', 'name'))):
+            yield PlanetView(self, index)
+
+    def system_states(self, exclude_store=None):
+        """Yield (SystemCoord, system state) for every system."""
+        for index, coord in enumerate(self.coords()):
+            yield coord, SystemView(self, index).__getstate__()
+
+    @property
+    def index(self):
+        """The SpatialIndex of the systems, built when first used."""
+        if self._index is None:
+            self._index = SpatialIndex(self.coords())
+        return self._index
+
+    def systems_within(self, coord, radius):
+        return self.index.within_radius(coord, radius)
+
+    def systems_in_rectangle(self, corner, opposite_corner):
+        return self.index.within_rectangle(corner, opposite_corner)
+
+    def nearest_systems(self, coord, count=1):
+        return self.index.nearest(coord, count)
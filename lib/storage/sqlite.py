@@ -0,0 +1,433 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A sqlite save game backend using the schema described in notes.rst."""
+
+import os
+import json
+import time
+import sqlite3
+from logging import debug
+from collections import defaultdict
+
+from lib import model
+from lib.model.store import SystemStore
+
+from .base import Storage, coord_state, coord_values, fsync_dir
+
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+SCHEMA_VERSION = 1
+
+_RESOURCE_COLUMNS = ', '.join(model.ALL_RESOURCES)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS GAME (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS COORDS (
+    id INTEGER PRIMARY KEY,
+    sector_x INTEGER NOT NULL,
+    sector_y INTEGER NOT NULL,
+    system_x INTEGER NOT NULL,
+    system_y INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS coords_position
+    ON COORDS (sector_x, sector_y, system_x, system_y);
+CREATE TABLE IF NOT EXISTS SYSTEMS (
+    id INTEGER PRIMARY KEY,
+    size INTEGER,
+    sun_brightness INTEGER,
+    coord INTEGER UNIQUE REFERENCES COORDS(id),
+    last_update REAL
+);
+CREATE TABLE IF NOT EXISTS RESOURCES (
+    id INTEGER PRIMARY KEY,
+    {resources}
+);
+CREATE TABLE IF NOT EXISTS PLANETS (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    orbit INTEGER,
+    system INTEGER REFERENCES SYSTEMS(id),
+    emperor TEXT,
+    resources INTEGER REFERENCES RESOURCES(id),
+    last_update REAL
+);
+CREATE INDEX IF NOT EXISTS planets_system ON PLANETS (system, orbit);
+CREATE TABLE IF NOT EXISTS BUILDINGS (
+    id INTEGER PRIMARY KEY,
+    planet INTEGER REFERENCES PLANETS(id),
+    type TEXT,
+    level INTEGER,
+    under_construction INTEGER
+);
+CREATE INDEX IF NOT EXISTS buildings_planet ON BUILDINGS (planet);
+CREATE TABLE IF NOT EXISTS USERS (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    home_planet INTEGER REFERENCES PLANETS(id),
+    last_update REAL
+);
+CREATE TABLE IF NOT EXISTS USER_PLANETS (
+    user INTEGER REFERENCES USERS(id),
+    position INTEGER,
+    coord INTEGER REFERENCES COORDS(id),
+    planet INTEGER
+);
+""".format(resources=',\n    '.join(
+    '{} REAL'.format(res) for res in model.ALL_RESOURCES))
+
+
+def connect(filename):
+    """Open a save database, creating the schema if needed."""
+    conn = sqlite3.connect(filename)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SqliteSystemStore(SystemStore):
+
+    """A SystemStore backed by the tables of a sqlite save database.
+
+    Systems are read from the database when they are looked up. Writing a
+    system reads its saved rows and only updates the rows of planets whose
+    state differs from them, nothing is cached between calls. Changes are
+    not committed, that is left to the owner of the connection.
+    """
+
+    def __init__(self, connection):
+        self._conn = connection
+
+    def _coord_id(self, coord):
+        """Find or create the COORDS row for coord."""
+        values = coord_values(coord)
+        row = self._conn.execute(
+            'SELECT id FROM COORDS WHERE sector_x = ? AND sector_y = ? AND '
+            'system_x = ? AND system_y = ?', values).fetchone()
+        if row is not None:
+            return row[0]
+        return self._conn.execute(
+            'INSERT INTO COORDS (sector_x, sector_y, system_x, system_y) '
+            'VALUES (?, ?, ?, ?)', values).lastrowid
+
+    def _system_id(self, coord):
+        """The SYSTEMS.id of coord or None if it is not in the database."""
+        row = self._conn.execute(
+            'SELECT SYSTEMS.id FROM SYSTEMS JOIN COORDS '
+            'ON SYSTEMS.coord = COORDS.id WHERE sector_x = ? AND '
+            'sector_y = ? AND system_x = ? AND system_y = ?',
+            coord_values(coord)).fetchone()
+        return None if row is None else row[0]
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM SYSTEMS').fetchone()[0]
+
+    def __contains__(self, coord):
+        return self._system_id(coord) is not None
+
+    def __getitem__(self, coord):
+        system_id = self._system_id(coord)
+        if system_id is None:
+            raise KeyError(coord)
+        size, brightness, planets = self._read(system_id)
+        return (size, brightness, [state for _, _, state in planets])
+
+    def _read(self, system_id):
+        """Return the size, sun brightness and a (PLANETS.id, RESOURCES.id,
+        planet state) tuple per planet of a saved system."""
+        size, brightness = self._conn.execute(
+            'SELECT size, sun_brightness FROM SYSTEMS WHERE id = ?',
+            (system_id,)).fetchone()
+        buildings = defaultdict(list)
+        for planet_id, bld_type, level in self._conn.execute(
+                'SELECT planet, type, level FROM BUILDINGS WHERE planet IN '
+                '(SELECT id FROM PLANETS WHERE system = ?) ORDER BY id',
+                (system_id,)):
+            buildings[planet_id].append((bld_type, level))
+        planets = []
+        for row in self._conn.execute(
+                'SELECT PLANETS.id, resources, name, emperor, orbit, '
+                'last_update, {} FROM PLANETS JOIN RESOURCES ON '
+                'PLANETS.resources = RESOURCES.id WHERE system = ? '
+                'ORDER BY orbit'.format(_RESOURCE_COLUMNS), (system_id,)):
+            planet_id, resources_id, name, emperor, orbit, last_update = (
+                row[:6])
+            resources = (dict(zip(model.ALL_RESOURCES, row[6:])),)
+            state = (name, emperor, brightness, orbit, resources,
+                     buildings[planet_id], last_update)
+            planets.append((planet_id, resources_id, state))
+        return (size, brightness, planets)
+
+    def __setitem__(self, coord, state):
+        size, brightness, planets = state
+        system_id = self._system_id(coord)
+        if system_id is None:
+            system_id = self._conn.execute(
+                'INSERT INTO SYSTEMS (size, sun_brightness, coord, '
+                'last_update) VALUES (?, ?, ?, ?)',
+                (size, brightness, self._coord_id(coord),
+                 time.time())).lastrowid
+            written = {}
+        else:
+            # key: orbit, value: (PLANETS.id, RESOURCES.id, state)
+            written = dict((state[3], (planet_id, resources_id, state))
+                           for planet_id, resources_id, state
+                           in self._read(system_id)[2])
+        changed = False
+        for planet_state in planets:
+            planet_state = tuple(planet_state)
+            saved = written.get(planet_state[3])
+            if saved is None:
+                self._insert_planet(system_id, planet_state)
+            elif saved[2] != planet_state:
+                self._update_planet(saved[0], saved[1], planet_state)
+            else:
+                continue
+            changed = True
+        if changed:
+            self._conn.execute('UPDATE SYSTEMS SET last_update = ? WHERE '
+                               'id = ?', (time.time(), system_id))
+
+    def _resource_values(self, planet_state):
+        resources = planet_state[4][0]
+        return [resources[res] for res in model.ALL_RESOURCES]
+
+    def _insert_buildings(self, planet_id, planet_state):
+        self._conn.executemany(
+            'INSERT INTO BUILDINGS (planet, type, level, under_construction) '
+            'VALUES (?, ?, ?, 0)',
+            ((planet_id, bld_type, level)
+             for bld_type, level in planet_state[5]))
+
+    def _insert_planet(self, system_id, planet_state):
+        (name, emperor, _, orbit, _, _, last_update) = planet_state
+        resources_id = self._conn.execute(
+            'INSERT INTO RESOURCES ({}) VALUES ({})'.format(
+                _RESOURCE_COLUMNS, ', '.join('?' * len(model.ALL_RESOURCES))),
+            self._resource_values(planet_state)).lastrowid
+        planet_id = self._conn.execute(
+            'INSERT INTO PLANETS (name, orbit, system, emperor, resources, '
+            'last_update) VALUES (?, ?, ?, ?, ?, ?)',
+            (name, orbit, system_id, emperor, resources_id,
+             last_update)).lastrowid
+        self._insert_buildings(planet_id, planet_state)
+
+    def _update_planet(self, planet_id, resources_id, planet_state):
+        (name, emperor, _, _, _, _, last_update) = planet_state
+        debug('writing changed planet {}'.format(name))
+        self._conn.execute(
+            'UPDATE RESOURCES SET {} WHERE id = ?'.format(', '.join(
+                '{} = ?'.format(res) for res in model.ALL_RESOURCES)),
+            self._resource_values(planet_state) + [resources_id])
+        self._conn.execute(
+            'UPDATE PLANETS SET name = ?, emperor = ?, last_update = ? '
+            'WHERE id = ?', (name, emperor, last_update, planet_id))
+        self._conn.execute('DELETE FROM BUILDINGS WHERE planet = ?',
+                           (planet_id,))
+        self._insert_buildings(planet_id, planet_state)
+
+    def __delitem__(self, coord):
+        system_id = self._system_id(coord)
+        if system_id is None:
+            raise KeyError(coord)
+        planets = 'SELECT id FROM PLANETS WHERE system = ?'
+        self._conn.execute('DELETE FROM BUILDINGS WHERE planet IN '
+                           '({})'.format(planets), (system_id,))
+        self._conn.execute('DELETE FROM RESOURCES WHERE id IN (SELECT '
+                           'resources FROM PLANETS WHERE system = ?)',
+                           (system_id,))
+        self._conn.execute('DELETE FROM PLANETS WHERE system = ?',
+                           (system_id,))
+        self._conn.execute('DELETE FROM SYSTEMS WHERE id = ?', (system_id,))
+
+    def coords(self):
+        rows = self._conn.execute(
+            'SELECT sector_x, sector_y, system_x, system_y FROM SYSTEMS JOIN '
+            'COORDS ON SYSTEMS.coord = COORDS.id ORDER BY SYSTEMS.id')
+        for row in rows.fetchall():
+            coord = model.SystemCoord()
+            coord.__setstate__(coord_state(*row))
+            yield coord
+
+    def items(self):
+        for coord in self.coords():
+            yield coord, self[coord]
+
+    def planet_names(self):
+        """Yield the name of every planet in the database."""
+        for (name,) in self._conn.execute('SELECT name FROM PLANETS'):
+            yield name
+
+    def planet_id(self, coord):
+        """The PLANETS.id of the planet at the Coord coord, if saved."""
+        system_id = self._system_id(coord.system_coord())
+        if system_id is None:
+            return None
+        row = self._conn.execute(
+            'SELECT id FROM PLANETS WHERE system = ? AND orbit = ?',
+            (system_id, int(coord.planet) + 1)).fetchone()
+        return None if row is None else row[0]
+
+    def coord_id(self, coord):
+        """Find or create the COORDS row of a Coord or SystemCoord."""
+        return self._coord_id(coord)
+
+
+class SqliteStorage(Storage):
+
+    """Save the game to a sqlite database.
+
+    Systems are loaded lazily when the galaxy looks them up. Saving to the
+    open save database is always incremental: only dirty systems are
+    written, and of those only the planets whose state changed. The first
+    save to a file that is not already an open save database writes a new
+    database which then replaces the file.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self):
+        self.filename = None
+        self.store = None
+        self._conn = None
+        self._meta = {}
+        self._user_state = None
+
+    @classmethod
+    def detect(cls, save_file):
+        with open(save_file, 'rb') as fin:
+            return fin.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+    def _open(self, filename):
+        if self.filename == filename:
+            return
+        # the old connection is not closed, a galaxy may still be reading
+        # systems through its store
+        self._conn = connect(filename)
+        self.filename = filename
+        self.store = SqliteSystemStore(self._conn)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self.filename, self.store, self._conn = None, None, None
+
+    def _read_meta(self):
+        self._meta = dict(self._conn.execute('SELECT key, value FROM GAME'))
+        return dict((key, json.loads(value))
+                    for key, value in self._meta.items())
+
+    def _read_user(self):
+        row = self._conn.execute('SELECT id, name FROM USERS').fetchone()
+        self._user_state = None
+        if row is None:
+            return None
+        user_id, name = row
+        planets = []
+        for sector_x, sector_y, system_x, system_y, planet in (
+                self._conn.execute(
+                    'SELECT sector_x, sector_y, system_x, system_y, planet '
+                    'FROM USER_PLANETS JOIN COORDS ON USER_PLANETS.coord = '
+                    'COORDS.id WHERE user = ? ORDER BY position',
+                    (user_id,))):
+            planets.append(coord_state(sector_x, sector_y, system_x,
+                                       system_y) + (str(planet),))
+        self._user_state = (name, planets)
+        user = model.User(name='')
+        user.__setstate__(self._user_state)
+        return user
+
+    def load(self, engine):
+        self._open(engine.save_file)
+        meta = self._read_meta()
+        engine.user = self._read_user()
+        engine.events.__setstate__(meta.get('events', []))
+        engine.galaxy = None
+        if 'seed' in meta:
+            engine.galaxy = engine._new_galaxy(meta['seed'], store=self.store)
+            if meta['seed'] is None:
+                # keep generated names unique without loading every system
+                engine.galaxy.planet_names.update(self.store.planet_names())
+        return meta.get('current_object')
+
+    def save(self, engine, current_obj_name, incremental=False):
+        if self.filename == engine.save_file:
+            with self._conn:
+                self._write(self._conn, self.store, engine, current_obj_name,
+                            dirty_only=True)
+            return
+
+        debug('Writing new sqlite save file')
+        tmp_file = engine.save_file + '.tmp'
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        conn = connect(tmp_file)
+        self._meta, self._user_state = {}, None
+        try:
+            with conn:
+                self._write(conn, SqliteSystemStore(conn), engine,
+                            current_obj_name)
+        finally:
+            conn.close()
+        os.replace(tmp_file, engine.save_file)
+        fsync_dir(os.path.dirname(os.path.abspath(engine.save_file)))
+        self._open(engine.save_file)
+
+    def _write(self, conn, store, engine, current_obj_name,
+               dirty_only=False):
+        meta = {'version': SCHEMA_VERSION, 'current_object': current_obj_name,
+                'events': engine.events.__getstate__()}
+        if engine.galaxy is not None:
+            meta['seed'] = engine.galaxy.seed
+            system_states = engine.galaxy.system_states
+            if dirty_only:
+                system_states = engine.galaxy.dirty_system_states
+            for coord, system_state in system_states(exclude_store=store):
+                store[coord] = system_state
+        self._write_user(conn, store, engine.user)
+        self._write_meta(conn, meta)
+
+    def _write_meta(self, conn, meta):
+        meta = dict((key, json.dumps(value)) for key, value in meta.items())
+        conn.executemany('DELETE FROM GAME WHERE key = ?',
+                         ((key,) for key in self._meta if key not in meta))
+        conn.executemany(
+            'INSERT OR REPLACE INTO GAME (key, value) VALUES (?, ?)',
+            ((key, value) for key, value in meta.items()
+             if self._meta.get(key) != value))
+        self._meta = meta
+
+    def _write_user(self, conn, store, user):
+        state = None if user is None else user.__getstate__()
+        if state == self._user_state:
+            return
+        conn.execute('DELETE FROM USER_PLANETS')
+        conn.execute('DELETE FROM USERS')
+        self._user_state = state
+        if user is None:
+            return
+        home_planet = None
+        if user.planets:
+            home_planet = store.planet_id(user.planets[0])
+        user_id = conn.execute(
+            'INSERT INTO USERS (name, home_planet, last_update) '
+            'VALUES (?, ?, ?)', (user.name, home_planet, time.time())
+        ).lastrowid
+        conn.executemany(
+            'INSERT INTO USER_PLANETS (user, position, coord, planet) '
+            'VALUES (?, ?, ?, ?)',
+            ((user_id, position, store.coord_id(coord), int(coord.planet))
+             for position, coord in enumerate(user.planets)))
@@ -25,6 +25,8 @@ import logging
 from argparse import ArgumentParser
 
 from lib.engine import SpaceEngine
+from lib.storage import STORAGE_BACKENDS, COMPRESSIONS
+from lib.model import SCHEDULERS
 
 
 def init():
@@ -56,6 +58,45 @@ def parse_args():
     parser.add_argument(
         '-d', '--debug', action='store_true', default=False, dest='debug',
         help='Enable debugging features.')
+    parser.add_argument(
+        '--seed', default=None, dest='seed', type=int,
+        help='The galaxy seed to use when starting a new game. '
+        '[default: random]')
+    parser.add_argument(
+        '--max-resident-systems', default=None, dest='max_resident',
+        type=int, help='Limit the number of systems kept in memory, the '
+        'rest are spilled to disk. [default: no limit]')
+    parser.add_argument(
+        '--storage', default=None, dest='storage',
+        choices=list(STORAGE_BACKENDS),
+        help='The save file format. [default: the format of the existing '
+        'save file or json]')
+    parser.add_argument(
+        '--compression', default=None, dest='compression',
+        choices=list(COMPRESSIONS),
+        help='The compression of binary save files. [default: the '
+        'compression of the existing save file or zlib]')
+    parser.add_argument(
+        '--resource-ledger', action='store_true', default=False,
+        dest='resource_ledger', help='Keep the resources of all resident '
+        'planets in numpy arrays. Requires numpy.')
+    parser.add_argument(
+        '--eager-load', action='store_true', default=False,
+        dest='eager_load', help='Construct every system when loading a '
+        'jsonl save file instead of when first used.')
+    parser.add_argument(
+        '--journal', action='store_true', default=False, dest='journal',
+        help='Journal the changes made by each command so they survive a '
+        'crash.')
+    parser.add_argument(
+        '--event-queue', default=None, dest='event_queue',
+        choices=list(SCHEDULERS), help='The queue that orders delayed '
+        'events. The timing wheel is faster with very many events that are '
+        'due soon. [default: heap]')
+    parser.add_argument(
+        '--export-snapshot', default=None, dest='snapshot_file',
+        help='Write a read only, memory mappable snapshot of the saved '
+        'galaxy to this file for analysis and exit.')
     return parser.parse_args()
 
 
@@ -12,9 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import lib.cmdline.commands as commands
+from lib import model
 
 from .test_base import BaseCommandTest
 
@@ -38,6 +39,15 @@ class BuildTest(BaseCommandTest):
         self.assertTrue(self.mock_planet.get_available_buildings.called)
         self.assertFalse(self.mock_planet.build.called)
 
+    @patch('builtins.print', autospec=True)
+    def test_build_list_upcoming(self, mock_print):
+        self.mock_planet.get_upcoming_buildings = Mock(
+            return_value=[(model.Mine, 2, 90)])
+        build = self.get_instance()
+        build.do_build('')
+        printed = '\n'.join(args[0] for args, _ in mock_print.call_args_list)
+        self.assertIn('- Mine: lvl 2 in 1m 30s', printed)
+
     def test_build(self):
         self.mock_planet.build = Mock()
         build = self.get_instance()
@@ -80,3 +80,13 @@ class TestFormatSystem(BaseFormatMethodTest):
         self.func = format_object.system
         self.test_obj = model.System()
         self.has_verbose_opt = False
+
+
+class TestDuration(SpaceTest):
+    def test_duration(self):
+        self.assertEqual('0s', format_object.duration(0))
+        self.assertEqual('59s', format_object.duration(59.4))
+        self.assertEqual('1m', format_object.duration(60))
+        self.assertEqual('1h 1s', format_object.duration(3601))
+        self.assertEqual('2d 3h 4m 5s',
+                         format_object.duration(2 * 86400 + 3 * 3600 + 245))
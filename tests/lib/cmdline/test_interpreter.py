@@ -71,3 +71,25 @@ class TestInterpreterModule(SpaceTest):
         sci.start()
         sci.cmdloop.side_effect = Exception('foobar')
         self.assertTrue(self.mock_engine.save.called)
+
+    def test_onecmd_update_epoch(self):
+        sci = interpreter.SpaceCmdInterpreter(self.mock_engine)
+        epochs = []
+        sci.do_test = Mock(side_effect=lambda line: epochs.append(
+            interpreter.model.update.UpdateEpoch.current))
+        sci.onecmd('test')
+        sci.onecmd('test')
+        self.assertIsNotNone(epochs[0])
+        self.assertIsNot(epochs[0], epochs[1])
+        self.assertIsNone(interpreter.model.update.UpdateEpoch.current)
+
+    def test_postcmd_journal(self):
+        sci = interpreter.SpaceCmdInterpreter(self.mock_engine)
+        self.assertTrue(sci.postcmd(True, 'build Mine'))
+        self.assertFalse(self.mock_engine.journal.called)
+
+        sci = interpreter.SpaceCmdInterpreter(self.mock_engine, journal=True)
+        sci.postcmd(False, 'list')
+        self.assertFalse(self.mock_engine.journal.called)
+        sci.postcmd(False, 'build Mine')
+        self.mock_engine.journal.assert_called_with('build Mine', None)
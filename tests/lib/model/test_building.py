@@ -14,13 +14,13 @@
 
 import random
 from collections import Callable
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from tests.base import SpaceTest
 from .base import (LibModelTest, ModelObjectTest, StateMixinTest,
                    EqualityMixinTest)
 
-from lib.error import ObjectNotFound
+from lib.error import ObjectNotFound, ModelObjectError
 from lib.model import building
 from lib import model
 
@@ -30,7 +30,8 @@ class TestLibModelBuilding(LibModelTest):
         self.expected_exports = [
             building.Mine, building.SolarPowerPlant, building.ALL_BUILDINGS,
             building.get_building, building.get_all_building_names,
-            building.get_all_building_abbr]
+            building.get_all_building_abbr, building.register_building,
+            building.BuildingList]
 
 
 class TestBuildingModule(SpaceTest):
@@ -91,6 +92,55 @@ class TestBuildingModule(SpaceTest):
             test_val = building.get_building(building_type.abbr)
             self.assertEqual(building_type, test_val)
 
+    def test_get_building_any_case(self):
+        self.assertIs(building.Mine, building.get_building('mINE'))
+        self.assertIs(building.SolarPowerPlant,
+                      building.get_building('solarpowerplant'))
+        self.assertIs(building.SolarPowerPlant, building.get_building('spp'))
+
+    def test_register_building(self):
+
+        class Refinery(building.Building):
+            name = 'Ore Refinery'
+            abbr = 'ORf'
+
+        class Imposter(building.Building):
+            name = 'Mine'
+            abbr = 'Imp'
+
+        try:
+            self.assertIs(Refinery, building.register_building(Refinery))
+            building.register_building(Refinery)
+            self.assertEqual(Refinery, building.ALL_BUILDINGS[-1])
+            self.assertEqual(1, building.ALL_BUILDINGS.count(Refinery))
+            for key in ('Refinery', 'ore refinery', 'orf'):
+                self.assertIs(Refinery, building.get_building(key))
+            self.assertIsInstance(building.get_building('ORF', 2), Refinery)
+        finally:
+            building.ALL_BUILDINGS.remove(Refinery)
+            for key in ('refinery', 'ore refinery', 'orf'):
+                del building._BUILDING_REGISTRY[key]
+        self.assertRaises(ModelObjectError, building.register_building,
+                          Imposter)
+        self.assertNotIn(Imposter, building.ALL_BUILDINGS)
+        self.assertRaises(ObjectNotFound, building.get_building, 'Imp')
+
+    def test_register_building_requirements_override(self):
+
+        class Shipyard(building.Building):
+            name = 'Shipyard'
+            abbr = 'SY'
+
+            @property
+            def requirements(self):
+                return building.BuildingRequirements(
+                    resources=model.Resources(ore=1e9))
+
+        self.assertRaises(ModelObjectError, building.register_building,
+                          Shipyard)
+        self.assertNotIn(Shipyard, building.ALL_BUILDINGS)
+        self.assertRaises(ObjectNotFound, building.get_building, 'SY')
+
     def test_get_building_type(self):
         level = 1
         for building_type in building.ALL_BUILDINGS:
@@ -118,15 +168,77 @@ class TestBuildingModule(SpaceTest):
         site.resources.ore = 11
         self.assertTrue(bld.are_requirements_met(site))
 
+    def test_are_requirements_met_no_instance(self):
+        site = Mock(spec=model.Planet)
+        site.resources = model.Resources(ore=1000, metal=1000)
+        building.Mine.level_requirements(2)
+        with patch.object(building.Mine, '__init__') as init:
+            self.assertTrue(building.Mine.are_requirements_met(site, 2))
+        init.assert_not_called()
+
     def test_are_requirements_met_buildings(self):
-        self.skipTest('NI: Need to have buildings with building '
-                      'requirements to test.')
+        site = model.Planet()
+        reqs = building.BuildingRequirements(buildings={'Mine': 2})
+        met = building.Building.are_other_requirements_met
+        self.assertFalse(met(site, reqs))
+        site.buildings = [building.Mine(1)]
+        self.assertFalse(met(site, reqs))
+        site.buildings = [building.SolarPowerPlant(1), building.Mine(2)]
+        self.assertTrue(met(site, reqs))
 
     def test_are_requirements_met_research(self):
         self.skipTest('NI: Need to have buildings with research '
                       'requirements to test.')
 
 
+class TestBuildingList(SpaceTest):
+    def setUp(self):
+        self.owner = Mock()
+        self.mine = building.Mine(1)
+        self.spp = building.SolarPowerPlant(2)
+        self.object = building.BuildingList([self.mine, self.spp],
+                                            owner=self.owner)
+
+    def test_get(self):
+        self.assertIs(self.mine, self.object.get(building.Mine))
+        self.assertIs(self.spp, self.object.get('SPP'))
+        self.assertIs(self.spp, self.object.get('solar power plant'))
+        self.assertIsNone(building.BuildingList().get('Mine'))
+        self.assertRaises(ObjectNotFound, self.object.get, 'flabber')
+        self.assertIs(self.owner, self.mine._owner)
+
+    def test_replace(self):
+        new_mine = building.Mine(2)
+        self.object.replace(new_mine)
+        self.assertEqual([new_mine, self.spp], self.object)
+        self.assertIs(new_mine, self.object.get('Mine'))
+        self.assertIs(self.owner, new_mine._owner)
+        self.assertTrue(self.owner.building_changed.called)
+
+        self.object.remove(new_mine)
+        self.assertIsNone(self.object.get('Mine'))
+        self.assertIs(self.spp, self.object.get('SPP'))
+        self.object.replace(new_mine)
+        self.assertEqual([self.spp, new_mine], self.object)
+
+    def test_mutations_notify_owner(self):
+        mutations = [
+            lambda bl: bl.append(building.Mine(3)),
+            lambda bl: bl.extend([building.Mine(3)]),
+            lambda bl: bl.insert(0, building.Mine(3)),
+            lambda bl: bl.pop(),
+            lambda bl: bl.sort(),
+            lambda bl: bl.__delitem__(0),
+            lambda bl: bl.__setitem__(0, building.SolarPowerPlant(1)),
+            lambda bl: bl.clear()]
+        for mutation in mutations:
+            self.owner.reset_mock()
+            mutation(self.object)
+            self.assertEqual(1, self.owner.building_changed.call_count)
+        self.object += [self.mine]
+        self.assertIs(self.mine, self.object.get('Mine'))
+
+
 class TestBuildingRequirements(ModelObjectTest, StateMixinTest):
     def get_new_instance(self):
         return building.BuildingRequirements()
@@ -210,6 +322,31 @@ class TestBuildingBaseClass(ModelObjectTest, EqualityMixinTest):
         self.assertIsInstance(self.object.requirements,
                               self.expected_requirements_type)
 
+    def test_level_tables(self):
+        level = random.randint(0, self.object.max_table_level)
+        low = self.get_new_instance(level)
+        high = self.get_new_instance(level)
+        self.assertIs(low.requirements, high.requirements)
+        self.assertIs(low.modifier, high.modifier)
+        self.assertIs(low.requirements,
+                      type(low).level_requirements(level))
+        with self.assertRaises(TypeError):
+            low.requirements.resources.ore += 1
+        with self.assertRaises(TypeError):
+            low.requirements.buildings['Mine'] = 1
+        with self.assertRaises(TypeError):
+            low.modifier.ore = 1
+
+    def test_level_tables_max_level(self):
+        level = self.object.max_table_level + 1
+        low = self.get_new_instance(level)
+        high = self.get_new_instance(level)
+        self.assertIsNot(low.requirements, high.requirements)
+        self.assertEqual(low.requirements.resources,
+                         high.requirements.resources)
+        self.assertIsNot(low.modifier, high.modifier)
+        self.assertEqual(low.modifier, high.modifier)
+
     def test_compare(self):
         """
         Although value is based on level, modifier and electricity values
@@ -80,6 +80,48 @@ class BaseCoordTest(ModelObjectTest):
         self.object.system = test_system
         self.assertEqual(hash(self.object), hash(example_coord))
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.object, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.object.foo = 'bar'
+
+    def test_x_y(self):
+        self.object.x = '3.10'
+        self.object.y = '-2.7'
+        self.assertEqual((3, -2), self.object.sector)
+        self.assertEqual((10, 7), self.object.system)
+        self.assertEqual(('3.10', '-2.7'), (self.object.x, self.object.y))
+
+    def test_negative_zero_sector(self):
+        self.object.x = '-0.5'
+        self.assertEqual('-0.5', self.object.x)
+        self.assertEqual(0, self.object.sector[0])
+        positive = self.get_new_instance()
+        positive.x = '0.5'
+        self.assertNotEqual(positive, self.object)
+        self.assertNotEqual(hash(positive), hash(self.object))
+        self.object.sector = (2, 0)
+        self.assertEqual('2.5', self.object.x)
+
+    def test_hash_changes(self):
+        test_obj = self.get_new_instance()
+        test_obj.system = (1, 2)
+        self.assertNotEqual(hash(self.object), hash(test_obj))
+        self.object.x, self.object.y = '0.1', '0.2'
+        self.assertEqual(hash(self.object), hash(test_obj))
+        self.assertEqual(self.object, test_obj)
+
+    def test_system_coord(self):
+        self.object.sector = (4, 5)
+        self.object.system = (6, 7)
+        system_coord = self.object.system_coord()
+        self.assertIsInstance(system_coord, coord.SystemCoord)
+        self.assertEqual(coord.SystemCoord('4.6', '5.7'), system_coord)
+
+    def test_eq_other_types(self):
+        self.assertNotEqual(self.object, self.object.__getstate__())
+        self.assertFalse(self.object == None)  # noqa: E711
+
     def test_eq(self):
         test_obj = self.get_new_instance()
         self.assertEqual(self.object, test_obj)
@@ -106,7 +148,9 @@ class TestCoord(BaseCoordTest):
         return coord.Coord(0, 0, 0)
 
     def test_planet(self):
-        self._property_test('planet')
+        test_value = self.get_tst_values(planet=True)[0]
+        self.object.planet = test_value
+        self.assertEqual(str(test_value), self.object.planet)
 
     def test_hash(self):
         start_hash = hash(self.object)
@@ -137,6 +181,17 @@ class TestCoord(BaseCoordTest):
         self.assertEqual((self.object.x, self.object.y, self.object.planet),
                          (test_obj.x, test_obj.y, test_obj.planet))
 
+    def test_setstate_old_save(self):
+        test_obj = coord.Coord()
+        test_obj.__setstate__(('12.034', '-1.5', '3'))
+        self.assertEqual((12, -1), test_obj.sector)
+        self.assertEqual((34, 5), test_obj.system)
+        self.assertEqual('3', test_obj.planet)
+        self.assertEqual(test_obj, coord.Coord('12.34', '-1.5', 3))
+
+    def test_not_equal_system_coord(self):
+        self.assertNotEqual(self.object, self.object.system_coord())
+
     def test_eq(self):
         test_obj = self.get_new_instance()
         test_planet = self.get_tst_values(planet=True)[0]
@@ -173,6 +228,13 @@ class TestSystemCoord(BaseCoordTest):
         expected = '\(\'\d\.\d\', \'\d\.\d\'\)'
         self.assertTrue(re.search(expected, str(self.object)))
 
+    def test_negative_zero_sector_saves(self):
+        self.assertNotEqual(coord.SystemCoord('-0.5', '0'),
+                            coord.SystemCoord('0.5', '0'))
+        self.object.__setstate__(('-0.5', '-0.03'))
+        self.assertEqual(('-0.5', '-0.3'), self.object.__getstate__())
+        self.assertEqual(coord.SystemCoord(-0.5, -0.3), self.object)
+
     def test_setstate(self):
         self.object.sector = self.get_tst_values()
         self.object.system = self.get_tst_values()
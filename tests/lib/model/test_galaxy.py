@@ -12,11 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 from random import randint
+from unittest.mock import patch
 
 from .base import LibModelTest, ModelObjectTest, StateMixinTest
 
 from lib import model
+from lib.namegen import ForbiddenWords
 from lib.model import galaxy
 
 
@@ -30,7 +33,10 @@ class TestGalaxy(ModelObjectTest, StateMixinTest):
         super().setUp()
         self.expected_state = (list,)
         self.classname_in_repr = True
-        self.expected_attrs = {}
+        self.expected_attrs = {'planet_names': ForbiddenWords,
+                               'seed': type(None),
+                               'max_resident': type(None),
+                               'ledger': type(None)}
 
     def get_new_instance(self):
         return galaxy.Galaxy()
@@ -53,3 +59,230 @@ class TestGalaxy(ModelObjectTest, StateMixinTest):
         coord = model.Coord(system_coord.x, system_coord.y, planet_index)
         planet = galaxy.planet(coord)
         self.assertEqual(planet, system.planets[planet_index])
+
+    def test_unique_planet_names(self):
+        galaxy = self.get_new_instance()
+        names = []
+        for x in range(10):
+            system = galaxy.system(model.SystemCoord(x, x))
+            names.extend(planet.name for planet in system.planets)
+        self.assertEqual(len(names), len(set(names)))
+        for name in names:
+            self.assertIn(name, galaxy.planet_names)
+
+    def test_setstate_registers_planet_names(self):
+        galaxy = self.get_new_instance()
+        system = galaxy.system(model.SystemCoord(1, 1))
+        new_galaxy = self.get_new_instance()
+        new_galaxy.__setstate__(galaxy.__getstate__())
+        for planet in system.planets:
+            self.assertIn(planet.name, new_galaxy.planet_names)
+
+    def test_seeded_generation(self):
+        coords = [model.SystemCoord(x, y) for x, y in [(1.1, 2.2), (3.3, 4.4),
+                                                       (5.5, 6.6)]]
+        galaxy_a = galaxy.Galaxy(seed=42)
+        galaxy_b = galaxy.Galaxy(seed=42)
+        systems_a = [galaxy_a.system(coord) for coord in coords]
+        systems_b = [galaxy_b.system(coord) for coord in reversed(coords)]
+        systems_b.reverse()
+        for sys_a, sys_b in zip(systems_a, systems_b):
+            self.assertEqual(sys_a.size, sys_b.size)
+            self.assertEqual(sys_a.sun_brightness, sys_b.sun_brightness)
+            self.assertEqual([planet.name for planet in sys_a.planets],
+                             [planet.name for planet in sys_b.planets])
+        other = galaxy.Galaxy(seed=43).system(coords[0])
+        self.assertNotEqual([planet.name for planet in systems_a[0].planets],
+                            [planet.name for planet in other.planets])
+
+    def test_seeded_state_skips_pristine_systems(self):
+        seeded = galaxy.Galaxy(seed=7)
+        for x in range(5):
+            seeded.system(model.SystemCoord(x, x))
+        coord = model.Coord(2, 2, 1)
+        seeded.planet(coord).emperor = 'emperor'
+        systems, seed = seeded.__getstate__()
+        self.assertEqual(7, seed)
+        self.assertEqual(1, len(systems))
+
+        loaded = self.get_new_instance()
+        loaded.__setstate__((systems, seed))
+        self.assertEqual('emperor', loaded.planet(coord).emperor)
+        untouched = model.SystemCoord(4, 4)
+        self.assertEqual(
+            [planet.name for planet in seeded.system(untouched).planets],
+            [planet.name for planet in loaded.system(untouched).planets])
+
+    def test_unseeded_state(self):
+        unseeded = self.get_new_instance()
+        unseeded.system(model.SystemCoord(1, 1))
+        systems, seed = unseeded.__getstate__()
+        self.assertIsNone(seed)
+        self.assertEqual(1, len(systems))
+        # saves from before seeded galaxies only contain the systems
+        loaded = self.get_new_instance()
+        loaded.__setstate__((systems,))
+        self.assertIsNone(loaded.seed)
+
+    def test_max_resident(self):
+        store = model.SystemStore()
+        capped = galaxy.Galaxy(max_resident=3, store=store)
+        coords = [model.SystemCoord(x, x) for x in range(6)]
+        names = [[planet.name for planet in capped.system(coord).planets]
+                 for coord in coords]
+        self.assertEqual(3, len(capped._systems))
+        self.assertEqual(3, len(store))
+        # least recently used systems were spilled and are reloaded intact
+        self.assertIn(coords[0], store)
+        self.assertEqual(names[0], [planet.name for planet in
+                                    capped.system(coords[0]).planets])
+        self.assertEqual(3, len(capped._systems))
+        self.assertEqual(6, len(capped.__getstate__()[0]))
+
+    def test_max_resident_pinned(self):
+        capped = galaxy.Galaxy(max_resident=1, store=model.SystemStore())
+        home = model.Coord(1, 1, 0)
+        capped.planet(home).emperor = 'emperor'
+        for x in range(2, 5):
+            capped.system(model.SystemCoord(x, x))
+        self.assertIn(model.SystemCoord(1, 1), capped._systems)
+        self.assertEqual(2, len(capped._systems))
+        self.assertEqual('emperor', capped.planet(home).emperor)
+
+    def test_nearest_systems(self):
+        galaxy = self.get_new_instance()
+        coords = [model.SystemCoord(x, x) for x in range(5)]
+        for coord in coords:
+            galaxy.system(coord)
+        home = model.Coord(0, 0, 1)
+        self.assertEqual(coords[:2], galaxy.nearest_systems(home, 2))
+        self.assertEqual(coords[:1], galaxy.systems_within(home, 1))
+        self.assertEqual(coords[1:4], galaxy.systems_in_rectangle(
+            model.SystemCoord(3, 3), model.SystemCoord(0.5, 0.5)))
+        # systems added after the index was built are indexed too
+        near = model.SystemCoord('0.1', '0.0')
+        galaxy.system(near)
+        self.assertEqual([coords[0], near], galaxy.nearest_systems(home, 2))
+
+    def test_nearest_systems_stored(self):
+        store = model.SystemStore()
+        capped = galaxy.Galaxy(max_resident=1, store=store)
+        coords = [model.SystemCoord(x, x) for x in range(4)]
+        for coord in coords:
+            capped.system(coord)
+        self.assertEqual(coords, capped.nearest_systems(coords[0], 10))
+        # systems that were never resident are found in a new store
+        stored = model.SystemStore()
+        stored[model.SystemCoord(9, 9)] = model.System().__getstate__()
+        capped.set_store(stored)
+        far = model.SystemCoord(9, 9)
+        self.assertEqual([far, coords[3]], capped.nearest_systems(far, 2))
+        self.assertEqual(5, len(capped.index))
+
+    def test_evict_skips_pinned(self):
+        capped = galaxy.Galaxy(seed=3, max_resident=5,
+                               store=model.SystemStore())
+        pinned = [model.SystemCoord(x, 0) for x in range(4)]
+        for coord in pinned:
+            capped.planet(model.Coord(coord.x, coord.y, 0)).emperor = 'me'
+        with patch.object(model.System, 'is_pristine', autospec=True,
+                          side_effect=model.System.is_pristine) as pristine:
+            for y in range(1, 50):
+                capped.system(model.SystemCoord(0, y))
+        # the pinned systems are checked once, not on every miss
+        self.assertGreater(len(pinned) + 50, pristine.call_count)
+        self.assertEqual(5, len(capped._systems))
+        for coord in pinned:
+            self.assertIn(coord, capped._systems)
+        # a pinned system that becomes pristine again can be evicted
+        capped.planet(model.Coord(0, 0, 0)).emperor = None
+        for y in range(50, 52):
+            capped.system(model.SystemCoord(0, y))
+        self.assertNotIn(pinned[0], capped._systems)
+        self.assertEqual(5, len(capped._systems))
+
+    def test_set_store_closes_old_store(self):
+        old_store = model.ShelveSystemStore()
+        tmp_dir = os.path.dirname(old_store.filename)
+        capped = galaxy.Galaxy(max_resident=1, store=old_store)
+        coords = [model.SystemCoord(x, x) for x in range(3)]
+        for coord in coords:
+            capped.system(coord)
+        capped.set_store(old_store)
+        self.assertTrue(os.path.isdir(tmp_dir))
+        new_store = model.SystemStore()
+        capped.set_store(new_store)
+        self.assertFalse(os.path.exists(tmp_dir))
+        self.assertEqual(2, len(new_store))
+        self.assertEqual(set(coords), set(capped.index))
+
+    def test_nearest_systems_dropped(self):
+        capped = galaxy.Galaxy(seed=3, max_resident=1,
+                               store=model.SystemStore())
+        coords = [model.SystemCoord(x, x) for x in range(3)]
+        for coord in coords:
+            capped.system(coord)
+        # pristine seeded systems are dropped but still known
+        self.assertEqual(1, len(capped._systems))
+        self.assertEqual(coords, capped.nearest_systems(coords[0], 5))
+
+    def test_max_resident_seeded(self):
+        store = model.SystemStore()
+        capped = galaxy.Galaxy(seed=3, max_resident=1, store=store)
+        coord = model.SystemCoord(1, 1)
+        names = [planet.name for planet in capped.system(coord).planets]
+        capped.system(model.SystemCoord(2, 2))
+        # pristine seeded systems are regenerated instead of being spilled
+        self.assertEqual(0, len(store))
+        self.assertEqual(names, [planet.name for planet in
+                                 capped.system(coord).planets])
+
+    def test_dirty_system_states(self):
+        gxy = galaxy.Galaxy()
+        coords = [model.SystemCoord(x, x) for x in range(3)]
+        for coord in coords:
+            gxy.system(coord)
+        self.assertEqual(set(coords),
+                         set(coord for coord, _ in gxy.dirty_system_states()))
+        gxy.mark_clean()
+        self.assertFalse(gxy.is_dirty())
+        self.assertEqual([], list(gxy.dirty_system_states()))
+        gxy.planet(model.Coord(1, 1, 0)).emperor = 'emperor'
+        self.assertTrue(gxy.is_dirty())
+        self.assertEqual([coords[1]],
+                         [coord for coord, _ in gxy.dirty_system_states()])
+
+    def test_dirty_spilled_systems(self):
+        store = model.SystemStore()
+        capped = galaxy.Galaxy(max_resident=1, store=store)
+        first, second = model.SystemCoord(1, 1), model.SystemCoord(2, 2)
+        capped.system(first)
+        capped.mark_clean()
+        capped.system(first).planets[0].resources.ore = 10
+        capped.system(first).planets[0].resources.ore = 0
+        capped.system(second)
+        # the changed system was spilled, it must still be saved
+        self.assertNotIn(first, capped._systems)
+        self.assertEqual({first, second},
+                         set(coord for coord, _ in
+                             capped.dirty_system_states()))
+        self.assertEqual([second], [coord for coord, _ in
+                                    capped.dirty_system_states(
+                                        exclude_store=store)])
+
+    def test_setstate_stream(self):
+        source = galaxy.Galaxy()
+        for x in range(5):
+            source.system(model.SystemCoord(x, 0))
+        states = source.__getstate__()[0]
+
+        def stream():
+            for coord_state, system_state in states:
+                # never more than max_resident systems are resident
+                self.assertLessEqual(len(capped._systems), 2)
+                yield coord_state, system_state
+
+        capped = galaxy.Galaxy(max_resident=2, store=model.SystemStore())
+        capped.__setstate__((stream(), None))
+        self.assertEqual(2, len(capped._systems))
+        self.assertEqual(5, len(list(capped.system_states())))
@@ -0,0 +1,160 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from time import time
+
+from tests.base import SpaceTest
+from .base import LibModelTest
+
+from lib import model
+from lib.model import ledger
+
+
+class TestLibModelLedger(LibModelTest):
+    def setUp(self):
+        self.expected_exports = [ledger.ResourceLedger,
+                                 ledger.LedgerResources]
+
+
+class TestResourceLedger(SpaceTest):
+    def setUp(self):
+        if ledger.numpy is None:
+            self.skipTest('numpy is not installed')
+        self.object = ledger.ResourceLedger(capacity=2)
+        self.planets = [model.Planet(sun_brightness=500, sun_distance=dist)
+                        for dist in range(1, 4)]
+        for planet in self.planets:
+            planet.resources.ore = 100
+            planet.resources.metal = 50
+            self.object.add(planet)
+
+    def test_add(self):
+        self.assertEqual(3, len(self.object))
+        self.assertLessEqual(3, len(self.object.amounts))
+        planet = self.planets[2]
+        self.assertIn(planet, self.object)
+        self.assertIsInstance(planet.resources, ledger.LedgerResources)
+        self.assertEqual(100, planet.resources.ore)
+        self.assertEqual(200, planet.resources.trade_value)
+        # the planet is a view into its row
+        planet.resources.ore = 10
+        self.assertEqual(10, self.object.amounts[2][0])
+        self.object.amounts[2][0] = 20
+        self.assertEqual(20, planet.ore)
+
+    def test_remove(self):
+        planet = self.planets[0]
+        planet.mark_clean()
+        self.object.remove(planet)
+        self.assertNotIn(planet, self.object)
+        self.assertEqual(2, len(self.object))
+        self.assertNotIsInstance(planet.resources, ledger.LedgerResources)
+        self.assertEqual(100, planet.resources.ore)
+        self.assertFalse(planet.is_dirty())
+        # freed rows are reused
+        other = model.Planet(sun_brightness=500, sun_distance=1)
+        self.object.add(other)
+        self.assertEqual(0, other.resources._row)
+        self.assertEqual(3, len(self.object._planets))
+
+    def test_assignments(self):
+        planet = self.planets[0]
+        view = planet.resources
+        planet.resources = model.Resources(ore=5)
+        self.assertIs(view, planet.resources)
+        self.assertEqual(5, planet.resources.ore)
+        planet.resources -= model.Resources(ore=1)
+        self.assertEqual(4, self.object.amounts[0][0])
+        planet.last_update = 42
+        self.assertEqual(42, self.object.last_update[0])
+        planet.buildings = [model.Mine(2)]
+        self.assertEqual(planet.rates.values(), self.object.rates[0].tolist())
+
+    def test_accrue(self):
+        now = time()
+        planet = self.planets[1]
+        planet.buildings = [model.Mine(5)]
+        planet.last_update = now - 10
+        expected = planet.resources + planet.rates * 10
+        self.object.accrue(now)
+        self.assertEqual(now, planet.last_update)
+        self.assertAlmostEqual(expected.ore, planet.resources.ore)
+        self.assertAlmostEqual(expected.metal, planet.resources.metal)
+        # rows without income are unchanged
+        self.assertEqual(100, self.planets[0].resources.ore)
+
+    def test_accrue_caps(self):
+        planet = self.planets[0]
+        planet.buildings = [model.Mine(1)]
+        planet.last_update = time() - 1e9
+        self.object.accrue()
+        self.assertEqual(planet.max_resources.ore, planet.resources.ore)
+
+    def test_planet_update(self):
+        planet = self.planets[0]
+        planet.buildings = [model.Mine(5)]
+        planet.last_update -= 10
+        planet.update()
+        self.assertIsInstance(planet.resources, ledger.LedgerResources)
+        self.assertLess(100, self.object.amounts[0][0])
+
+    def test_trade_values(self):
+        self.assertEqual([200, 200, 200], self.object.trade_values().tolist())
+        self.assertEqual(600, self.object.total_trade_value())
+
+    def test_can_afford(self):
+        self.planets[1].resources.metal = 0
+        self.assertEqual(
+            [self.planets[0], self.planets[2]],
+            self.object.can_afford(model.Resources(ore=100, metal=10)))
+        self.object.remove(self.planets[0])
+        self.assertEqual([self.planets[2]], self.object.can_afford(
+            model.Resources(ore=100, metal=10)))
+
+    def test_can_afford_matches_requirements(self):
+        self.planets[0].resources.metal = 0
+        self.planets[1].resources.ore = 0
+        for level in range(1, 20, 3):
+            cost = model.Mine.level_requirements(level).resources
+            self.assertEqual(
+                [planet for planet in self.planets
+                 if model.Mine.are_requirements_met(planet, level)],
+                self.object.can_afford(cost))
+
+    def test_state(self):
+        state = self.planets[0].__getstate__()
+        self.assertEqual(100, state[4][0]['ore'])
+        self.assertIs(float, type(state[4][0]['ore']))
+
+
+class TestGalaxyLedger(SpaceTest):
+    def setUp(self):
+        if ledger.numpy is None:
+            self.skipTest('numpy is not installed')
+
+    def test_resident_planets(self):
+        gxy = model.Galaxy(max_resident=2, store=model.SystemStore(),
+                           ledger=ledger.ResourceLedger())
+        home = model.Coord(1, 1, 0)
+        gxy.planet(home).resources.ore = 5
+        for x in range(2, 6):
+            gxy.system(model.SystemCoord(x, x))
+        # only the planets of resident systems are in the ledger
+        self.assertEqual(2, len(gxy._systems))
+        self.assertEqual(sum(len(system.planets)
+                             for system in gxy._systems.values()),
+                         len(gxy.ledger))
+        self.assertIn(gxy.planet(home), gxy.ledger)
+        self.assertEqual(5, gxy.planet(home).ore)
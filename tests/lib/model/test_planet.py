@@ -12,13 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from .base import LibModelTest, ModelObjectTest, StateMixinTest
 
 from lib.error import ModelObjectError
 from lib import model
 from lib.model.building import Building
 from lib.model import planet
+from lib.model.update import UpdateEpoch
 
 
 class TestLibModelCoord(LibModelTest):
@@ -186,3 +187,122 @@ class TestPlanet(ModelObjectTest, StateMixinTest):
                           planet.Planet,
                           sun_brightness=self.sun_brightness,
                           sun_distance=0)
+
+    def test_dirty(self):
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.assertFalse(self.object.is_dirty())
+        self.object.emperor = 'emperor'
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.object.resources.ore = 10
+        self.assertTrue(self.object.is_dirty())
+
+    def test_setstate_is_clean(self):
+        self.object.__setstate__(self.get_tst_state())
+        self.assertFalse(self.object.is_dirty())
+        self.assertIsInstance(self.object.resources, model.Resources)
+
+    def test_rates_cache(self):
+        self.object.buildings = [Building(1)]
+        rates = self.object.rates
+        self.assertEqual(1, rates.ore)
+        # the cached rates cannot be modified through the result
+        rates += rates
+        self.assertEqual(1, self.object.rates.ore)
+        with patch.object(Building, '_modifier') as mock_modifier:
+            self.assertEqual(1, self.object.rates.ore)
+            self.assertFalse(mock_modifier.called)
+
+        self.object.buildings = [Building(2)]
+        self.assertEqual(2, self.object.rates.ore)
+        self.object.mark_clean()
+        self.object.buildings[0].level = 3
+        self.assertEqual(3, self.object.rates.ore)
+        self.assertTrue(self.object.is_dirty())
+        self.object.buildings[0].under_construction = True
+        self.assertEqual(0, self.object.rates.ore)
+
+    def test_buildings_in_place(self):
+        self.object.buildings = [Building(1)]
+        self.assertIsInstance(self.object.buildings, model.BuildingList)
+        self.assertEqual(1, self.object.rates.ore)
+        self.object.mark_clean()
+        self.object.buildings.append(Building(2))
+        self.assertTrue(self.object.is_dirty())
+        self.assertEqual(3, self.object.rates.ore)
+
+        # a replaced list no longer changes the planet
+        old = self.object.buildings
+        self.object.buildings = [Building(1)]
+        old.append(Building(5))
+        self.assertEqual(1, self.object.rates.ore)
+
+    def test_build_replaces_in_place(self):
+        self.object.resources.ore = 1000
+        self.object.resources.metal = 1000
+        self.object.build('Mine')
+        self.object.build('SolarPowerPlant')
+        self.object.build('Mine')
+        self.assertEqual(['Mn', 'SPP'],
+                         [bld.abbr for bld in self.object.buildings])
+        self.assertEqual(2, self.object.building('Mine').level)
+
+    def test_electricity_cache(self):
+        self.object.buildings = [model.SolarPowerPlant(1)]
+        electricity = self.object.electricity
+        self.assertEqual(electricity, self.object.electricity)
+        self.object.buildings[0].level = 2
+        self.assertAlmostEqual(2 * electricity, self.object.electricity)
+        self.object.sun_distance = self.sun_distance + 5
+        self.assertLess(self.object.electricity, 2 * electricity)
+
+    def test_time_until_affordable(self):
+        # level 1 mines make 0.2 ore and 0.025 metal, worth 0.25 per second
+        self.object.buildings = [model.Mine(1)]
+        self.object.last_update = 1000.0
+        with UpdateEpoch(now=1000.0):
+            self.assertIsNone(self.object.time_until_affordable(
+                'SolarPowerPlant', 10 ** 9))
+            # level 2 mines cost 12 ore and 5 metal, worth 22
+            seconds = self.object.time_until_affordable('Mine')
+        self.assertAlmostEqual(88, seconds)
+        with UpdateEpoch(now=1000.0 + seconds - 1):
+            self.assertNotEqual(0, self.object.time_until_affordable('Mine'))
+        with UpdateEpoch(now=1000.0 + seconds + 1e-6):
+            self.assertEqual(0, self.object.time_until_affordable('Mine'))
+            self.assertTrue(self.object.build('Mine'))
+
+    def test_time_until_affordable_capped(self):
+        self.object.buildings = [model.Mine(1)]
+        self.object.max_resources = model.Resources(ore=5, metal=100)
+        self.object.last_update = 1000.0
+        with UpdateEpoch(now=1000.0):
+            # ore is capped after 25 seconds, then only metal adds value
+            self.assertAlmostEqual(
+                25 + (22 - 5 - 1.25) / 0.05,
+                self.object.time_until_affordable('Mine', 2))
+            self.assertIsNone(self.object.time_until_affordable('Mine', 20))
+
+    def test_time_until_capped(self):
+        self.object.last_update = 1000.0
+        with UpdateEpoch(now=1000.0):
+            self.assertIsNone(self.object.time_until_capped())
+            self.object.buildings = [model.Mine(1)]
+            self.object.max_resources = model.Resources(ore=5, metal=2)
+            self.assertAlmostEqual(25, self.object.time_until_capped())
+            self.assertAlmostEqual(80, self.object.time_until_capped('metal'))
+            self.assertIsNone(self.object.time_until_capped('thorium'))
+            self.object.resources.metal = 3
+            self.assertEqual(0, self.object.time_until_capped())
+
+    def test_get_upcoming_buildings(self):
+        self.object.buildings = [model.Mine(1)]
+        self.object.last_update = 1000.0
+        with UpdateEpoch(now=1000.0):
+            upcoming = self.object.get_upcoming_buildings()
+        self.assertEqual([model.Mine, model.SolarPowerPlant],
+                         [bld for bld, _, _ in upcoming])
+        self.assertEqual([2, 1], [level for _, level, _ in upcoming])
+        self.assertEqual(sorted(seconds for _, _, seconds in upcoming),
+                         [seconds for _, _, seconds in upcoming])
@@ -76,3 +76,25 @@ class TestModelQuery(SpaceTest):
         with patch.object(self.mq.galaxy, 'system') as mgalaxy:
             self.mq.system(Mock())
             self.assertTrue(mgalaxy.called)
+
+    def test_nearest_systems(self):
+        home = self.mq.user.planets[0]
+        result = list(self.mq.nearest_systems(home, 1))
+        self.assertEqual(1, len(result))
+        coord, system = result[0]
+        self.assertEqual(home.system_coord(), coord)
+        self.assertIs(self.mq.galaxy.system(home), system)
+
+    def test_systems_within(self):
+        home = self.mq.user.planets[0]
+        for coord, system in self.mq.systems_within(home, 5):
+            self.assertIsInstance(coord, model.SystemCoord)
+            self.assertIsInstance(system, model.System)
+        self.assertIn(home.system_coord(),
+                      dict(self.mq.systems_within(home, 0)))
+
+    def test_systems_in_rectangle(self):
+        home = self.mq.user.planets[0]
+        self.assertEqual([home.system_coord()],
+                         [coord for coord, _ in
+                          self.mq.systems_in_rectangle(home, home)])
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import re
+from decimal import Decimal
+from fractions import Fraction
 from itertools import repeat
 
 from .base import LibModelTest, ModelObjectTest, EqualityMixinTest
@@ -129,7 +131,103 @@ class TestResources(ModelObjectTest, EqualityMixinTest):
         self.assertEqual(foo, self.object)
         self.assertNotEqual(copy, self.object)
 
+    def test_frozen(self):
+        self.object.ore = 10
+        frozen = self.object.frozen()
+        self.assertEqual(frozen, self.object)
+        self.assertEqual(10, frozen.ore)
+        for change in (lambda: setattr(frozen, 'ore', 1),
+                       lambda: frozen.__setitem__('metal', 1),
+                       lambda: frozen.__iadd__(self.object),
+                       lambda: frozen.cap(self.object)):
+            self.assertRaises(TypeError, change)
+        self.assertEqual(self.object * 2, frozen + self.object)
+        copy = frozen.copy()
+        copy.ore += 1
+        self.assertEqual(11, copy.ore)
+
     def test_has_negative(self):
         self.assertFalse(self.object.has_negative)
         self.object.ore = -10
         self.assertTrue(self.object.has_negative)
+
+    def test_dirty(self):
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.assertFalse(self.object.is_dirty())
+        self.object.ore = 5
+        self.assertTrue(self.object.is_dirty())
+
+    def test_scalar_mul(self):
+        two = self.get_new_instance(ore=2, metal=1)
+        self.assertEqual([6.0, 3.0, 0, 0, 0], (two * 3).values())
+        self.assertEqual([1.0, 0.5, 0, 0, 0], (two / 2).values())
+
+    def test_scalar_number_types(self):
+        two = self.get_new_instance(ore=2, metal=1)
+        for scalar in (Fraction(3), Decimal(3)):
+            self.assertEqual([6.0, 3.0, 0, 0, 0], (two * scalar).values())
+        self.assertEqual([0.5, 0.25, 0, 0, 0],
+                         (two / Decimal(4)).values())
+
+    def test_in_place(self):
+        one = self.get_new_instance(ore=1)
+        original = self.object
+        self.object += one
+        self.object += one
+        self.assertIs(original, self.object)
+        self.assertEqual(2, self.object.ore)
+        self.object -= one
+        self.assertEqual(1, self.object.ore)
+        self.assertEqual(1, one.ore)
+
+    def test_cap(self):
+        self.object = self.get_new_instance(ore=10, metal=1)
+        self.object.cap(self.get_new_instance(ore=5, metal=5))
+        self.assertEqual([5, 1, 0, 0, 0], self.object.values())
+
+    def test_trade_value_cache(self):
+        self.assertEqual(0, self.object.trade_value)
+        self.object.metal = 1
+        self.assertEqual(2, self.object.trade_value)
+        self.object['ore'] = 1
+        self.assertEqual(3, self.object.trade_value)
+        self.object += self.object
+        self.assertEqual(6, self.object.trade_value)
+
+    def test_mapping(self):
+        self.object.thorium = 3
+        self.assertEqual(resources.ALL_RESOURCES, list(self.object))
+        self.assertEqual(resources.ALL_RESOURCES, list(self.object.keys()))
+        self.assertEqual(3, dict(self.object.items())[resources.THORIUM])
+        self.assertIn(resources.ORE, self.object)
+        self.assertNotIn(resources.SUN, self.object)
+        self.assertRaises(KeyError, self.object.__setitem__, 'flabber', 1)
+        self.assertFalse(hasattr(self.object, '__dict__'))
+
+    def test_mutable_mapping(self):
+        self.object.update(ore=1, metal=2)
+        self.object.update({resources.THORIUM: 3})
+        self.assertEqual([1, 2, 3, 0, 0], self.object.values())
+        self.assertEqual(
+            {'ore': 1, 'metal': 2, 'thorium': 3, 'hydrocarbon': 0,
+             'deuterium': 0}, self.object.data)
+        self.assertEqual(2, self.object.setdefault(resources.METAL, 5))
+        self.assertEqual(2, self.object.pop(resources.METAL))
+        self.assertEqual(0, self.object.metal)
+        self.assertEqual(7, self.object.pop(resources.SUN, 7))
+        self.assertRaises(KeyError, self.object.pop, resources.SUN)
+        del self.object[resources.ORE]
+        self.assertEqual(3, self.object.trade_value / 4)
+        self.object.clear()
+        self.assertEqual(0, self.object.trade_value)
+        self.assertRaises(KeyError, self.object.popitem)
+        frozen = self.get_new_instance(ore=1).frozen()
+        self.assertRaises(TypeError, frozen.update, ore=2)
+        self.assertRaises(TypeError, frozen.clear)
+
+    def test_state(self):
+        self.object.ore = 4
+        copy = resources.Resources()
+        copy.__setstate__(self.object.__getstate__())
+        self.assertEqual(self.object.values(), copy.values())
@@ -0,0 +1,161 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from unittest.mock import Mock
+
+from tests.base import SpaceTest
+from .base import LibModelTest
+
+from lib.error import ModelObjectError
+from lib.model import scheduler, update
+
+
+@update.event_action('tests.model.scheduler.record')
+def record(*args, **kwargs):
+    record.calls.append((args, kwargs))
+
+
+class TestLibModelScheduler(LibModelTest):
+    def setUp(self):
+        self.expected_exports = [scheduler.EventScheduler]
+
+
+class TestEventScheduler(SpaceTest):
+    def setUp(self):
+        self.object = scheduler.EventScheduler()
+        self.triggered = []
+
+    def event(self, name, trigger_time):
+        event = update.DelayedEvent(name, 0, self.triggered.append, name)
+        event.trigger_time = trigger_time
+        return self.object.schedule(event)
+
+    def test_run_in_trigger_time_order(self):
+        for name, trigger_time in [('c', 30), ('a', 10), ('b', 20),
+                                   ('b2', 20)]:
+            self.event(name, trigger_time)
+        self.assertEqual(10, self.object.next_trigger_time())
+        self.assertEqual(0, self.object.run(5))
+        self.assertEqual(3, self.object.run(20))
+        self.assertEqual(['a', 'b', 'b2'], self.triggered)
+        self.assertEqual(1, len(self.object))
+        self.assertEqual(30, self.object.next_trigger_time())
+        self.object.run(100)
+        self.assertEqual(0, len(self.object))
+        self.assertIsNone(self.object.next_trigger_time())
+
+    def test_cancel(self):
+        first, second = self.event('a', 10), self.event('b', 20)
+        self.object.cancel(first)
+        self.assertNotIn(first, self.object)
+        self.assertEqual(20, self.object.next_trigger_time())
+        self.assertEqual(1, self.object.run(100))
+        self.assertEqual(['b'], self.triggered)
+        self.assertRaises(ModelObjectError, self.object.cancel, second)
+
+    def test_reschedule(self):
+        first = self.event('a', 10)
+        self.event('b', 20)
+        self.object.reschedule(first, 30)
+        self.assertEqual(['b', 'a'], [ev.descriptor for ev in self.object])
+        self.object.run(25)
+        self.assertEqual(['b'], self.triggered)
+        self.assertRaises(ModelObjectError, self.object.schedule, first)
+
+    def test_action_schedules_events(self):
+        def action():
+            self.event('chained', 10)
+            # actions that trigger delayed events do not recurse
+            self.assertEqual(0, self.object.run(10))
+        event = update.DelayedEvent('first', 0, action)
+        event.trigger_time = 5
+        self.object.schedule(event)
+        self.assertEqual(2, self.object.run(10))
+        self.assertEqual(['chained'], self.triggered)
+
+    def test_dirty(self):
+        self.assertFalse(self.object.is_dirty())
+        event = self.event('a', 10)
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.object.run(5)
+        self.assertFalse(self.object.is_dirty())
+        self.object.cancel(event)
+        self.assertTrue(self.object.is_dirty())
+
+    def test_state(self):
+        record.calls = []
+        saved = update.DelayedEvent('saved', 0, record, 'Mine', level=2)
+        saved.trigger_time = 20
+        self.object.schedule(saved)
+        self.event('transient', 10)
+        state = self.object.__getstate__()
+        self.assertEqual([('saved', 0, 20, 'tests.model.scheduler.record',
+                           ['Mine'], {'level': 2})], state)
+
+        # the state of an unknown action is dropped
+        state.append(('unknown', 0, 30, 'no such action', [], {}))
+        restored = scheduler.EventScheduler()
+        restored.__setstate__(state)
+        self.assertFalse(restored.is_dirty())
+        self.assertEqual(1, len(restored))
+        restored.run(20)
+        self.assertEqual([(('Mine',), {'level': 2})], record.calls)
+
+    def test_repr(self):
+        self.event('a', 10)
+        self.assertIn('pending: 1', repr(self.object))
+        self.assertIn('next trigger time: 10', repr(self.object))
+
+    def test_trigger_many(self):
+        action = Mock()
+        for trigger_time in range(10000, 0, -1):
+            event = update.DelayedEvent('event', 0, action)
+            event.trigger_time = trigger_time
+            self.object.schedule(event)
+        self.assertEqual(5000, self.object.run(5000))
+        self.assertEqual(5000, action.call_count)
+        self.assertEqual(5001, self.object.next_trigger_time())
+
+
+class TestTimingWheelScheduler(TestEventScheduler):
+    def setUp(self):
+        super().setUp()
+        self.object = scheduler.TimingWheelScheduler(resolution=2, slots=4,
+                                                     levels=2, start=4)
+
+    def test_repr(self):
+        super().test_repr()
+        self.assertIn('resolution: 2', repr(self.object))
+
+    def test_same_order_as_heap(self):
+        heap = scheduler.EventScheduler()
+        triggered = {heap: [], self.object: []}
+        for queue in triggered:
+            # overdue, within the wheel, overflowing and in the same tick
+            for name, trigger_time in [('a', 5), ('b', 1000), ('c', 35.5),
+                                       ('d', 35), ('e', 3), ('f', 300),
+                                       ('g', 35)]:
+                event = update.DelayedEvent(name, 0, triggered[queue].append,
+                                            name)
+                event.trigger_time = trigger_time
+                queue.schedule(event)
+        for now in [4, 35.2, 36, 299, 999, 1000]:
+            self.assertEqual(heap.run(now), self.object.run(now))
+            self.assertEqual(heap.next_trigger_time(),
+                             self.object.next_trigger_time())
+        self.assertEqual(['e', 'a', 'd', 'g', 'c', 'f', 'b'],
+                         triggered[heap])
+        self.assertEqual(triggered[heap], triggered[self.object])
@@ -0,0 +1,116 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+from tests.base import SpaceTest
+from .base import LibModelTest
+
+from lib import model
+from lib.model import spatial
+
+
+class TestLibModelSpatial(LibModelTest):
+    def setUp(self):
+        self.expected_exports = [spatial.SpatialIndex]
+
+
+class TestSpatialIndex(SpaceTest):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.coords = [self.random_coord() for _ in range(300)]
+        # a distant cluster, many empty sectors away from the others
+        self.coords.extend(self.random_coord(sector=(90, -90))
+                           for _ in range(20))
+        self.object = spatial.SpatialIndex(self.coords, sector_size=10)
+
+    def random_coord(self, sector=(0, 0)):
+        coord = model.SystemCoord()
+        coord.sector = (sector[0] + self.rng.randint(-5, 5),
+                        sector[1] + self.rng.randint(-5, 5))
+        coord.system = (self.rng.randint(0, 9), self.rng.randint(0, 9))
+        return coord
+
+    def distance2(self, coord, other):
+        (x1, y1), (x2, y2) = (self.object.position(coord),
+                              self.object.position(other))
+        return (x1 - x2) ** 2 + (y1 - y2) ** 2
+
+    def ordered(self, coords, centre):
+        return sorted(set(coords), key=lambda coord: (
+            self.distance2(centre, coord),
+            self.object.position(coord)[::-1]))
+
+    def test_repr(self):
+        self.assertTrue(repr(self.object).startswith('SpatialIndex('))
+
+    def test_add_discard(self):
+        self.assertEqual(len(set(self.coords)), len(self.object))
+        self.assertEqual(set(self.coords), set(self.object))
+        coord = model.Coord(1234.5, 6.7, 3)
+        self.assertNotIn(coord, self.object)
+        self.object.add(coord)
+        self.object.add(coord.system_coord())
+        self.assertIn(coord.system_coord(), self.object)
+        self.assertIn(coord, self.object)
+        self.assertEqual(len(set(self.coords)) + 1, len(self.object))
+        self.object.discard(coord)
+        self.object.discard(coord)
+        self.assertNotIn(coord, self.object)
+        self.assertEqual(len(set(self.coords)), len(self.object))
+        self.object.clear()
+        self.assertEqual(0, len(self.object))
+        self.assertEqual([], self.object.nearest(coord))
+
+    def test_position(self):
+        coord = model.SystemCoord('-2.3', '4.15')
+        self.assertEqual((-17, 55), self.object.position(coord))
+
+    def test_within_rectangle(self):
+        corner, opposite = self.coords[0], self.coords[1]
+        (x1, y1), (x2, y2) = (self.object.position(corner),
+                              self.object.position(opposite))
+        expected = [coord for coord in set(self.coords)
+                    if min(x1, x2) <= self.object.position(coord)[0] <=
+                    max(x1, x2) and min(y1, y2) <=
+                    self.object.position(coord)[1] <= max(y1, y2)]
+        expected.sort(key=lambda coord: self.object.position(coord)[::-1])
+        self.assertEqual(expected,
+                         self.object.within_rectangle(corner, opposite))
+        self.assertEqual(expected,
+                         self.object.within_rectangle(opposite, corner))
+
+    def test_within_radius(self):
+        for radius in (0, 7, 25, 2000):
+            centre = self.rng.choice(self.coords)
+            expected = self.ordered(
+                [coord for coord in self.coords
+                 if self.distance2(centre, coord) <= radius * radius], centre)
+            self.assertEqual(expected,
+                             self.object.within_radius(centre, radius))
+
+    def test_nearest(self):
+        centres = [self.rng.choice(self.coords) for _ in range(10)]
+        centres.append(model.Coord(500.1, 500.1, 2))
+        for centre in centres:
+            for count in (1, 5, 30):
+                expected = self.ordered(self.coords, centre)[:count]
+                self.assertEqual(expected,
+                                 self.object.nearest(centre, count))
+
+    def test_nearest_all(self):
+        centre = self.coords[-1]
+        self.assertEqual(self.ordered(self.coords, centre),
+                         self.object.nearest(centre, len(self.coords) + 10))
+        self.assertEqual([], self.object.nearest(centre, 0))
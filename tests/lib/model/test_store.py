@@ -0,0 +1,76 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from tests.base import SpaceTest
+from .base import LibModelTest
+
+from lib import model
+from lib.model import store
+
+
+class TestLibModelStore(LibModelTest):
+    def setUp(self):
+        self.expected_exports = [store.SystemStore, store.ShelveSystemStore]
+
+
+class TestSystemStore(SpaceTest):
+    def get_new_instance(self):
+        return store.SystemStore()
+
+    def setUp(self):
+        self.object = self.get_new_instance()
+        self.coord = model.SystemCoord(1.12, 3.4)
+        self.state = model.System().__getstate__()
+
+    def tearDown(self):
+        self.object.close()
+
+    def test_set_get(self):
+        self.assertNotIn(self.coord, self.object)
+        self.object[self.coord] = self.state
+        self.assertIn(self.coord, self.object)
+        self.assertEqual(1, len(self.object))
+        self.assertEqual(self.state[:2], self.object[self.coord][:2])
+
+    def test_pop(self):
+        self.object[self.coord] = self.state
+        self.assertEqual(self.state[0], self.object.pop(self.coord)[0])
+        self.assertNotIn(self.coord, self.object)
+        self.assertRaises(KeyError, self.object.pop, self.coord)
+
+    def test_coords(self):
+        self.object[self.coord] = self.state
+        self.assertEqual([self.coord], list(self.object.coords()))
+
+    def test_items(self):
+        self.object[self.coord] = self.state
+        items = list(self.object.items())
+        self.assertEqual(1, len(items))
+        self.assertEqual(self.coord, items[0][0])
+        system = model.System.from_state(items[0][1])
+        self.assertEqual(self.state[1], system.sun_brightness)
+
+
+class TestShelveSystemStore(TestSystemStore):
+    def get_new_instance(self):
+        return store.ShelveSystemStore()
+
+    def test_temporary_file_removed(self):
+        tmp_dir = os.path.dirname(self.object.filename)
+        self.assertTrue(os.path.exists(tmp_dir))
+        self.object.close()
+        self.assertFalse(os.path.exists(tmp_dir))
+        self.object = self.get_new_instance()
@@ -15,6 +15,7 @@
 from .base import LibModelTest, ModelObjectTest, StateMixinTest
 
 from lib import model
+from lib.namegen import ForbiddenWords
 from lib.model import system
 
 
@@ -58,3 +59,21 @@ class TestSystem(ModelObjectTest, StateMixinTest):
 
     def test_planet_count(self):
         self.assertEqual(len(self.object.planets), self.object.size)
+
+    def test_planet_names(self):
+        names = ForbiddenWords()
+        test_system = system.System(planet_names=names)
+        self.assertEqual(len(test_system.planets), len(names))
+        for planet in test_system.planets:
+            self.assertIn(planet.name, names)
+
+    def test_dirty(self):
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.assertFalse(self.object.is_dirty())
+        self.object.planets[0].resources.ore = 10
+        self.assertTrue(self.object.is_dirty())
+
+    def test_from_state_is_clean(self):
+        restored = system.System.from_state(self.get_tst_state())
+        self.assertFalse(restored.is_dirty())
@@ -17,6 +17,7 @@ from unittest.mock import patch, Mock
 from tests.base import SpaceTest
 
 from lib import model
+from lib.error import ModelObjectError
 from lib.model import update
 
 
@@ -72,6 +73,71 @@ class TestUpdate(SpaceTest):
         self.assertEqual(getattr(test_method, 'args', tuple()), args)
 
 
+class TestUpdateEpoch(SpaceTest):
+    def setUp(self):
+        self.delayed = Mock()
+        update.delayed_event_trigger.CALLABLE = self.delayed
+
+    def tearDown(self):
+        del update.delayed_event_trigger.CALLABLE
+
+    def test_time(self):
+        self.assertIsNone(update.UpdateEpoch.current)
+        with update.UpdateEpoch(now=50) as epoch:
+            self.assertIs(epoch, update.UpdateEpoch.current)
+            self.assertEqual(50, update.current_time())
+            # nested epochs join the outer one
+            with update.UpdateEpoch(now=60) as inner:
+                self.assertIs(epoch, inner)
+                self.assertEqual(50, update.current_time())
+            self.assertIs(epoch, update.UpdateEpoch.current)
+        self.assertIsNone(update.UpdateEpoch.current)
+        self.assertNotEqual(50, update.current_time())
+
+    def test_once_per_epoch(self):
+        # the "update" method hides the module within the class scope
+        delayed, once, trigger = (update.delayed_event_trigger,
+                                  update.once_per_epoch, update.update_trigger)
+
+        class Updatable(object):
+            def __init__(self):
+                self.updates = 0
+
+            @delayed
+            @once
+            def update(self):
+                self.updates += 1
+
+            @trigger
+            def func(self):
+                pass
+
+        first, second = Updatable(), Updatable()
+        with update.UpdateEpoch() as epoch:
+            for _ in range(3):
+                first.func()
+                second.update()
+            self.assertTrue(epoch.events_run)
+        self.assertEqual((1, 1), (first.updates, second.updates))
+        self.assertEqual(1, self.delayed.call_count)
+        first.func()
+        first.func()
+        self.assertEqual(3, first.updates)
+        self.assertEqual(3, self.delayed.call_count)
+
+    def test_exception_leaves_epoch(self):
+        with self.assertRaises(ValueError):
+            with update.UpdateEpoch():
+                raise ValueError()
+        self.assertIsNone(update.UpdateEpoch.current)
+
+    def test_repr(self):
+        epoch = update.UpdateEpoch(now=5)
+        epoch.mark_updated(epoch)
+        self.assertEqual('UpdateEpoch(time: 5, updated: 1, events run: False)',
+                         repr(epoch))
+
+
 class TestResourceUpdater(SpaceTest):
     def setUp(self):
         self.time_patch = patch('time.time')
@@ -99,6 +165,11 @@ class TestResourceUpdater(SpaceTest):
         self.assertEqual(self.ru.resources.ore,
                          (new_time - self.last_update) * self.rates.ore)
 
+    def test_update_in_epoch(self):
+        with update.UpdateEpoch(now=105):
+            self.assertEqual(105, self.ru.update()[1])
+        self.assertEqual(5 * self.rates.ore, self.ru.resources.ore)
+
     def test_max_resources(self):
         mock_time = self.time_patch.start()
         new_time = 110
@@ -112,6 +183,64 @@ class TestResourceUpdater(SpaceTest):
         self.assertEqual(self.ru.resources.ore, max_resources.ore)
 
 
+class TestTickAll(SpaceTest):
+    def setUp(self):
+        self.galaxy = model.Galaxy(seed=1)
+        self.now = 1000.0
+        self.owned = []
+        for x in range(3):
+            planet = self.galaxy.planet(model.Coord(x, 0, 0))
+            planet.emperor = 'emperor'
+            planet.buildings = [model.Mine(x + 1)]
+            planet.last_update = self.now - 100
+            self.owned.append(planet)
+        self.unowned = self.galaxy.planet(model.Coord(0, 0, 1))
+        self.unowned.buildings = [model.Mine(1)]
+        self.unowned.last_update = self.now - 100
+
+    def expected(self, planet):
+        return (planet.resources + planet.rates * 100).cap(
+            planet.max_resources)
+
+    def check_tick(self):
+        expected = [self.expected(planet) for planet in self.owned]
+        update.tick_all(self.galaxy, self.now)
+        for planet, resources in zip(self.owned, expected):
+            self.assertEqual(self.now, planet.last_update)
+            self.assertEqual(list(resources.values()),
+                             list(planet.resources.values()))
+        self.assertEqual(self.now - 100, self.unowned.last_update)
+        self.assertEqual(0, self.unowned.resources.ore)
+
+    def test_tick_all(self):
+        self.check_tick()
+
+    def test_tick_all_ledger(self):
+        if model.ledger.numpy is None:
+            self.skipTest('numpy is not installed')
+        self.galaxy.ledger = model.ResourceLedger()
+        for planet in self.galaxy.resident_planets():
+            self.galaxy.ledger.add(planet)
+        self.check_tick()
+
+    def test_tick_all_in_epoch(self):
+        with update.UpdateEpoch(now=self.now) as epoch:
+            update.tick_all(self.galaxy)
+            ticked = [planet.resources.copy() for planet in self.owned]
+            # the planets are not updated again in the same epoch
+            for planet in self.owned:
+                planet.update()
+                self.assertEqual(self.now, planet.last_update)
+            self.assertEqual(len(self.owned), len(epoch.updated))
+        self.assertEqual(ticked, [planet.resources for planet in self.owned])
+
+    def test_tick_all_caps(self):
+        self.owned[0].last_update = 0
+        update.tick_all(self.galaxy, 1e12)
+        self.assertEqual(self.owned[0].max_resources.ore,
+                         self.owned[0].resources.ore)
+
+
 class TestDelayedEvent(SpaceTest):
     def setUp(self):
         self.time_patch = patch('time.time')
@@ -151,3 +280,29 @@ class TestDelayedEvent(SpaceTest):
         action = Mock(side_effect=Exception)
         event = update.DelayedEvent('descriptor', 1, action)
         self.assertRaises(Exception, event)
+
+    def test_state(self):
+        update.EVENT_ACTIONS['tests.model.update.action'] = action = Mock()
+        try:
+            event = update.DelayedEvent('descriptor', 1, action, 'a', b=2)
+            self.assertTrue(event.persistent)
+            state = event.__getstate__()
+            restored = update.DelayedEvent(None, 0, None)
+            restored.__setstate__(state)
+            self.assertIs(action, restored.action)
+            self.assertEqual(('a',), restored.args)
+            self.assertEqual({'b': 2}, restored.kwargs)
+            self.assertEqual(event.trigger_time, restored.trigger_time)
+        finally:
+            del update.EVENT_ACTIONS['tests.model.update.action']
+        self.assertFalse(event.persistent)
+        self.assertRaises(ModelObjectError, event.__getstate__)
+        self.assertRaises(ModelObjectError, restored.__setstate__, state)
+
+    def test_event_action_registered_once(self):
+        decorator = update.event_action('tests.model.update.once')
+        try:
+            decorator(Mock())
+            self.assertRaises(ModelObjectError, decorator, Mock())
+        finally:
+            del update.EVENT_ACTIONS['tests.model.update.once']
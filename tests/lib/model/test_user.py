@@ -37,3 +37,12 @@ class TestUser(ModelObjectTest, StateMixinTest):
 
     def get_tst_state(self):
         return ('name', [])
+
+    def test_dirty(self):
+        self.assertTrue(self.object.is_dirty())
+        self.object.mark_clean()
+        self.assertFalse(self.object.is_dirty())
+        self.object.planets = self.object.planets + [model.Coord()]
+        self.assertTrue(self.object.is_dirty())
+        self.object.__setstate__(self.get_tst_state())
+        self.assertFalse(self.object.is_dirty())
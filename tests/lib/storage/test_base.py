@@ -0,0 +1,62 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+
+from tests.base import SpaceTest
+
+from lib import model
+from lib.storage import base
+
+
+class TestAtomicWrite(SpaceTest):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'save.space')
+        with open(self.filename, 'w') as fout:
+            fout.write('old')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self):
+        with open(self.filename) as fin:
+            return fin.read()
+
+    def test_replace(self):
+        with base.atomic_write(self.filename) as fout:
+            fout.write('new')
+            # the original is intact until the write completes
+            self.assertEqual('old', self.read())
+        self.assertEqual('new', self.read())
+        self.assertEqual(['save.space'], os.listdir(self.tmp_dir.name))
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            with base.atomic_write(self.filename) as fout:
+                fout.write('partial')
+                raise ValueError('interrupted')
+        self.assertEqual('old', self.read())
+        self.assertEqual(['save.space'], os.listdir(self.tmp_dir.name))
+
+
+class TestCoordValues(SpaceTest):
+    def test_round_trip(self):
+        for x, y in (('3.10', '-2.7'), ('-0.5', '0.5'), ('0.0', '-0.0')):
+            coord = model.SystemCoord(x, y)
+            restored = model.SystemCoord()
+            restored.__setstate__(base.coord_state(*base.coord_values(coord)))
+            self.assertEqual(coord, restored)
+            self.assertEqual(coord.__getstate__(), restored.__getstate__())
@@ -0,0 +1,114 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+
+from tests.base import SpaceTest
+from .test_jsonfile import StorageTest
+
+from lib import model
+from lib.engine import SpaceEngine
+from lib.error import SaveFileError
+from lib.storage import binary
+
+
+class TestBinaryStorage(StorageTest):
+    def setUp(self):
+        super().setUp()
+        self.storage_name = 'binary'
+
+    def new_unseeded_game(self, compression):
+        engine = self.new_engine()
+        engine.storage.compression = compression
+        engine.galaxy = model.Galaxy()
+        engine.user = model.User('emperor', model.Coord(1, 1, 1))
+        planet = engine.planet(engine.user.planets[0])
+        planet.emperor = engine.user.name
+        planet.resources.ore = 1e6
+        planet.resources.metal = 1e6
+        planet.build('Mine')
+        for x in range(5):
+            engine.system(model.SystemCoord(x, -x))
+        engine.save()
+        return engine
+
+    def test_compressions(self):
+        for compression in binary.COMPRESSIONS:
+            engine = self.new_unseeded_game(compression)
+            loaded = SpaceEngine(self.save_file)
+            loaded.load()
+            self.assertEqual(compression, loaded.storage.compression)
+            self.assertIsNone(loaded.galaxy.seed)
+            self.assertEqual(engine.galaxy.__getstate__(),
+                             loaded.galaxy.__getstate__())
+            self.assertEqual(engine.user.__getstate__(),
+                             loaded.user.__getstate__())
+            planet = loaded.planet(engine.user.planets[0])
+            self.assertEqual(1, planet.building('Mine').level)
+
+    def test_large_seed(self):
+        for seed in (2**64 + 1, -2**70):
+            engine = self.new_engine()
+            engine.galaxy = model.Galaxy(seed=seed)
+            engine.system(model.SystemCoord(1, 1))
+            engine.save()
+            loaded = SpaceEngine(self.save_file)
+            loaded.load()
+            self.assertEqual(seed, loaded.galaxy.seed)
+            self.assertEqual(engine.galaxy.__getstate__(),
+                             loaded.galaxy.__getstate__())
+
+    def test_smaller_than_json(self):
+        self.new_unseeded_game('none')
+        binary_size = os.path.getsize(self.save_file)
+        engine = SpaceEngine(self.save_file)
+        engine.load()
+        engine.opts = type('Opts', (object,), {'storage': 'json'})
+        engine.save()
+        self.assertLess(binary_size, os.path.getsize(self.save_file))
+
+    def test_configure(self):
+        storage = binary.BinaryStorage()
+        storage.configure(None)
+        self.assertEqual(binary.DEFAULT_COMPRESSION, storage.compression)
+        storage.configure(type('Opts', (object,), {'compression': 'none'}))
+        self.assertEqual('none', storage.compression)
+
+    def test_unsupported_version(self):
+        self.new_game()
+        with open(self.save_file, 'r+b') as fout:
+            fout.seek(len(binary.MAGIC))
+            fout.write(bytes([binary.FORMAT_VERSION + 1]))
+        self.assertRaises(SaveFileError, SpaceEngine(self.save_file).load)
+
+    def test_corrupt(self):
+        self.new_unseeded_game('none')
+        with open(self.save_file, 'r+b') as fout:
+            fout.truncate(os.path.getsize(self.save_file) // 2)
+        self.assertRaises(SaveFileError, SpaceEngine(self.save_file).load)
+
+
+class TestPacker(SpaceTest):
+    def test_strings(self):
+        packer = binary._Packer()
+        self.assertEqual(binary.NONE, packer.string(None))
+        self.assertEqual(0, packer.string('spam'))
+        self.assertEqual(1, packer.string('eggs'))
+        self.assertEqual(0, packer.string('spam'))
+        packer.pack(binary.COUNT, 7)
+        unpacker = binary._Unpacker(packer.getvalue())
+        self.assertEqual(['spam', 'eggs'], unpacker.strings)
+        self.assertEqual((7,), unpacker.unpack(binary.COUNT))
+        self.assertIsNone(unpacker.string(binary.NONE))
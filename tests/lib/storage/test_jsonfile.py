@@ -0,0 +1,206 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import tempfile
+from unittest.mock import Mock
+
+from tests.base import SpaceTest
+
+from lib import model
+from lib import storage
+from lib.engine import SpaceEngine
+from lib.model.update import DelayedEvent, event_action
+
+
+@event_action('tests.storage.record')
+def record(*args, **kwargs):
+    record.calls.append((args, kwargs))
+
+
+class StorageTest(SpaceTest):
+
+    """Save and load a game through a storage backend.
+
+    Subclasses set self.storage_name in setUp.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.save_file = os.path.join(self.tmp_dir.name, 'save.space')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def skip_base_class(self):
+        if self.__class__.__name__ == 'StorageTest':
+            self.skipTest('base class, not a real test')
+
+    def new_engine(self):
+        engine = SpaceEngine(self.save_file)
+        engine.storage = storage.get_storage(self.storage_name)
+        return engine
+
+    def new_game(self):
+        engine = self.new_engine()
+        engine.new_game(engine.mock_new_game_info_cb)
+        return engine
+
+    def test_detect(self):
+        self.skip_base_class()
+        self.new_game().storage.close()
+        self.assertIsInstance(storage.detect_storage(self.save_file),
+                              storage.STORAGE_BACKENDS[self.storage_name])
+
+    def test_save_load(self):
+        self.skip_base_class()
+        engine = self.new_game()
+        coord = engine.user.planets[0]
+        planet = engine.planet(coord)
+        planet.resources.thorium = 42
+        engine.save((coord, planet))
+
+        loaded = SpaceEngine(self.save_file)
+        self.assertEqual(planet.name, loaded.load())
+        self.assertEqual(engine.user.name, loaded.user.name)
+        self.assertEqual(engine.user.planets, loaded.user.planets)
+        self.assertEqual(engine.galaxy.seed, loaded.galaxy.seed)
+        loaded_planet = loaded.planet(coord)
+        self.assertEqual(planet.name, loaded_planet.name)
+        self.assertEqual(42, loaded_planet.resources.thorium)
+        self.assertEqual(engine.user.name, loaded_planet.emperor)
+
+    def test_incremental_save(self):
+        self.skip_base_class()
+        engine = self.new_game()
+        coord = engine.user.planets[0]
+        engine.planet(coord).resources.thorium = 7
+        other = model.Coord(9, 9, 0)
+        engine.planet(other).emperor = 'other'
+        engine.save((coord, engine.planet(coord)), incremental=True)
+        self.assertFalse(engine.galaxy.is_dirty())
+
+        loaded = SpaceEngine(self.save_file)
+        self.assertEqual(engine.planet(coord).name, loaded.load())
+        self.assertEqual(7, loaded.planet(coord).resources.thorium)
+        self.assertEqual('other', loaded.planet(other).emperor)
+        self.assertEqual(engine.user.name, loaded.user.name)
+
+    def test_save_load_events(self):
+        self.skip_base_class()
+        engine = self.new_game()
+        event = engine.events.schedule(
+            DelayedEvent('saved', 60, record, 'Mine', level=2))
+        engine.events.schedule(DelayedEvent('transient', 30, Mock()))
+        engine.save(incremental=True)
+        self.assertFalse(engine.events.is_dirty())
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual([event.__getstate__()],
+                         loaded.events.__getstate__())
+        record.calls = []
+        loaded.events.run(event.trigger_time)
+        self.assertEqual([(('Mine',), {'level': 2})], record.calls)
+
+
+class TestJsonStorage(StorageTest):
+    def setUp(self):
+        super().setUp()
+        self.storage_name = 'json'
+        self.log_file = self.save_file + '.log'
+
+    def read_log(self):
+        with open(self.log_file) as log:
+            return [json.loads(line) for line in log]
+
+    def test_delta_log(self):
+        engine = self.new_game()
+        engine.save(incremental=True)
+        # nothing changed since the new game was saved
+        self.assertEqual([[]], [rec['systems'] for rec in self.read_log()])
+        self.assertNotIn('user', self.read_log()[0])
+
+        engine.planet(model.Coord(5, 5, 0)).emperor = 'other'
+        engine.save(incremental=True)
+        records = self.read_log()
+        self.assertEqual(2, len(records))
+        self.assertEqual([list(model.SystemCoord(5, 5).__getstate__())],
+                         [coord for coord, _ in records[1]['systems']])
+
+        engine.save()
+        self.assertFalse(os.path.exists(self.log_file))
+
+    def test_compaction(self):
+        engine = self.new_game()
+        engine.storage.compact_records = 2
+        for _ in range(2):
+            engine.save(incremental=True)
+        self.assertEqual(2, len(self.read_log()))
+        engine.save(incremental=True)
+        self.assertFalse(os.path.exists(self.log_file))
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.storage.compact_records = 2
+        loaded.save(incremental=True)
+        self.assertEqual(1, len(self.read_log()))
+
+    def test_truncated_log(self):
+        engine = self.new_game()
+        # keep the log smaller than the save file so it is not compacted
+        for x in range(10):
+            engine.planet(model.Coord(x, 9, 0)).emperor = 'filler'
+        engine.save()
+        coord = model.Coord(5, 5, 0)
+        engine.planet(coord).emperor = 'other'
+        engine.save(incremental=True)
+        engine.planet(coord).emperor = 'lost'
+        engine.save(incremental=True)
+        with open(self.log_file, 'r+') as log:
+            log.truncate(os.path.getsize(self.log_file) - 10)
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual('other', loaded.planet(coord).emperor)
+
+    def test_stale_log(self):
+        engine = self.new_game()
+        coord = model.Coord(5, 5, 0)
+        engine.planet(coord).emperor = 'other'
+        engine.save(incremental=True)
+        with open(self.log_file) as log:
+            stale_log = log.read()
+        engine.planet(coord).emperor = 'newer'
+        engine.save()
+        # as if a crash happened before the old log was removed
+        with open(self.log_file, 'w') as log:
+            log.write(stale_log)
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual('newer', loaded.planet(coord).emperor)
+
+    def test_journal(self):
+        engine = self.new_game()
+        coord = engine.user.planets[0]
+        engine.planet(coord).resources.ore = 99
+        engine.journal('build Mine', (coord, engine.planet(coord)))
+        self.assertEqual(['build Mine'],
+                         [rec['command'] for rec in self.read_log()])
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual(99, loaded.planet(coord).resources.ore)
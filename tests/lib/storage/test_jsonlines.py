@@ -0,0 +1,108 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from .test_jsonfile import StorageTest
+
+from lib import model
+from lib.engine import SpaceEngine
+from lib.error import SaveFileError
+
+
+class TestJsonLinesStorage(StorageTest):
+    def setUp(self):
+        super().setUp()
+        self.storage_name = 'jsonl'
+
+    def new_unseeded_game(self):
+        engine = self.new_engine()
+        engine.galaxy = model.Galaxy()
+        engine.user = model.User('emperor', model.Coord(1, 1, 1))
+        engine.planet(engine.user.planets[0]).emperor = engine.user.name
+        self.coords = [model.SystemCoord(x, x) for x in range(6)]
+        for coord in self.coords:
+            engine.system(coord)
+        engine.save()
+        return engine
+
+    def names(self, system):
+        return [planet.name for planet in system.planets]
+
+    def test_lazy_load(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual(0, len(loaded.galaxy._systems))
+        self.assertEqual(len(self.coords), len(loaded.storage.store))
+        self.assertEqual(self.names(engine.system(self.coords[3])),
+                         self.names(loaded.system(self.coords[3])))
+        self.assertEqual(1, len(loaded.galaxy._systems))
+        # planet names are registered without constructing the systems
+        for planet in engine.system(self.coords[4]).planets:
+            self.assertIn(planet.name, loaded.galaxy.planet_names)
+
+    def test_lazy_load_index(self):
+        self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual(set(self.coords), set(loaded.galaxy.index))
+        self.assertEqual(0, len(loaded.galaxy._systems))
+
+    def test_save_after_lazy_load(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.planet(model.Coord(2, 2, 0)).emperor = 'other'
+        loaded.save()
+        # the store reads from the rewritten file
+        self.assertEqual(self.names(engine.system(self.coords[5])),
+                         self.names(loaded.system(self.coords[5])))
+
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('other', again.planet(model.Coord(2, 2, 0)).emperor)
+        self.assertEqual(len(self.coords), len(list(
+            again.galaxy.system_states())))
+
+    def test_eager_load(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(
+            self.save_file, opts=type('Opts', (object,), {'eager_load': True}))
+        loaded.load()
+        self.assertFalse(loaded.storage.lazy)
+        self.assertIsNone(loaded.storage.store)
+        self.assertEqual(len(self.coords), len(loaded.galaxy._systems))
+        self.assertEqual(self.names(engine.system(self.coords[0])),
+                         self.names(loaded.system(self.coords[0])))
+
+    def test_convert_to_json(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.opts = type('Opts', (object,), {'storage': 'json'})
+        loaded.save()
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('json', again.storage.name)
+        self.assertEqual(self.names(engine.system(self.coords[2])),
+                         self.names(again.system(self.coords[2])))
+
+    def test_unsupported_version(self):
+        self.new_game()
+        with open(self.save_file) as fin:
+            lines = fin.readlines()
+        with open(self.save_file, 'w') as fout:
+            fout.write(lines[0].replace('"version": 1', '"version": 99'))
+            fout.writelines(lines[1:])
+        self.assertRaises(SaveFileError, SpaceEngine(self.save_file).load)
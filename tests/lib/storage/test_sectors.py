@@ -0,0 +1,206 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+
+from tests.base import SpaceTest
+from .test_jsonfile import StorageTest
+
+from lib import model
+from lib.engine import SpaceEngine
+from lib.error import SaveFileError
+from lib.storage import sectors
+
+
+class TestSectorStorage(StorageTest):
+    def setUp(self):
+        super().setUp()
+        self.storage_name = 'sectors'
+        self.directory = sectors.sector_directory(self.save_file)
+
+    def new_unseeded_game(self):
+        engine = self.new_engine()
+        engine.galaxy = model.Galaxy()
+        engine.user = model.User('emperor', model.Coord(1, 1, 1))
+        engine.planet(engine.user.planets[0]).emperor = engine.user.name
+        self.coords = [model.SystemCoord(x, x) for x in range(6)]
+        for coord in self.coords:
+            engine.system(coord)
+        engine.save()
+        return engine
+
+    def names(self, system):
+        return [planet.name for planet in system.planets]
+
+    def files(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_sector_files(self):
+        self.new_unseeded_game()
+        self.assertEqual(len(self.coords), len(self.files()))
+        with open(self.save_file) as fin:
+            manifest = json.load(fin)
+        self.assertEqual([[x, x, '{0}_{0}.1.json'.format(x), [[0, 0]]]
+                          for x in range(len(self.coords))],
+                         manifest['sectors'])
+
+    def test_query_reads_no_sectors(self):
+        self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        store = loaded.storage.store
+        self.assertEqual(set(self.coords), set(loaded.galaxy.index))
+        self.assertEqual(self.coords[2:4], loaded.galaxy.nearest_systems(
+            model.SystemCoord(2.1, 2.1), 2))
+        self.assertNotIn(model.SystemCoord(2.5, 2.5), store)
+        self.assertEqual(set(), store.loaded_sectors())
+        # only the sectors of the systems that are looked up are read
+        for coord, system in loaded.systems_within(self.coords[2], 1):
+            self.assertEqual(self.coords[2], coord)
+        self.assertEqual(set([(2, 2)]), store.loaded_sectors())
+
+    def test_lazy_load(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        store = loaded.storage.store
+        self.assertEqual(0, len(loaded.galaxy._systems))
+        self.assertEqual(set(), store.loaded_sectors())
+        self.assertEqual(len(self.coords), len(store))
+        home = loaded.user.planets[0]
+        self.assertEqual('emperor', loaded.planet(home).emperor)
+        self.assertEqual(set([home.sector]), store.loaded_sectors())
+        self.assertEqual(self.names(engine.system(self.coords[3])),
+                         self.names(loaded.system(self.coords[3])))
+        self.assertEqual(set([home.sector, (3, 3)]), store.loaded_sectors())
+        # planet names are registered as their sectors are read
+        for planet in engine.system(self.coords[3]).planets:
+            self.assertIn(planet.name, loaded.galaxy.planet_names)
+
+    def test_incremental_save_rewrites_dirty_sectors(self):
+        self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        before = self.files()
+        loaded.planet(model.Coord(2, 2, 0)).emperor = 'other'
+        loaded.planet(model.Coord(7, 7, 0)).emperor = 'new'
+        loaded.save(incremental=True)
+        after = self.files()
+        self.assertEqual(['2_2.2.json', '7_7.2.json'],
+                         sorted(set(after) - set(before)))
+        self.assertEqual(['2_2.1.json'], sorted(set(before) - set(after)))
+        # only the changed sectors were read
+        self.assertEqual(set(), loaded.storage.store.loaded_sectors())
+
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('other', again.planet(model.Coord(2, 2, 0)).emperor)
+        self.assertEqual('new', again.planet(model.Coord(7, 7, 0)).emperor)
+        self.assertEqual(len(self.coords) + 1, len(again.storage.store))
+
+    def test_save_after_lazy_load(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.planet(model.Coord(2, 2, 0)).emperor = 'other'
+        loaded.save()
+        self.assertEqual(len(self.coords), len(self.files()))
+        self.assertEqual(self.names(engine.system(self.coords[5])),
+                         self.names(loaded.system(self.coords[5])))
+
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('other', again.planet(model.Coord(2, 2, 0)).emperor)
+        self.assertEqual(len(self.coords), len(list(
+            again.galaxy.system_states())))
+
+    def test_save_as(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.save_file = os.path.join(self.tmp_dir.name, 'copy.space')
+        loaded.save(incremental=True)
+        again = SpaceEngine(loaded.save_file)
+        again.load()
+        self.assertEqual(len(self.coords), len(again.storage.store))
+        self.assertEqual(self.names(engine.system(self.coords[4])),
+                         self.names(again.system(self.coords[4])))
+
+    def test_new_game_after_load(self):
+        self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.new_game(loaded.mock_new_game_info_cb)
+        self.assertEqual(['0_0.2.json'], self.files())
+
+    def test_convert_to_json(self):
+        engine = self.new_unseeded_game()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.opts = type('Opts', (object,), {'storage': 'json'})
+        loaded.save()
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('json', again.storage.name)
+        self.assertEqual(self.names(engine.system(self.coords[2])),
+                         self.names(again.system(self.coords[2])))
+
+    def test_unsupported_version(self):
+        self.new_game()
+        with open(self.save_file) as fin:
+            manifest = json.load(fin)
+        manifest['version'] = 99
+        with open(self.save_file, 'w') as fout:
+            json.dump(manifest, fout)
+        self.assertRaises(SaveFileError, SpaceEngine(self.save_file).load)
+
+
+class TestSectorSystemStore(SpaceTest):
+    def setUp(self):
+        self.object = sectors.SectorSystemStore('unused', {})
+        self.coord = model.SystemCoord(1.12, 3.4)
+        self.state = model.System().__getstate__()
+
+    def test_set_get(self):
+        self.assertNotIn(self.coord, self.object)
+        self.assertEqual(set(), self.object.loaded_sectors())
+        self.object[self.coord] = self.state
+        self.assertIn(self.coord, self.object)
+        self.assertEqual(1, len(self.object))
+        self.assertEqual(self.state, self.object[self.coord])
+        self.assertEqual(set([(1, 3)]), self.object.sectors())
+
+    def test_delete(self):
+        self.object[self.coord] = self.state
+        del self.object[self.coord]
+        self.assertNotIn(self.coord, self.object)
+        self.assertEqual(0, len(self.object))
+        self.assertEqual(set(), self.object.sectors())
+        self.assertRaises(KeyError, self.object.__delitem__, self.coord)
+
+    def test_items(self):
+        self.object[self.coord] = self.state
+        self.assertEqual([(self.coord, self.state)], list(self.object.items()))
+        self.assertEqual([self.coord], list(self.object.coords()))
+
+    def test_contains_unread_sector(self):
+        systems = [(x, y) for x in range(50) for y in range(50)]
+        self.object.reopen('unused', {(1, 3): ('1_3.1.json', systems)})
+        self.assertIsInstance(self.object._saved[(1, 3)], set)
+        # the sector file is only read for a listed system
+        self.assertNotIn(model.SystemCoord('1.51', '3.51'), self.object)
+        self.assertNotIn(model.SystemCoord('2.1', '3.1'), self.object)
+        self.assertEqual(set(), self.object.loaded_sectors())
+        self.assertEqual(len(systems), len(self.object))
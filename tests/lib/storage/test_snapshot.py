@@ -0,0 +1,173 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest.mock import patch
+
+from tests.base import SpaceTest
+
+from lib import model
+from lib.engine import SpaceEngine
+from lib.error import SaveFileError
+from lib.storage import snapshot
+
+
+class TestGalaxySnapshot(SpaceTest):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'galaxy.snapshot')
+        self.engine = SpaceEngine(os.path.join(self.tmp_dir.name, 'save'))
+        self.engine.galaxy = model.Galaxy()
+        self.home = model.Coord(1, 1, 0)
+        self.engine.user = model.User('emperor', self.home)
+        planet = self.engine.planet(self.home)
+        planet.emperor = 'emperor'
+        planet.resources.thorium = 42
+        planet.buildings = [model.Mine(3), model.SolarPowerPlant(2)]
+        self.coords = [model.SystemCoord(x, -x) for x in range(5, 0, -1)]
+        for coord in self.coords:
+            self.engine.system(coord)
+        self.engine.export_snapshot(self.filename)
+        self.object = snapshot.GalaxySnapshot(self.filename)
+
+    def tearDown(self):
+        self.object.close()
+        self.tmp_dir.cleanup()
+
+    def test_repr(self):
+        self.assertTrue(repr(self.object).startswith('GalaxySnapshot('))
+
+    def test_system_states(self):
+        expected = sorted(self.engine.galaxy.system_states(),
+                          key=lambda item: item[0].sector + item[0].system)
+        self.assertEqual(expected, list(self.object.system_states()))
+        self.assertEqual(len(expected), len(self.object))
+
+    def test_planet(self):
+        planet = self.object.planet(self.home)
+        expected = self.engine.planet(self.home)
+        self.assertEqual(expected.name, planet.name)
+        self.assertEqual('emperor', planet.emperor)
+        self.assertEqual(expected.sun_distance, planet.sun_distance)
+        self.assertEqual(42, planet.resources.thorium)
+        self.assertEqual(expected.buildings, planet.buildings)
+        self.assertEqual(expected.__getstate__(), planet.__getstate__())
+        with self.assertRaises(TypeError):
+            planet.resources.thorium = 0
+        with self.assertRaises(AttributeError):
+            planet.name = 'renamed'
+
+    def test_system(self):
+        for coord in self.coords + [self.home]:
+            self.assertIn(coord, self.object)
+            system = self.object.system(coord)
+            expected = self.engine.system(coord)
+            self.assertEqual(expected.size, system.size)
+            self.assertEqual([planet.name for planet in expected.planets],
+                             [planet.name for planet in system.planets])
+        missing = model.SystemCoord(7, 7)
+        self.assertNotIn(missing, self.object)
+        self.assertRaises(KeyError, self.object.system, missing)
+
+    def test_column(self):
+        ore = self.object.column('planets', 'thorium')
+        self.assertTrue(ore.readonly)
+        self.assertEqual(42, sum(ore))
+        names = self.object.column('planets', 'name')
+        self.assertEqual(sorted(planet.name for planet in
+                                self.engine.galaxy.resident_planets()),
+                         sorted(self.object.string(name) for name in names))
+        self.assertEqual(len(names), len(list(
+            self.object.resident_planets())))
+
+    def test_queries(self):
+        query = model.ModelQueryMixin()
+        query.galaxy = self.object
+        (coord, system), = query.nearest_systems(self.home)
+        self.assertEqual(self.home.system_coord(), coord)
+        self.assertIsInstance(system, snapshot.SystemView)
+        self.assertEqual(self.coords[::-1][:2], self.object.systems_within(
+            model.SystemCoord(1, -1), 150))
+        self.assertEqual('emperor', query.planet(self.home).emperor)
+
+    def test_replaced_while_open(self):
+        self.engine.planet(self.home).emperor = 'other'
+        self.engine.export_snapshot(self.filename)
+        self.assertEqual('emperor', self.object.planet(self.home).emperor)
+        with snapshot.GalaxySnapshot(self.filename) as new:
+            self.assertEqual('other', new.planet(self.home).emperor)
+
+    def check_export_keeps_residents(self, galaxy):
+        self.engine.galaxy = galaxy
+        coords = [model.SystemCoord(x, x) for x in range(8)]
+        states = dict((coord, galaxy.system(coord).__getstate__())
+                      for coord in coords)
+        galaxy.planet(model.Coord(0, 0, 0)).emperor = 'emperor'
+        states[coords[0]] = galaxy.system(coords[0]).__getstate__()
+        resident = list(galaxy._systems)
+        with patch.object(galaxy, '_add_resident') as add_resident:
+            self.engine.export_snapshot(self.filename)
+        self.assertFalse(add_resident.called)
+        self.assertEqual(resident, list(galaxy._systems))
+        with snapshot.GalaxySnapshot(self.filename) as exported:
+            self.assertEqual(
+                self.without_last_update(sorted(
+                    states.items(),
+                    key=lambda item: item[0].sector + item[0].system)),
+                self.without_last_update(exported.system_states()))
+
+    @staticmethod
+    def without_last_update(system_states):
+        """Regenerated pristine planets are updated when they are created.
+        """
+        return [(coord, (size, brightness,
+                         [planet[:-1] for planet in planets]))
+                for coord, (size, brightness, planets) in system_states]
+
+    def test_export_keeps_residents(self):
+        self.check_export_keeps_residents(
+            model.Galaxy(max_resident=2, store=model.SystemStore()))
+
+    def test_export_keeps_residents_seeded(self):
+        self.check_export_keeps_residents(
+            model.Galaxy(seed=5, max_resident=2, store=model.SystemStore()))
+
+    def test_seed(self):
+        self.assertIsNone(self.object.seed)
+        for seed in (5, 2**64 + 1, -2**70):
+            self.engine.galaxy = model.Galaxy(seed=seed)
+            self.engine.system(model.SystemCoord(1, 1))
+            self.engine.export_snapshot(self.filename)
+            with snapshot.GalaxySnapshot(self.filename) as exported:
+                self.assertEqual(seed, exported.seed)
+                self.assertIn(model.SystemCoord(1, 1), exported)
+
+    def test_no_galaxy(self):
+        self.engine.galaxy = None
+        self.engine.export_snapshot(self.filename)
+        with snapshot.GalaxySnapshot(self.filename) as empty:
+            self.assertEqual(0, len(empty))
+            self.assertEqual([], list(empty.system_states()))
+            self.assertNotIn(self.home, empty)
+
+    def test_unsupported(self):
+        with open(self.filename, 'r+b') as fout:
+            fout.write(b'SPCS\x63')
+        self.assertRaises(SaveFileError, snapshot.GalaxySnapshot,
+                          self.filename)
+        with open(self.filename, 'wb') as fout:
+            fout.write(b'SPCS')
+        self.assertRaises(SaveFileError, snapshot.GalaxySnapshot,
+                          self.filename)
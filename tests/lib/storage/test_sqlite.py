@@ -0,0 +1,159 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+
+from tests.base import SpaceTest
+from .test_jsonfile import StorageTest
+
+from lib import model
+from lib.engine import SpaceEngine
+from lib.storage import sqlite
+
+
+class TestSqliteStorage(StorageTest):
+    def setUp(self):
+        super().setUp()
+        self.storage_name = 'sqlite'
+
+    def count(self, table):
+        conn = sqlite3.connect(self.save_file)
+        try:
+            return conn.execute(
+                'SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_lazy_load(self):
+        engine = self.new_game()
+        for x in range(5):
+            engine.galaxy.planet(model.Coord(x, 0, 0)).emperor = 'other'
+        engine.save()
+        self.assertEqual(len(list(engine.galaxy.system_states())),
+                         self.count('SYSTEMS'))
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertEqual(0, len(loaded.galaxy._systems))
+        self.assertEqual('other',
+                         loaded.galaxy.planet(model.Coord(3, 0, 0)).emperor)
+        self.assertEqual(1, len(loaded.galaxy._systems))
+
+    def test_incremental_save(self):
+        engine = self.new_game()
+        engine.save()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        coord = loaded.user.planets[0]
+        planet = loaded.planet(coord)
+
+        # nothing changed, nothing is written
+        conn = loaded.storage._conn
+        changes = conn.total_changes
+        loaded.save()
+        self.assertEqual(changes, conn.total_changes)
+
+        planet.resources.ore = 1234
+        loaded.save()
+        self.assertLess(changes, conn.total_changes)
+        self.assertGreater(10, conn.total_changes - changes)
+
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual(1234, again.planet(coord).resources.ore)
+
+    def test_unseeded_galaxy(self):
+        engine = self.new_engine()
+        engine.galaxy = model.Galaxy()
+        engine.galaxy.system(model.SystemCoord(2, 2))
+        engine.save()
+
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        self.assertIsNone(loaded.galaxy.seed)
+        for planet in engine.galaxy.system(model.SystemCoord(2, 2)).planets:
+            self.assertIn(planet.name, loaded.galaxy.planet_names)
+
+    def test_convert_to_json(self):
+        engine = self.new_game()
+        engine.save()
+        loaded = SpaceEngine(self.save_file)
+        loaded.load()
+        loaded.opts = type('Opts', (object,), {'storage': 'json'})()
+        loaded.save()
+        self.assertEqual('json', loaded.storage.name)
+        self.assertEqual(1, len(loaded.galaxy._systems))
+
+        again = SpaceEngine(self.save_file)
+        again.load()
+        self.assertEqual('json', again.storage.name)
+        self.assertEqual(engine.user.name,
+                         again.planet(engine.user.planets[0]).emperor)
+
+
+class TestSqliteSystemStore(SpaceTest):
+    def setUp(self):
+        self.conn = sqlite.connect(':memory:')
+        self.object = sqlite.SqliteSystemStore(self.conn)
+        self.coord = model.SystemCoord(1.12, 3.4)
+        self.state = model.System().__getstate__()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_set_get(self):
+        self.assertNotIn(self.coord, self.object)
+        self.object[self.coord] = self.state
+        self.assertIn(self.coord, self.object)
+        self.assertEqual(1, len(self.object))
+        size, brightness, planets = self.object[self.coord]
+        self.assertEqual(self.state[:2], (size, brightness))
+        self.assertEqual([pl[0] for pl in self.state[2]],
+                         [pl[0] for pl in planets])
+
+    def test_write_changed_planets(self):
+        coords = [model.SystemCoord(x, x) for x in range(5)]
+        for coord in coords:
+            self.object[coord] = self.state
+        for coord in coords:
+            self.object[coord]
+        # nothing is kept in memory per system
+        self.assertEqual({'_conn': self.conn}, vars(self.object))
+        changes = self.conn.total_changes
+        self.object[coords[0]] = self.object[coords[0]]
+        self.assertEqual(changes, self.conn.total_changes)
+        size, brightness, planets = self.object[coords[0]]
+        resources = dict(planets[1][4][0], ore=5)
+        planets[1] = planets[1][:4] + ((resources,),) + planets[1][5:]
+        self.object[coords[0]] = (size, brightness, planets)
+        self.assertLess(changes, self.conn.total_changes)
+        self.assertGreater(5, self.conn.total_changes - changes)
+        self.assertEqual(5, self.object[coords[0]][2][1][4][0]['ore'])
+
+    def test_items(self):
+        self.object[self.coord] = self.state
+        items = list(self.object.items())
+        self.assertEqual(1, len(items))
+        self.assertEqual(self.coord, items[0][0])
+
+    def test_coords(self):
+        self.object[self.coord] = self.state
+        self.assertEqual([self.coord], list(self.object.coords()))
+
+    def test_delete(self):
+        self.object[self.coord] = self.state
+        del self.object[self.coord]
+        self.assertNotIn(self.coord, self.object)
+        self.assertEqual(0, len(self.object))
+        self.assertRaises(KeyError, self.object.__getitem__, self.coord)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import json
 import tempfile
 from collections import Iterable
@@ -21,6 +22,7 @@ from tests.base import SpaceTest
 
 import lib.engine as engine
 import lib.model as model
+from lib import storage
 
 
 class TestSpaceEngine(SpaceTest):
@@ -53,7 +55,8 @@ class TestSpaceEngine(SpaceTest):
 
         self.assertTrue(self.object.__getstate__.called)
         args, _ = mock_dump.call_args
-        self.assertEqual(args[0], (current_obj[1].name, ('state',)))
+        # the state is followed by the save's generation
+        self.assertEqual(args[0][:2], (current_obj[1].name, ('state',)))
 
     def test_system_callback(self):
         self.object.galaxy = Mock()
@@ -78,6 +81,28 @@ class TestSpaceEngine(SpaceTest):
         self.assertEqual(username, planet.emperor)
         self.assertNotEqual(0, planet.resources.trade_value)
 
+    def test_event_queue(self):
+        self.assertIsInstance(self.object.events, model.EventScheduler)
+        opts = type('Opts', (object,), {'event_queue': 'wheel'})
+        wheel_engine = engine.SpaceEngine(self.save_file.name, opts)
+        self.assertIsInstance(wheel_engine.events, model.TimingWheelScheduler)
+
+    def test_run_export_snapshot(self):
+        self.object.new_game(self.object.mock_new_game_info_cb)
+        snapshot_file = self.save_file.name + '.snapshot'
+        self.object.opts = type('Opts', (object,),
+                                {'snapshot_file': snapshot_file})
+        with patch('lib.engine.SpaceCmdInterpreter') as interpreter:
+            self.object.run()
+        self.assertFalse(interpreter.called)
+        try:
+            with storage.GalaxySnapshot(snapshot_file) as snapshot:
+                coord = self.object.user.planets[0]
+                self.assertEqual(self.object.planet(coord).name,
+                                 snapshot.planet(coord).name)
+        finally:
+            os.remove(snapshot_file)
+
     def test_mock_new_game_info_cb(self):
         """The new game info callback defines the new user."""
         test_value = self.object.mock_new_game_info_cb(Mock())
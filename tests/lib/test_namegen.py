@@ -0,0 +1,157 @@
+# Copyright 2015 Curtis Sand
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from io import StringIO
+
+from tests.base import SpaceTest
+
+from lib import namegen
+
+
+class TestLanguage(SpaceTest):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.language_file = os.path.join(self.tmp_dir.name, 'lang.txt')
+        with open(self.language_file, 'w') as fout:
+            fout.write(namegen.LANG_STR)
+        self.cache_file = self.language_file + namegen.CACHE_SUFFIX
+
+    def tearDown(self):
+        namegen._LANGUAGES.pop(os.path.abspath(self.language_file), None)
+        self.tmp_dir.cleanup()
+
+    def test_default_language_shared(self):
+        gen_a, gen_b = namegen.NameGen(), namegen.NameGen()
+        self.assertIs(gen_a.language, gen_b.language)
+        self.assertIs(namegen.load_language(), gen_a.language)
+
+    def test_immutable(self):
+        language = namegen.load_language()
+        self.assertRaises(AttributeError, setattr, language, 'starts', [])
+        self.assertIsInstance(language.combinations, tuple)
+
+    def test_parse(self):
+        language = namegen.Language.parse(StringIO(namegen.LANG_STR))
+        self.assertEqual(language, namegen.load_language())
+        self.assertEqual(len(language.syllables), len(language.combinations))
+
+    def test_cache_round_trip(self):
+        language = namegen.load_language(self.language_file)
+        self.assertTrue(os.path.exists(self.cache_file))
+        self.assertEqual(language, namegen.Language.read_cache(
+            self.cache_file))
+        self.assertEqual(language, namegen.load_language())
+
+    def test_no_cache(self):
+        namegen.load_language(self.language_file, use_cache=False)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_invalid_cache(self):
+        with open(self.cache_file, 'wb') as fout:
+            fout.write(b'not a cache file')
+        self.assertRaises(ValueError, namegen.Language.read_cache,
+                          self.cache_file)
+        # an unusable cache is replaced rather than breaking name generation
+        language = namegen.load_language(self.language_file)
+        self.assertEqual(language, namegen.load_language())
+        self.assertEqual(language, namegen.Language.read_cache(
+            self.cache_file))
+
+    def test_gen_word_custom_language(self):
+        word = namegen.NameGen(self.language_file).gen_word()
+        self.assertIsInstance(word, str)
+        self.assertGreater(len(word), 0)
+
+
+class TestNameGen(SpaceTest):
+    def setUp(self):
+        self.object = namegen.NameGen()
+
+    def test_select_syllable(self):
+        table = namegen.SyllableTable.from_pairs([(7, 2), (8, 5), (9, 9)])
+        self.assertEqual(7, namegen._select_syllable(table, 0, lambda a, b: 0))
+        self.assertEqual(7, namegen._select_syllable(table, 0, lambda a, b: 2))
+        self.assertEqual(8, namegen._select_syllable(table, 0, lambda a, b: 3))
+        self.assertEqual(9, namegen._select_syllable(table, 0, lambda a, b: 9))
+        # values past the last count select the end of the word
+        self.assertIsNone(namegen._select_syllable(table, 3,
+                                                   lambda a, b: 10))
+        self.assertIsNone(namegen._select_syllable(
+            namegen.SyllableTable.from_pairs([]), 0))
+
+    def test_end_counts(self):
+        language = self.object.language
+        for syl, count in language.ends.pairs():
+            self.assertEqual(count, language.end_counts[syl])
+
+    def test_gen_words(self):
+        count = 50
+        words = self.object.gen_words(count, no_repeat=True)
+        self.assertEqual(count, len(words))
+        self.assertEqual(count, len(set(words)))
+        for word in words:
+            self.assertEqual(word, word.capitalize())
+
+    def test_no_repeat_shared_registry(self):
+        registry = namegen.ForbiddenWords()
+        words = []
+        for _ in range(20):
+            words.extend(namegen.NameGen(forbidden=registry).gen_words(
+                5, no_repeat=True))
+        self.assertEqual(len(words), len(set(words)))
+        self.assertEqual(len(words), len(registry))
+        for word in words:
+            self.assertIn(word, registry)
+
+    def test_forbidden_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as sample:
+            sample.write('Alpha, beta\ngamma.')
+            sample.flush()
+            generator = namegen.NameGen(forbidden_file=sample.name)
+        for word in ['alpha', 'Beta', 'gamma']:
+            self.assertIn(word, generator.forbidden)
+        # words are matched whole, not as substrings of the sample
+        self.assertNotIn('alp', generator.forbidden)
+
+
+class TestForbiddenWords(SpaceTest):
+    def get_new_instance(self, words=None):
+        return namegen.ForbiddenWords(words)
+
+    def test_membership(self):
+        registry = self.get_new_instance(['Foo', 'bar'])
+        self.assertIn('foo', registry)
+        self.assertIn('BAR', registry)
+        self.assertNotIn('baz', registry)
+        self.assertNotIn('fo', registry)
+        registry.add('baz')
+        self.assertIn('Baz', registry)
+
+
+class TestBloomForbiddenWords(TestForbiddenWords):
+    def get_new_instance(self, words=None):
+        return namegen.BloomForbiddenWords(capacity=1000, words=words)
+
+    def test_no_false_negatives(self):
+        words = namegen.NameGen().gen_words(1000)
+        registry = self.get_new_instance(words)
+        for word in words:
+            self.assertIn(word, registry)
+
+    def test_sizing(self):
+        registry = self.get_new_instance()
+        self.assertGreater(registry.num_bits, registry.capacity)
+        self.assertGreaterEqual(registry.num_hashes, 1)